@@ -0,0 +1,210 @@
+# OllamaClient의 asyncio 버전
+# 여러 세션의 생성 작업을 한 프로세스/이벤트 루프에서 동시에 처리하기 위한 기반
+# 동시 요청 수는 동기 클라이언트와 같은 프로세스 공용 상한(agents/backend_limiter.py), 재시도는 resilience 레이어의 비동기 버전 (asyncio.sleep, 스레드 블로킹 없음)
+
+# async_ollama_client.py
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from config import OLLAMA_KEEP_ALIVE
+from agents.backend_limiter import aslotted
+from agents.client_pool import get_async_openai_client
+from agents.model_warmup import record_model_load
+from agents.ollama_client import OllamaClient
+from agents.prefix_cache import openai_cache_kwargs, record_ollama_usage, record_openai_usage
+from agents.resilience import acall_with_retry
+from utils.llm_cassette import get_cassette
+from utils.llm_metrics import note_ollama_response, note_openai_usage, note_parse_failure, track_llm_call
+from utils.response_cache import get_response_cache
+from utils.token_budget import ollama_ctx_options
+
+class AsyncOllamaClient(OllamaClient):
+    """
+    OllamaClient와 같은 모드/모델 결정 규칙을 쓰고, agenerate_text / agenerate_json을 제공합니다.
+    동기 메서드(generate_text 등)도 그대로 사용할 수 있습니다.
+    """
+
+    async def _awith_retry(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        """일시 오류 재시도 + 서킷 브레이커 (이벤트 루프를 막지 않음). 백엔드 슬롯은 시도마다 잡고 놓음"""
+        return await acall_with_retry(self.backend, aslotted(self.backend, func))
+
+    async def agenerate_text(
+        self,
+        system_role: str,
+        prompt: str,
+        temperature: float = 0.4,
+        top_p: float = 0.9,
+        bypass_cache: bool = False,
+        json_format: Any = None,
+        use_cache: bool = True,
+    ) -> str:
+        with track_llm_call("text", self.backend, self.model, f"{system_role}\n{prompt}") as call:
+            cache = get_response_cache() if use_cache else None
+            cache_key = self._cache_key(cache, system_role, prompt, temperature, top_p, json_format)
+            if cache_key and not bypass_cache:
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    call.cache_hit()
+                    call.set_response(cached)
+                    return cached
+
+            # 슬롯 대기 = 클라이언트 쪽 큐 대기 시간 (abackend_slot이 시도마다 기록)
+            text = await self._agenerate_text_uncached(system_role, prompt, temperature, top_p, json_format)
+
+            call.set_response(text)
+            if cache_key and text:
+                cache.set(cache_key, text)
+            return text
+
+    async def _agenerate_text_uncached(
+        self,
+        system_role: str,
+        prompt: str,
+        temperature: float,
+        top_p: float,
+        json_format: Any = None,
+    ) -> str:
+        cassette = get_cassette()
+        if cassette is None:
+            return await self._agenerate_text_live(system_role, prompt, temperature, top_p, json_format)
+        return await cassette.acall(
+            "text",
+            self.model,
+            self._cassette_key(system_role, prompt, temperature, top_p, json_format),
+            lambda: self._agenerate_text_live(system_role, prompt, temperature, top_p, json_format),
+        )
+
+    async def _agenerate_text_live(
+        self,
+        system_role: str,
+        prompt: str,
+        temperature: float,
+        top_p: float,
+        json_format: Any = None,
+    ) -> str:
+        messages = self._messages(system_role, prompt)
+        if self.backend == "openai":
+            aclient = get_async_openai_client()
+
+            async def _call():
+                return await aclient.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    top_p=top_p,
+                    **self._openai_format_kwargs(json_format),
+                    **openai_cache_kwargs(messages),
+                )
+
+            res = await self._awith_retry(_call)
+            record_openai_usage(self.model, getattr(res, "usage", None))
+            note_openai_usage(getattr(res, "usage", None))
+            return res.choices[0].message.content or ""
+
+        async def _ollama_call():
+            with self.router.route(self.model) as ep:
+                return await ep.async_client().chat(
+                    model=self.model,
+                    messages=messages,
+                    options={
+                        "temperature": temperature,
+                        "top_p": top_p,
+                        **ollama_ctx_options(),
+                    },
+                    keep_alive=OLLAMA_KEEP_ALIVE,
+                    **self._ollama_format_kwargs(json_format),
+                )
+
+        started = time.perf_counter()
+        res = await self._awith_retry(_ollama_call)
+        elapsed = time.perf_counter() - started
+        record_model_load(self.model, res, elapsed)
+        record_ollama_usage(self.model, res, messages)
+        note_ollama_response(res, elapsed)
+        return (res.get("message") or {}).get("content", "") or ""
+
+    async def agenerate_json(
+        self,
+        system_role: str,
+        prompt: str,
+        temperature: float = 0.2,
+        top_p: float = 0.9,
+        retries: int = 2,
+        bypass_cache: bool = False,
+        schema: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """generate_json과 동일한 규칙(제약 디코딩 우선 → JSON 가드 + 파싱 재시도)의 비동기 버전"""
+        with track_llm_call("json", self.backend, self.model, f"{system_role}\n{prompt}") as call:
+            last_err: Optional[Exception] = None
+            system_role = self._json_system(system_role)
+            cur_prompt = self._json_prompt(prompt)
+            attempts = retries + 1
+
+            json_format = self._native_json_format(schema)
+            if json_format is not None:
+                try:
+                    result = await self._agenerate_json_once(
+                        call, system_role, cur_prompt, temperature, top_p, json_format, read_cache=not bypass_cache
+                    )
+                    call.set_response(result)
+                    return result
+                except ValueError as e:
+                    note_parse_failure()
+                    last_err = e
+                    attempts -= 1
+                    cur_prompt = self._json_prompt(prompt, after_failure=True)
+                except Exception as e:
+                    if not self._disable_native_json_if_unsupported(e):
+                        raise
+
+            for attempt in range(attempts):
+                try:
+                    # 파싱에 실패한 뒤의 재시도는 캐시를 건너뜀
+                    result = await self._agenerate_json_once(
+                        call, system_role, cur_prompt, temperature, top_p, None,
+                        read_cache=not bypass_cache and last_err is None,
+                    )
+                    call.set_response(result)
+                    return result
+                except ValueError as e:
+                    note_parse_failure()
+                    last_err = e
+                    cur_prompt = self._json_prompt(prompt, after_failure=True)
+
+            raise last_err if last_err else ValueError("JSON 생성 실패")
+
+    async def _agenerate_json_once(
+        self,
+        call,
+        system_role: str,
+        prompt: str,
+        temperature: float,
+        top_p: float,
+        json_format: Any,
+        read_cache: bool,
+    ) -> Dict[str, Any]:
+        """_generate_json_once의 비동기 버전 (파싱에 성공한 응답만 캐시에 저장)"""
+        cache = get_response_cache()
+        cache_key = self._cache_key(cache, system_role, prompt, temperature, top_p, json_format)
+        if cache_key and read_cache:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                try:
+                    result = self._extract_first_json_object(cached)
+                    call.cache_hit()
+                    return result
+                except ValueError:
+                    cache.delete(cache_key)
+
+        text = await self.agenerate_text(
+            system_role=system_role,
+            prompt=prompt,
+            temperature=temperature,
+            top_p=top_p,
+            json_format=json_format,
+            use_cache=False,
+        )
+        result = self._extract_first_json_object(text)
+        if cache_key:
+            cache.set(cache_key, text)
+        return result
@@ -0,0 +1,191 @@
+# 백엔드별 동시 요청 상한 (프로세스 전체 공용)
+# 동기 클라이언트(OllamaClient, UnifiedClient)와 AsyncOllamaClient가 같은 카운터를 씀
+# - 이벤트 루프/세션/Streamlit rerun과 무관하게 한 프로세스에서 백엔드로 나가는 요청 수를 제한
+# - Ollama는 서버당 LLM_MAX_CONCURRENCY_OLLAMA (OLLAMA_HOSTS 수만큼 곱함)
+# - 스레드는 Event로, 코루틴은 자기 루프의 Future로 기다림 (기다리는 동안 작업 스레드를 잡지 않음)
+# - 슬롯은 재시도 1회분마다 잡음 (백오프/Retry-After 대기 중에는 슬롯을 놓음)
+# - 호출 마감(resilience.call_deadline)이 있으면 그때까지만 기다림
+# - 슬롯을 기다린 시간은 현재 호출의 queue_wait로 기록 (utils/llm_metrics.py)
+
+# backend_limiter.py
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Iterator, Optional
+
+from agents.resilience import DeadlineExceeded, check_deadline, time_left
+from config import LLM_MAX_CONCURRENCY_OPENAI, LLM_MAX_CONCURRENCY_OLLAMA, OLLAMA_HOSTS
+from utils.llm_metrics import note_queue_wait
+
+_LIMITS = {
+    "openai": LLM_MAX_CONCURRENCY_OPENAI,
+    "ollama": LLM_MAX_CONCURRENCY_OLLAMA * max(1, len(OLLAMA_HOSTS)),
+}
+
+
+def backend_limit(backend: str) -> int:
+    return max(1, _LIMITS.get(backend, 1))
+
+
+class _Waiter:
+    """슬롯을 기다리는 스레드(event) 또는 코루틴(loop + future)"""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+        self.event = threading.Event() if loop is None else None
+        self.granted = False
+
+    def wake(self) -> bool:
+        """슬롯을 넘겨받았다고 알림. 루프가 이미 닫혔으면 False (다음 대기자에게 넘김)"""
+        if self.event is not None:
+            self.granted = True
+            self.event.set()
+            return True
+        try:
+            self.loop.call_soon_threadsafe(self._resolve)
+        except RuntimeError:
+            return False
+        self.granted = True
+        return True
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class _BackendLimiter:
+    """스레드와 여러 이벤트 루프가 같이 쓰는 카운팅 세마포어 (해제 시 대기 순서대로 슬롯을 넘김)"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self._lock = threading.Lock()
+        self._waiters: Deque[_Waiter] = deque()
+
+    def _take_locked(self) -> bool:
+        if self.in_use < self.limit and not self._waiters:
+            self.in_use += 1
+            return True
+        return False
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """슬롯을 잡으면 True, timeout 안에 못 잡으면 False"""
+        with self._lock:
+            if self._take_locked():
+                return True
+            waiter = _Waiter()
+            self._waiters.append(waiter)
+        if waiter.event.wait(timeout):
+            return True
+        with self._lock:
+            # 시간 초과와 동시에 슬롯을 넘겨받았으면 그대로 사용
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+        return False
+
+    async def aacquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._take_locked():
+                return
+            waiter = _Waiter(loop)
+            self._waiters.append(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._waiters.remove(waiter)
+            # 취소와 동시에 슬롯을 넘겨받았으면 다음 대기자에게 돌려줌
+            if granted:
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                if self._waiters.popleft().wake():
+                    return
+            if self.in_use <= 0:
+                raise ValueError("backend slot released too many times")
+            self.in_use -= 1
+
+
+_limiters: Dict[str, _BackendLimiter] = {}
+_lock = threading.Lock()
+
+
+def _limiter(backend: str) -> _BackendLimiter:
+    limiter = _limiters.get(backend)
+    if limiter is None:
+        with _lock:
+            limiter = _limiters.get(backend)
+            if limiter is None:
+                limiter = _BackendLimiter(backend_limit(backend))
+                _limiters[backend] = limiter
+    return limiter
+
+
+def acquire_slot(backend: str) -> Callable[[], None]:
+    """
+    슬롯 1개를 잡고 해제 함수를 반환 (스레드 블로킹).
+    스트림처럼 슬롯을 호출 밖까지 들고 있어야 할 때 사용. 해제 함수는 여러 번 불러도 한 번만 반납
+    """
+    check_deadline(backend)
+    limiter = _limiter(backend)
+    waited = time.perf_counter()
+    acquired = limiter.acquire(time_left())
+    note_queue_wait(time.perf_counter() - waited)
+    if not acquired:
+        raise DeadlineExceeded(f"{backend} 요청 슬롯을 호출 마감 안에 얻지 못함")
+    released = threading.Event()
+
+    def _release() -> None:
+        if not released.is_set():
+            released.set()
+            limiter.release()
+    return _release
+
+
+@contextmanager
+def backend_slot(backend: str) -> Iterator[None]:
+    """백엔드 요청 슬롯 1개를 잡고 있는 동안 블록 실행 (스레드 블로킹)"""
+    release = acquire_slot(backend)
+    try:
+        yield
+    finally:
+        release()
+
+
+@asynccontextmanager
+async def abackend_slot(backend: str) -> AsyncIterator[None]:
+    """backend_slot의 비동기 버전. 빈 슬롯이 없으면 현재 루프에서 기다림 (실행기 스레드를 쓰지 않음)"""
+    limiter = _limiter(backend)
+    waited = time.perf_counter()
+    await limiter.aacquire()
+    note_queue_wait(time.perf_counter() - waited)
+    try:
+        yield
+    finally:
+        limiter.release()
+
+
+def slotted(backend: str, func: Callable[[], Any]) -> Callable[[], Any]:
+    """func 1회 실행 동안만 슬롯을 잡는 callable (call_with_retry에 넘기면 시도마다 슬롯을 잡고 놓음)"""
+    def _call():
+        with backend_slot(backend):
+            return func()
+    return _call
+
+
+def aslotted(backend: str, func: Callable[[], Awaitable[Any]]) -> Callable[[], Awaitable[Any]]:
+    """slotted의 비동기 버전 (acall_with_retry용)"""
+    async def _call():
+        async with abackend_slot(backend):
+            return await func()
+    return _call
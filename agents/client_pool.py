@@ -0,0 +1,124 @@
+# LLM SDK 클라이언트 공용 풀
+# OpenAI / ollama 클라이언트를 프로세스 전체에서 재사용 (keep-alive 커넥션 유지)
+# 중요! SDK 클라이언트는 여기서만 생성
+
+# client_pool.py
+import asyncio
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+
+import httpx
+import ollama
+from openai import AsyncOpenAI, OpenAI
+
+from config import (
+    API_KEY,
+    BASE_URL,
+    OLLAMA_HOST,
+    LLM_POOL_MAX_CONNECTIONS,
+    LLM_POOL_IDLE_SEC,
+    LLM_HTTP_TIMEOUT_SEC,
+)
+
+_lock = threading.Lock()
+_openai_clients: Dict[Tuple[Optional[str], Optional[str]], OpenAI] = {}
+_ollama_clients: Dict[Tuple[Optional[str], float], ollama.Client] = {}
+# 비동기 클라이언트는 이벤트 루프에 묶이므로 루프별로 따로 보관 (루프가 사라지면 자동 정리)
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, object]]" = weakref.WeakKeyDictionary()
+
+
+def http_limits() -> httpx.Limits:
+    """풀 크기/유휴 타임아웃 설정을 httpx Limits로 변환합니다."""
+    return httpx.Limits(
+        max_connections=LLM_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_POOL_MAX_CONNECTIONS,
+        keepalive_expiry=LLM_POOL_IDLE_SEC,
+    )
+
+
+def get_openai_client(api_key: Optional[str] = API_KEY, base_url: Optional[str] = BASE_URL) -> OpenAI:
+    """(api_key, base_url)별로 하나의 OpenAI 클라이언트를 공유합니다."""
+    key = (api_key, base_url)
+    client = _openai_clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        client = _openai_clients.get(key)
+        if client is None:
+            client = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=LLM_HTTP_TIMEOUT_SEC,
+                http_client=httpx.Client(limits=http_limits(), timeout=LLM_HTTP_TIMEOUT_SEC),
+            )
+            _openai_clients[key] = client
+    return client
+
+
+def get_ollama_client(host: Optional[str] = OLLAMA_HOST, timeout: float = LLM_HTTP_TIMEOUT_SEC) -> ollama.Client:
+    """(호스트, 타임아웃)별로 하나의 ollama.Client를 공유합니다. (모듈 함수 ollama.chat 대신 사용)"""
+    key = (host, timeout)
+    client = _ollama_clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        client = _ollama_clients.get(key)
+        if client is None:
+            client = ollama.Client(host=host, timeout=timeout, limits=http_limits())
+            _ollama_clients[key] = client
+    return client
+
+
+def _loop_clients() -> Dict[tuple, object]:
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.get(loop)
+        if clients is None:
+            clients = {}
+            _async_clients[loop] = clients
+    return clients
+
+
+def get_async_openai_client(api_key: Optional[str] = API_KEY, base_url: Optional[str] = BASE_URL) -> AsyncOpenAI:
+    """현재 이벤트 루프에서 공유하는 AsyncOpenAI 클라이언트."""
+    clients = _loop_clients()
+    key = ("openai", api_key, base_url)
+    client = clients.get(key)
+    if client is None:
+        client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=LLM_HTTP_TIMEOUT_SEC,
+            http_client=httpx.AsyncClient(limits=http_limits(), timeout=LLM_HTTP_TIMEOUT_SEC),
+        )
+        clients[key] = client
+    return client
+
+
+def get_async_ollama_client(host: Optional[str] = OLLAMA_HOST) -> ollama.AsyncClient:
+    """현재 이벤트 루프에서 공유하는 ollama.AsyncClient."""
+    clients = _loop_clients()
+    key = ("ollama", host)
+    client = clients.get(key)
+    if client is None:
+        client = ollama.AsyncClient(host=host, timeout=LLM_HTTP_TIMEOUT_SEC, limits=http_limits())
+        clients[key] = client
+    return client
+
+
+def close_all() -> None:
+    """테스트/종료 시 풀에 있는 커넥션을 모두 닫습니다."""
+    with _lock:
+        for client in _openai_clients.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+        for client in _ollama_clients.values():
+            try:
+                client._client.close()
+            except Exception:
+                pass
+        _openai_clients.clear()
+        _ollama_clients.clear()
@@ -0,0 +1,148 @@
+# 헤징(hedged request) 정책
+# 짧고 사용자가 기다리는 호출(제목 추천/최종 제목)에서 느린 응답 하나가 화면 전체를 붙잡지 않게 함
+# - 호출 이름별 최근 지연시간의 백분위(LLM_HEDGE_PERCENTILE)만큼 기다려도 응답이 없으면 예비 요청 발사
+# - 먼저 성공한 쪽을 쓰고, 진 쪽은 취소 신호로 스트림을 닫아 생성을 중단
+# - 이름별 헤지 비율/승리 횟수를 hedge_stats()로 확인해 튜닝
+
+# hedging.py
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, wait
+from typing import Any, Callable, Deque, Dict, List
+
+from config import (
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_DEFAULT_DELAY_SEC,
+    LLM_HEDGE_MIN_DELAY_SEC,
+    LLM_HEDGE_MAX_DELAY_SEC,
+)
+from agents.ollama_router import set_route_session
+
+# 백분위를 믿을 수 있을 만큼 샘플이 모이기 전에는 기본 지연 사용
+_MIN_SAMPLES = 20
+_WINDOW = 200
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+
+
+class HedgeCancelled(Exception):
+    """상대 요청이 먼저 끝나서 중단된 요청"""
+
+
+class _HedgeStat:
+    def __init__(self):
+        self.latencies: Deque[float] = deque(maxlen=_WINDOW)
+        self.calls = 0
+        self.hedged = 0
+        self.primary_wins = 0
+        self.backup_wins = 0
+
+    def delay(self) -> float:
+        if len(self.latencies) < _MIN_SAMPLES:
+            return LLM_HEDGE_DEFAULT_DELAY_SEC
+        ordered = sorted(self.latencies)
+        idx = min(len(ordered) - 1, int(LLM_HEDGE_PERCENTILE * len(ordered)))
+        return min(LLM_HEDGE_MAX_DELAY_SEC, max(LLM_HEDGE_MIN_DELAY_SEC, ordered[idx]))
+
+
+_stats: Dict[str, _HedgeStat] = {}
+_lock = threading.Lock()
+
+
+def _stat(name: str) -> _HedgeStat:
+    with _lock:
+        stat = _stats.get(name)
+        if stat is None:
+            stat = _HedgeStat()
+            _stats[name] = stat
+        return stat
+
+
+def hedge_stats() -> Dict[str, Dict[str, Any]]:
+    """이름별 호출 수, 헤지 비율, 원 요청/예비 요청 승리 횟수, 현재 헤지 지연"""
+    with _lock:
+        items = list(_stats.items())
+    out = {}
+    for name, st in items:
+        out[name] = {
+            "calls": st.calls,
+            "hedged": st.hedged,
+            "hedge_rate": (st.hedged / st.calls) if st.calls else 0.0,
+            "primary_wins": st.primary_wins,
+            "backup_wins": st.backup_wins,
+            "delay_sec": round(st.delay(), 3),
+        }
+    return out
+
+
+def _timed(fn: Callable[[threading.Event], str], cancel: threading.Event) -> Callable[[], tuple]:
+    def _run():
+        started = time.perf_counter()
+        return fn(cancel), time.perf_counter() - started
+    return _run
+
+
+def run_hedged(
+    name: str,
+    primary: Callable[[threading.Event], str],
+    backup: Callable[[threading.Event], str],
+) -> str:
+    """
+    primary(cancel)를 실행하고, 지연 안에 끝나지 않으면 backup(cancel)도 실행해 먼저 성공한 결과를 반환합니다.
+    두 함수는 cancel이 set되면 HedgeCancelled를 올리고 요청을 정리해야 합니다.
+    예비 요청은 세션 고정 라우팅을 끄고 실행 → 가장 한가한(다른) 서버로 감
+    """
+    stat = _stat(name)
+    delay = stat.delay()
+    with _lock:
+        stat.calls += 1
+
+    primary_cancel = threading.Event()
+    primary_started = time.perf_counter()
+    first = _executor.submit(contextvars.copy_context().run, _timed(primary, primary_cancel))
+    try:
+        text, elapsed = first.result(timeout=delay)
+        with _lock:
+            stat.latencies.append(elapsed)
+        return text
+    except FuturesTimeoutError:
+        pass
+
+    with _lock:
+        stat.hedged += 1
+    print(f"🪁 [{name}] {delay:.1f}s 동안 응답 없음, 예비 요청 발사")
+    backup_cancel = threading.Event()
+    backup_ctx = contextvars.copy_context()
+    backup_ctx.run(set_route_session, None)
+    second = _executor.submit(backup_ctx.run, _timed(backup, backup_cancel))
+
+    pending = {first: ("primary", primary_cancel), second: ("backup", backup_cancel)}
+    errors: List[Exception] = []
+    primary_failed = False
+    while pending:
+        done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+        for fut in done:
+            label, _cancel = pending.pop(fut)
+            try:
+                text, elapsed = fut.result()
+            except Exception as e:
+                errors.append(e)
+                primary_failed = primary_failed or label == "primary"
+                continue
+            # 진 쪽은 다음 청크에서 스트림을 닫고 종료
+            for other, (_label, cancel) in pending.items():
+                cancel.set()
+                other.cancel()
+            with _lock:
+                stat.latencies.append(elapsed)
+                if label == "primary":
+                    stat.primary_wins += 1
+                else:
+                    stat.backup_wins += 1
+                    # 진 원 요청의 지연(최소 이만큼 걸림)도 넣어야 백분위가 이긴 쪽 위주로 낮아지지 않음
+                    if not primary_failed:
+                        stat.latencies.append(time.perf_counter() - primary_started)
+            return text
+    raise errors[0]
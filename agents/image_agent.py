@@ -1,28 +1,54 @@
 # image_agent.py
 
+import contextvars
 import json
+import math
 import re
+import threading
 import time
 import base64  # <-- [중요] OpenAI 이미지 전송을 위해 필요
-from typing import List, Dict, Any
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, Dict, Any, Optional, Tuple
 from collections import Counter
 
 # [1] 환경설정 및 라이브러리 로드
-from openai import OpenAI, RateLimitError
-import ollama
+from agents.backend_limiter import backend_limit, slotted
+from agents.client_pool import get_openai_client
+from agents.model_warmup import record_model_load
+from agents.ollama_router import get_ollama_router
+from agents.prefix_cache import openai_cache_kwargs, record_ollama_usage, record_openai_usage
+from agents.resilience import call_deadline, call_with_retry, is_request_rejected
+from utils.llm_cassette import get_cassette, image_digest, request_key
+from utils.llm_metrics import llm_stage, note_ollama_response, note_openai_usage, track_llm_call
+from utils.prom_metrics import observe_image_analysis
+from utils.image_hash import dhash, group_near_duplicates
+from utils.image_store import model_variant
+from utils.response_cache import ResponseCache
+from utils.tracing import trace_span
+from utils.token_budget import budget_prompt_variables, ollama_ctx_options, prompt_budget
 
 # config에서 모델명/모드 가져오기
 from config import (
     MODEL_VISION,
     MODEL_TEXT,
     API_KEY,
-    BASE_URL,
+    OLLAMA_KEEP_ALIVE,
+    IMAGE_ANALYSIS_CONCURRENCY,
+    IMAGE_ANALYSIS_TIMEOUT_SEC,
+    IMAGE_BATCH_MODE,
+    IMAGE_BATCH_SIZE,
+    LLM_NATIVE_JSON,
+    IMAGE_CACHE_ENABLED,
+    IMAGE_CACHE_DIR,
+    IMAGE_CACHE_TTL_SEC,
+    IMAGE_CACHE_MAX_MB,
+    IMAGE_DUP_MAX_DISTANCE,
     resolve_api_mode,
     normalize_openai_model,
 )
 
 # 프롬프트 로더 추가
-from utils.prompt_loader import load_prompt, render_prompt
+from utils.prompt_loader import compose_system_prompt, load_and_render_prompt, load_and_render_prompt_parts, load_prompt
 
 # =========================================================
 # 🔐 환경설정 및 모드 자동 감지 (하이브리드 로직)
@@ -38,6 +64,11 @@ else:
     USE_MODEL_VISION = MODEL_VISION
     USE_MODEL_TEXT = MODEL_TEXT
 
+def _image_b64(image_bytes: bytes) -> str:
+    # 저장소에서 불러온 이미지(utils/image_store.EncodedImage)는 캐시된 base64를 그대로 사용
+    return getattr(image_bytes, "b64", None) or base64.b64encode(image_bytes).decode('utf-8')
+
+
 # =========================================================
 # 🤖 통합 클라이언트 (Vision 기능 내장)
 # =========================================================
@@ -49,29 +80,57 @@ class UnifiedClient:
             if not API_KEY:
                  print("⚠️ [Warning] OpenAI 모드이나 API Key가 없습니다. Vision 기능이 제한될 수 있습니다.")
             else:
-                self.client = OpenAI(api_key=API_KEY, base_url=BASE_URL)
-
-    def _retry_openai(self, func):
-        """OpenAI Rate Limit 재시도 로직"""
-        for i in range(3):
-            try: return func()
-            except RateLimitError:
-                print(f"⏳ Rate Limit (Vision). Retrying in {2**(i+1)}s...")
-                time.sleep(2**(i+1))
-            except Exception as e: raise e
-        raise Exception("OpenAI API Retry Failed")
+                self.client = get_openai_client()
+        self.router = get_ollama_router() if self.client is None else None
+
+    @property
+    def backend(self) -> str:
+        return "openai" if (self.mode == "openai" and self.client) else "ollama"
+
+    def _with_retry(self, func):
+        """
+        일시 오류 재시도 + 서킷 브레이커 (agents/resilience.py, 텍스트 클라이언트와 브레이커 공유)
+        백엔드 슬롯은 시도마다 잡고 놓음 (재시도 대기 중에는 다른 요청이 슬롯을 씀)
+        """
+        return call_with_retry(self.backend, slotted(self.backend, func))
+
+    def _recorded(self, kind: str, model: str, fn, **parts) -> str:
+        """
+        호출 지표 기록(utils/llm_metrics.py) + LLM_CASSETTE_MODE가 켜져 있으면 카세트로 녹화/재생 (utils/llm_cassette.py)
+        """
+        prompt_text = "\n".join(str(parts[k]) for k in ("system_role", "prompt") if parts.get(k))
+        with track_llm_call(kind, self.backend, model, prompt_text) as call:
+            cassette = get_cassette()
+            if cassette is None:
+                text = fn()
+            else:
+                text = cassette.call(kind, model, request_key(kind, model=model, **parts), fn)
+            call.set_response(text or "")
+            return text
 
     # [핵심] 이미지 분석 함수
     def chat_vision(self, prompt: str, image_bytes: bytes) -> str:
-        """이미지 데이터를 받아서 분석 결과를 문자열로 반환"""
+        """
+        이미지 데이터를 받아서 분석 결과를 문자열로 반환 (EncodedImage면 미리 만든 base64 사용)
+        실패하면 RuntimeError (오류 문구가 사진 설명으로 쓰이거나 캐시되지 않도록)
+        """
         if not image_bytes:
-            return "이미지 데이터가 없습니다."
+            raise ValueError("이미지 데이터가 없습니다.")
 
+        return self._recorded(
+            "vision",
+            USE_MODEL_VISION,
+            lambda: self._chat_vision_live(prompt, image_bytes),
+            prompt=prompt,
+            image=image_digest(image_bytes),
+        )
+
+    def _chat_vision_live(self, prompt: str, image_bytes: bytes) -> str:
         if self.mode == "openai" and self.client:
             # --- OpenAI Logic (Base64 인코딩 필요) ---
             try:
-                # 1. 이미지를 Base64 문자열로 변환
-                base64_image = base64.b64encode(image_bytes).decode('utf-8')
+                # 1. 이미지를 Base64 문자열로 변환 (저장소 이미지는 캐시된 값)
+                base64_image = _image_b64(image_bytes)
                 
                 def _call():
                     response = self.client.chat.completions.create(
@@ -88,46 +147,128 @@ class UnifiedClient:
                         ],
                         max_tokens=500,
                     )
+                    note_openai_usage(getattr(response, "usage", None))
                     return response.choices[0].message.content
-                return self._retry_openai(_call)
+                return self._with_retry(_call)
             except Exception as e:
-                 return f"OpenAI Vision Error: {str(e)}"
+                raise RuntimeError(f"OpenAI Vision Error: {str(e)}") from e
 
         else:
             # --- Ollama Logic (바이트 직접 전송 가능) ---
             try:
-                response = ollama.chat(
-                    model=USE_MODEL_VISION,
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": prompt,
-                            # Ollama는 images 리스트에 바이너리를 직접 넣습니다.
-                            "images": [image_bytes],
-                        }
-                    ],
-                )
+                def _ollama_call():
+                    # 비전 모델이 설치된 서버로만 라우팅
+                    with self.router.route(USE_MODEL_VISION) as ep:
+                        return ep.client().chat(
+                            model=USE_MODEL_VISION,
+                            messages=[
+                                {
+                                    "role": "user",
+                                    "content": prompt,
+                                    # Ollama는 images 리스트에 바이너리를 직접 넣습니다.
+                                    "images": [image_bytes],
+                                }
+                            ],
+                            options=ollama_ctx_options(),
+                            keep_alive=OLLAMA_KEEP_ALIVE,
+                        )
+                started = time.perf_counter()
+                response = self._with_retry(_ollama_call)
+                # llava 같은 비전 모델은 콜드 로드가 특히 느림 → 콜드/웜 지연 분리 기록
+                elapsed = time.perf_counter() - started
+                record_model_load(USE_MODEL_VISION, response, elapsed)
+                note_ollama_response(response, elapsed)
                 return response["message"]["content"]
             except Exception as e:
-                return f"Ollama Vision Error: {str(e)} (모델이 설치되어 있는지 확인해주세요: {USE_MODEL_VISION})"
+                raise RuntimeError(
+                    f"Ollama Vision Error: {str(e)} (모델이 설치되어 있는지 확인해주세요: {USE_MODEL_VISION})"
+                ) from e
+
+    def chat_vision_batch(self, prompt: str, images: List[bytes]) -> str:
+        """여러 장을 한 요청으로 분석 (첨부 순서 = 사진 번호). 실패하면 원래 오류를 그대로 올림 (재시도 가능 여부 판단용)"""
+        return self._recorded(
+            "vision_batch",
+            USE_MODEL_VISION,
+            lambda: self._chat_vision_batch_live(prompt, images),
+            prompt=prompt,
+            images=[image_digest(b) for b in images],
+        )
+
+    def _chat_vision_batch_live(self, prompt: str, images: List[bytes]) -> str:
+        if self.mode == "openai" and self.client:
+            content = [{"type": "text", "text": prompt}]
+            for idx, image_bytes in enumerate(images, start=1):
+                base64_image = _image_b64(image_bytes)
+                content.append({"type": "text", "text": f"[사진 {idx}]"})
+                content.append({"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}})
+
+            def _call():
+                response = self.client.chat.completions.create(
+                    model=USE_MODEL_VISION,
+                    messages=[{"role": "user", "content": content}],
+                    max_tokens=400 * len(images) + 800,
+                    **({"response_format": {"type": "json_object"}} if LLM_NATIVE_JSON else {}),
+                )
+                note_openai_usage(getattr(response, "usage", None))
+                return response.choices[0].message.content
+            return self._with_retry(_call)
+
+        def _ollama_call():
+            with self.router.route(USE_MODEL_VISION) as ep:
+                return ep.client().chat(
+                    model=USE_MODEL_VISION,
+                    messages=[{"role": "user", "content": prompt, "images": list(images)}],
+                    options=ollama_ctx_options(),
+                    keep_alive=OLLAMA_KEEP_ALIVE,
+                    **({"format": "json"} if LLM_NATIVE_JSON else {}),
+                )
+        started = time.perf_counter()
+        response = self._with_retry(_ollama_call)
+        elapsed = time.perf_counter() - started
+        record_model_load(USE_MODEL_VISION, response, elapsed)
+        note_ollama_response(response, elapsed)
+        return response["message"]["content"]
 
     # 텍스트 생성 함수 (종합 분석용)
     def chat_text(self, prompt: str, system_role: str = "assistant") -> str:
+        return self._recorded(
+            "vision_text",
+            USE_MODEL_TEXT,
+            lambda: self._chat_text_live(prompt, system_role),
+            prompt=prompt,
+            system_role=system_role,
+        )
+
+    def _chat_text_live(self, prompt: str, system_role: str) -> str:
+        messages = [{"role": "system", "content": system_role}, {"role": "user", "content": prompt}]
         if self.mode == "openai" and self.client:
             def _call():
                 return self.client.chat.completions.create(
                     model=USE_MODEL_TEXT,
-                    messages=[{"role": "system", "content": system_role}, {"role": "user", "content": prompt}],
-                    temperature=0.7
-                ).choices[0].message.content
-            return self._retry_openai(_call)
+                    messages=messages,
+                    temperature=0.7,
+                    **openai_cache_kwargs(messages),
+                )
+            res = self._with_retry(_call)
+            record_openai_usage(USE_MODEL_TEXT, getattr(res, "usage", None))
+            note_openai_usage(getattr(res, "usage", None))
+            return res.choices[0].message.content
         else:
             try:
-                resp = ollama.chat(
-                    model=USE_MODEL_TEXT,
-                    messages=[{"role": "system", "content": system_role}, {"role": "user", "content": prompt}],
-                    options={"temperature": 0.7}
-                )
+                def _ollama_call():
+                    with self.router.route(USE_MODEL_TEXT) as ep:
+                        return ep.client().chat(
+                            model=USE_MODEL_TEXT,
+                            messages=messages,
+                            options={"temperature": 0.7, **ollama_ctx_options()},
+                            keep_alive=OLLAMA_KEEP_ALIVE,
+                        )
+                started = time.perf_counter()
+                resp = self._with_retry(_ollama_call)
+                elapsed = time.perf_counter() - started
+                record_model_load(USE_MODEL_TEXT, resp, elapsed)
+                record_ollama_usage(USE_MODEL_TEXT, resp, messages)
+                note_ollama_response(resp, elapsed)
                 return resp['message']['content']
             except Exception as e:
                 return f"Ollama Text Error: {str(e)}"
@@ -135,6 +276,11 @@ class UnifiedClient:
 # 클라이언트 인스턴스 생성
 client = UnifiedClient()
 
+
+def model_image_variant() -> str:
+    """현재 비전 백엔드에 맞는 이미지 저장소 변형 이름 (load_images(ids, model_image_variant()))"""
+    return model_variant(client.backend)
+
 # =========================================================
 # 🧹 헬퍼 함수 (태그 추출 및 JSON 파싱)
 # =========================================================
@@ -152,6 +298,31 @@ def _extract_tags_from_text(text: str, k: int = 4) -> List[str]:
     cnt = Counter(toks)
     return ["#" + w for w, _ in cnt.most_common(k)]
 
+def _clean_tags(raw_tags: Any) -> List[str]:
+    """'#태그1, 태그2' 문자열이나 리스트를 중복 없는 #태그 목록으로"""
+    if isinstance(raw_tags, str):
+        raw_tags = re.split(r'[,\s]+', raw_tags)
+    tags = []
+    for t in raw_tags or []:
+        t = "#" + re.sub(r'[^0-9A-Za-z가-힣_]', '', str(t).replace("#", ""))
+        if len(t) > 1 and t not in tags:
+            tags.append(t)
+    return tags
+
+
+def _complete_tags(tags: List[str], frequent_tags: List[str]) -> List[str]:
+    """통합 태그를 MAX_TAGS개로 맞춤 (부족하면 개별 사진 태그 빈도순으로 채움)"""
+    tags = [t if t.startswith("#") else "#" + t for t in tags][:MAX_TAGS]
+    while len(tags) < MAX_TAGS:
+        if len(frequent_tags) > len(tags):
+            candidate = frequent_tags[len(tags)]
+            if candidate not in tags: tags.append(candidate)
+            else: tags.append(f"#태그{len(tags)+1}")
+        else:
+            tags.append(f"#태그{len(tags)+1}")
+    return tags
+
+
 def _extract_json_from_text(text: str) -> Dict[str, Any]:
     """AI 응답에서 JSON 추출 (Ollama 대비 강화)"""
     try:
@@ -184,21 +355,25 @@ TOPIC_N = 2
 # =========================================================
 # [Step 1] Vision Model - 개별 이미지 정밀 분석
 # =========================================================
+@trace_span("agent.analyze_single_image")
+@llm_stage("step2.image_analysis")
 def analyze_single_image(image_bytes: bytes, img_id: int, user_intent: str = "") -> Dict[str, Any]:
     """
     [Step 1] 단일 이미지를 정밀 분석하여 설명(desc)과 태그(tags)를 함께 추출합니다.
     프롬프트는 prompts/image_analysis.md에서 로드합니다.
     """
-    prompt_template = load_prompt("image_analysis")
-    prompt = render_prompt(prompt_template, {
+    started = time.perf_counter()
+    prompt = load_and_render_prompt("image_analysis", {
         "user_intent": user_intent.strip() if user_intent else "(없음)"
     })
 
 
     
     try:
-        # ★ UnifiedClient 사용
+        # ★ UnifiedClient 사용 (백엔드 오류는 예외로 올라와 failed 처리됨)
         out = client.chat_vision(prompt, image_bytes)
+        if not (out or "").strip():
+            raise ValueError("빈 응답")
         
         # 설명 추출
         desc = ""
@@ -215,25 +390,19 @@ def analyze_single_image(image_bytes: bytes, img_id: int, user_intent: str = "")
         for line in out.splitlines():
             line = line.strip()
             if line.startswith("태그:"):
-                tag_part = line.replace("태그:", "", 1).strip()
-                raw_tags = re.split(r'[,\s]+', tag_part)
-                for t in raw_tags:
-                    t = t.strip()
-                    if t:
-                        if not t.startswith("#"): t = "#" + t
-                        t = "#" + re.sub(r'[^0-9A-Za-z가-힣_]', '', t.replace("#", ""))
-                        if len(t) > 1 and t not in tags:
-                            tags.append(t)
+                tags = _clean_tags(line.replace("태그:", "", 1).strip())
                 break
         
         if not tags:
             tags = _extract_tags_from_text(desc, k=4)
         
+        observe_image_analysis(time.perf_counter() - started, ok=True)
         return {"img_id": img_id, "desc": desc, "tags": tags[:5]}
         
     except Exception as e:
         print(f"[이미지 {img_id}] 분석 에러: {e}")
-        return {"img_id": img_id, "desc": "분석 실패", "tags": ["#사진"]}
+        observe_image_analysis(time.perf_counter() - started, ok=False)
+        return {"img_id": img_id, "desc": "분석 실패", "tags": ["#사진"], "failed": True}
 
 
 def _extract_tags_from_text(text: str, k: int = 4) -> List[str]:
@@ -252,6 +421,8 @@ def _extract_tags_from_text(text: str, k: int = 4) -> List[str]:
 # =========================================================
 # [Step 2] Text Model - 개별 분석 결과 취합 및 통합 기획
 # =========================================================
+@trace_span("agent.aggregate_and_plan")
+@llm_stage("step2.image_aggregate")
 def aggregate_and_plan(
     individual_analyses: List[Dict[str, Any]], 
     user_intent: str = "",
@@ -267,6 +438,10 @@ def aggregate_and_plan(
         img_id = item.get("img_id", "?")
         desc = item.get("desc", "")
         tags = item.get("tags", [])
+        if item.get("duplicate_of"):
+            # 거의 같은 사진은 설명을 반복하지 않음 (태그 빈도에도 한 번만 반영)
+            image_sections.append(f"[사진 {img_id}]\n- 사진 {item['duplicate_of']}과 거의 같은 장면")
+            continue
         tag_str = ", ".join(tags) if tags else "(없음)"
         image_sections.append(f"[사진 {img_id}]\n- 설명: {desc}\n- 태그: {tag_str}")
         all_tags_pool.extend(tags)
@@ -277,18 +452,26 @@ def aggregate_and_plan(
     tag_hint = ", ".join(frequent_tags) if frequent_tags else "(없음)"
     
     # 프롬프트 파일에서 로드
-    prompt_template = load_prompt("image_aggregate")
-    prompt = render_prompt(prompt_template, {
-        "user_intent": (user_intent or "").strip() or "(없음)",
-        "images_text": images_text,
-        "tag_hint": tag_hint,
-        "n_topics": str(n_topics),
-        "max_tags": str(MAX_TAGS),
-    })
+    # 고정 섹션(역할/규칙/출력 형식)은 시스템 메시지로 → 호출마다 같은 prefix라 KV 캐시 재사용
+    # 사진이 많으면 개별 분석 결과(images_text)를 컨텍스트 예산에 맞게 줄임
+    variables = budget_prompt_variables(
+        load_prompt("image_aggregate"),
+        {
+            "user_intent": (user_intent or "").strip() or "(없음)",
+            "images_text": images_text,
+            "tag_hint": tag_hint,
+            "n_topics": str(n_topics),
+        },
+        ("images_text",),
+        prompt_budget(client.backend),
+        model=USE_MODEL_TEXT,
+        label="image_aggregate",
+    )
+    static_prefix, prompt = load_and_render_prompt_parts("image_aggregate", variables)
 
     try:
         # ★ UnifiedClient 사용
-        txt = client.chat_text(prompt)
+        txt = client.chat_text(prompt, compose_system_prompt("assistant", static_prefix))
         
         try:
             result = json.loads(txt)
@@ -297,16 +480,7 @@ def aggregate_and_plan(
             result = json.loads(m.group(0)) if m else {}
         
         # 태그 보정
-        tags = result.get("tags", [])
-        tags = [t if t.startswith("#") else "#" + t for t in tags][:MAX_TAGS]
-        while len(tags) < MAX_TAGS:
-            if len(frequent_tags) > len(tags):
-                candidate = frequent_tags[len(tags)]
-                if candidate not in tags: tags.append(candidate)
-                else: tags.append(f"#태그{len(tags)+1}")
-            else:
-                tags.append(f"#태그{len(tags)+1}")
-        result["tags"] = tags
+        result["tags"] = _complete_tags(result.get("tags", []), frequent_tags)
         
         return result
         
@@ -321,9 +495,296 @@ def aggregate_and_plan(
         }
 
 
+# =========================================================
+# [Step 1 병렬] 이미지별 분석 동시 실행
+# =========================================================
+def _image_concurrency() -> int:
+    if IMAGE_ANALYSIS_CONCURRENCY > 0:
+        return IMAGE_ANALYSIS_CONCURRENCY
+    # 어차피 backend_limiter의 공용 상한을 넘는 스레드는 슬롯을 기다리기만 함
+    return backend_limit(client.backend)
+
+
+def analyze_images_concurrently(
+    images: List[bytes],
+    user_intent: str = "",
+    img_ids: Optional[List[int]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    이미지별 analyze_single_image를 스레드 풀에서 동시에 실행하고 img_id 순서로 돌려줍니다.
+    img_ids를 생략하면 1부터 차례로 붙입니다.
+    - 이미지 1장이 실행을 시작한 뒤 IMAGE_ANALYSIS_TIMEOUT_SEC 안에 끝나지 않으면 timed_out 결과로 대체
+    - 앞 작업이 멈춰 대기열이 밀리는 경우를 막기 위해 전체 마감(장당 타임아웃 × 라운드 수)도 둠
+    시간 초과된 작업은 결과를 버리고, 같은 마감을 호출에도 넘겨(call_deadline) 진행 중인 요청 1건만
+    끝까지 둡니다. 마감 이후 재시도/슬롯 대기는 하지 않으므로 백엔드 슬롯을 바로 돌려줍니다.
+    """
+    n = len(images)
+    if n == 0:
+        return []
+    workers = max(1, min(n, _image_concurrency()))
+    timeout = IMAGE_ANALYSIS_TIMEOUT_SEC
+    overall_deadline = time.monotonic() + timeout * math.ceil(n / workers)
+    started_at: Dict[int, float] = {}
+
+    def _run(img_id: int, img_bytes: bytes) -> Dict[str, Any]:
+        started_at[img_id] = time.monotonic()
+        with call_deadline(min(started_at[img_id] + timeout, overall_deadline)):
+            return analyze_single_image(img_bytes, img_id=img_id, user_intent=user_intent)
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image")
+    # 작업마다 contextvars를 복사해 단계 이름/트레이스/세션 라우팅을 그대로 사용
+    futures = {
+        pool.submit(contextvars.copy_context().run, _run, idx, img_bytes): idx
+        for idx, img_bytes in zip(img_ids or range(1, n + 1), images)
+    }
+    results: Dict[int, Dict[str, Any]] = {}
+    pending = set(futures)
+    try:
+        while pending:
+            now = time.monotonic()
+            for fut in list(pending):
+                img_id = futures[fut]
+                t0 = started_at.get(img_id)
+                if now >= overall_deadline or (t0 is not None and now - t0 >= timeout):
+                    pending.discard(fut)
+                    print(f"⏱️ [이미지 {img_id}] 분석 시간 초과({timeout:.0f}초) → 나머지 사진으로 진행")
+                    results[img_id] = {"img_id": img_id, "desc": "분석 시간 초과", "tags": [], "timed_out": True}
+            if not pending:
+                break
+            deadlines = [overall_deadline] + [started_at[futures[f]] + timeout for f in pending if futures[f] in started_at]
+            done, _ = wait(pending, timeout=max(0.05, min(deadlines) - now), return_when=FIRST_COMPLETED)
+            for fut in done:
+                pending.discard(fut)
+                img_id = futures[fut]
+                try:
+                    results[img_id] = fut.result()
+                except Exception as e:
+                    print(f"[이미지 {img_id}] 분석 에러: {e}")
+                    results[img_id] = {"img_id": img_id, "desc": "분석 실패", "tags": ["#사진"], "failed": True}
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return [results[i] for i in sorted(results)]
+
+
+# =========================================================
+# [Step 1+2 일괄] 여러 장을 한 요청으로 분석 (+ 통합 기획)
+# =========================================================
+# 일괄 요청을 처리하지 못한 비전 모델 (프로세스 동안 장별 분석만 사용)
+_batch_unsupported = set()
+
+
+def _batch_enabled() -> bool:
+    if USE_MODEL_VISION in _batch_unsupported or IMAGE_BATCH_MODE == "off":
+        return False
+    return IMAGE_BATCH_MODE == "on" or client.backend == "openai"
+
+
+@trace_span("agent.analyze_images_batch")
+@llm_stage("step2.image_batch")
+def analyze_images_batch(
+    images: List[bytes],
+    img_ids: List[int],
+    user_intent: str = "",
+) -> Tuple[Dict[int, Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    prompts/image_batch_analysis.md로 여러 장을 한 번에 분석합니다.
+    ({img_id: 분석 결과}, 통합 기획 또는 None)을 돌려주고, 빠진 사진은 호출 쪽이 장별 분석으로 채웁니다.
+    요청이 거부(400/422)되거나 응답 형식이 맞지 않으면 이 모델은 이후 일괄 분석하지 않습니다.
+    그 밖의 오류(일시 오류, 브레이커 차단, 인증/설정 오류 등)는 이번 요청만 장별 분석으로 대신합니다.
+    모델이 일부 사진을 빠뜨렸으면 통합 기획도 버립니다. (호출 쪽이 전체 결과로 다시 기획)
+    """
+    started = time.perf_counter()
+    prompt = load_and_render_prompt("image_batch_analysis", {
+        "user_intent": user_intent.strip() if user_intent else "(없음)",
+        "n_images": str(len(images)),
+        "n_topics": str(TOPIC_N),
+    })
+    try:
+        data = _extract_json_from_text(client.chat_vision_batch(prompt, images) or "")
+    except Exception as e:
+        if is_request_rejected(e):
+            print(f"⚠️ 일괄 이미지 분석 거부({USE_MODEL_VISION}: {e}) → 이후 장별 분석 사용")
+            _batch_unsupported.add(USE_MODEL_VISION)
+        else:
+            print(f"⚠️ 일괄 이미지 분석 실패({type(e).__name__}: {e}) → 이번에는 장별 분석으로 진행")
+        return {}, None
+
+    items = data.get("images") if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        print(f"⚠️ 일괄 분석 응답 형식 불일치 ({USE_MODEL_VISION}) → 이후 장별 분석 사용")
+        _batch_unsupported.add(USE_MODEL_VISION)
+        return {}, None
+    # 개수가 맞으면 img_id가 없어도 순서로 매칭, 안 맞으면 img_id가 있는 항목만 사용
+    by_position = len(items) == len(images)
+
+    results: Dict[int, Dict[str, Any]] = {}
+    for pos, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        local = item.get("img_id")
+        if isinstance(local, int) and 1 <= local <= len(images):
+            idx = local - 1
+        elif by_position:
+            idx = pos
+        else:
+            continue
+        desc = str(item.get("desc") or "").strip()
+        if not desc or img_ids[idx] in results:
+            continue
+        tags = _clean_tags(item.get("tags")) or _extract_tags_from_text(desc, k=4)
+        results[img_ids[idx]] = {"img_id": img_ids[idx], "desc": desc, "tags": tags[:5]}
+
+    per_image = (time.perf_counter() - started) / len(images)
+    for img_id in img_ids:
+        observe_image_analysis(per_image, ok=img_id in results)
+
+    if len(results) < len(images):
+        # 일부 사진만 보고 만든 통합 기획은 쓰지 않음
+        print(f"⚠️ 일괄 분석에서 {len(images) - len(results)}장 누락 → 누락분은 장별 분석, 통합 기획은 전체 결과로 다시 생성")
+        return results, None
+    aggregate = data.get("aggregate")
+    if not isinstance(aggregate, dict) or not (aggregate.get("mood") or aggregate.get("merged_description")):
+        return results, None
+    frequent_tags = [t for t, _ in Counter(t for r in results.values() for t in r["tags"]).most_common(MAX_TAGS)]
+    aggregate["tags"] = _complete_tags(_clean_tags(aggregate.get("tags")), frequent_tags)
+    aggregate.setdefault("topic_candidates", [])
+    aggregate.setdefault("best_topic", "")
+    return results, aggregate
+
+
+def _analyze_uncached(
+    images: List[bytes],
+    img_ids: List[int],
+    user_intent: str,
+) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    일괄 분석이 가능하면 IMAGE_BATCH_SIZE장씩 묶어 요청하고, 빠진 사진만 장별 동시 분석으로 채웁니다.
+    통합 기획은 요청 1건에 모든 사진이 들어간 경우에만 함께 돌려줍니다.
+    """
+    results: Dict[int, Dict[str, Any]] = {}
+    aggregate = None
+    if len(images) >= 2 and _batch_enabled():
+        size = max(1, IMAGE_BATCH_SIZE)
+        chunks = [(images[i:i + size], img_ids[i:i + size]) for i in range(0, len(images), size)]
+        for chunk_images, chunk_ids in chunks:
+            if not _batch_enabled():
+                break
+            got, chunk_aggregate = analyze_images_batch(chunk_images, chunk_ids, user_intent)
+            results.update(got)
+            if len(chunks) == 1:
+                aggregate = chunk_aggregate
+
+    rest = [(img_id, b) for img_id, b in zip(img_ids, images) if img_id not in results]
+    if rest:
+        for item in analyze_images_concurrently([b for _, b in rest], user_intent, img_ids=[i for i, _ in rest]):
+            results[item["img_id"]] = item
+    return [results[i] for i in sorted(results)], aggregate
+
+
+# =========================================================
+# [Step 1 캐시] dHash 기반 분석 결과 재사용 + 거의 같은 사진 묶기
+# =========================================================
+_image_cache: Optional[ResponseCache] = None
+_image_cache_lock = threading.Lock()
+
+
+def _get_image_cache() -> Optional[ResponseCache]:
+    global _image_cache
+    if not IMAGE_CACHE_ENABLED:
+        return None
+    if _image_cache is None:
+        with _image_cache_lock:
+            if _image_cache is None:
+                _image_cache = ResponseCache(
+                    cache_dir=IMAGE_CACHE_DIR,
+                    ttl_sec=IMAGE_CACHE_TTL_SEC,
+                    max_bytes=IMAGE_CACHE_MAX_MB * 1024 * 1024,
+                )
+    return _image_cache
+
+
+# 예전 버전은 비전 호출 실패 문구를 설명으로 돌려줘서 캐시에 남아 있을 수 있음
+_VISION_ERROR_PREFIXES = ("OpenAI Vision Error", "Ollama Vision Error")
+
+
+def _image_cache_key(image_bytes: bytes, phash: Optional[str], user_intent: str) -> str:
+    # 분석 프롬프트를 고치면 키도 바뀌도록 템플릿 원문을 포함
+    return ResponseCache.make_key(
+        kind="image_analysis",
+        image=f"dhash:{phash}" if phash else image_digest(image_bytes),
+        user_intent=(user_intent or "").strip(),
+        model=USE_MODEL_VISION,
+        prompt=load_prompt("image_analysis"),
+    )
+
+
+def analyze_images_cached(
+    images: List[bytes],
+    user_intent: str = "",
+) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    (사진별 분석 결과 img_id 순서, 일괄 분석에서 함께 받은 통합 기획 또는 None)을 돌려줍니다.
+    - 같은 세트 안에서 dHash가 IMAGE_DUP_MAX_DISTANCE 이내인 사진은 앞 사진 결과를 복사 (duplicate_of)
+    - 대표 사진은 (dHash, 사진 의도, 비전 모델) 키로 디스크 캐시를 먼저 보고, 없을 때만 분석
+    - 통합 기획은 캐시에서 가져온 사진이 없을 때만 사용 (일부 사진만 보고 만든 기획이 되지 않도록)
+    """
+    hashes = [dhash(b) for b in images]
+    groups = group_near_duplicates(hashes, IMAGE_DUP_MAX_DISTANCE)
+    cache = _get_image_cache()
+
+    results: Dict[int, Dict[str, Any]] = {}
+    keys: Dict[int, str] = {}
+    run_ids: List[int] = []
+    run_images: List[bytes] = []
+    for i, img_bytes in enumerate(images):
+        if groups[i] != i:
+            continue
+        img_id = i + 1
+        keys[img_id] = _image_cache_key(img_bytes, hashes[i], user_intent)
+        cached = cache.get(keys[img_id]) if cache is not None else None
+        if cached:
+            try:
+                entry = json.loads(cached)
+                if not str(entry.get("desc", "")).startswith(_VISION_ERROR_PREFIXES):
+                    results[img_id] = {"img_id": img_id, **entry, "cached": True}
+                    continue
+            except (ValueError, AttributeError):
+                pass
+            # 깨졌거나 실패 문구가 저장된 항목은 지우고 다시 분석
+            cache.delete(keys[img_id])
+        run_ids.append(img_id)
+        run_images.append(img_bytes)
+
+    analyzed, aggregate = _analyze_uncached(run_images, run_ids, user_intent)
+    for item in analyzed:
+        results[item["img_id"]] = item
+        if cache is not None and not (item.get("failed") or item.get("timed_out")):
+            cache.set(keys[item["img_id"]], json.dumps({"desc": item["desc"], "tags": item["tags"]}, ensure_ascii=False))
+
+    duplicates = 0
+    for i, rep in groups.items():
+        if rep == i:
+            continue
+        duplicates += 1
+        source = results[rep + 1]
+        results[i + 1] = {
+            "img_id": i + 1,
+            "desc": source.get("desc", ""),
+            "tags": list(source.get("tags", [])),
+            "duplicate_of": rep + 1,
+            **{k: True for k in ("failed", "timed_out") if source.get(k)},
+        }
+
+    reused = len(keys) - len(run_ids)
+    if reused or duplicates:
+        print(f"🗂️ 사진 {len(images)}장 중 캐시 재사용 {reused}장, 비슷한 사진 {duplicates}장 묶음 → 분석 {len(run_ids)}장")
+    return [results[k] for k in sorted(results)], (aggregate if reused == 0 else None)
+
+
 # =========================================================
 # [메인 진입점] Step2에서 호출
 # =========================================================
+@trace_span("agent.analyze_image_agent")
 def analyze_image_agent(images: list, user_intent: str = "") -> str:
     """
     [메인 진입점 - Bottom-up 방식]
@@ -333,18 +794,27 @@ def analyze_image_agent(images: list, user_intent: str = "") -> str:
     if not isinstance(images, list):
         images = [images]
     
-    # Step 1: 개별 분석
-    individual_analyses = []
-    for idx, img_bytes in enumerate(images, start=1):
-        analysis = analyze_single_image(img_bytes, img_id=idx, user_intent=user_intent)
-        individual_analyses.append(analysis)
+    # Step 1: 개별 분석 (캐시/비슷한 사진 묶기 후 나머지만 일괄 또는 동시 분석, img_id 순서 유지)
+    individual_analyses, batch_aggregate = analyze_images_cached(images, user_intent=user_intent)
     
-    # Step 2: 통합 기획
-    unified_result = aggregate_and_plan(
-        individual_analyses=individual_analyses,
-        user_intent=user_intent,
-        n_topics=TOPIC_N
-    )
+    # Step 2: 통합 기획 (일괄 분석 응답에 있으면 그대로 사용, 없으면 텍스트 모델 호출)
+    # 시간 초과/실패한 사진은 빼고 기획. 전부 실패했으면 오류로 올려 Step2에서 다시 시도하게 함
+    # (실패 결과는 캐시에 남지 않으므로 다시 누르면 해당 사진만 새로 분석)
+    usable = [a for a in individual_analyses if not (a.get("timed_out") or a.get("failed"))]
+    if not usable:
+        raise RuntimeError(f"사진 {len(individual_analyses)}장 모두 분석에 실패했습니다. 잠시 후 다시 시도해주세요.")
+    if batch_aggregate is not None:
+        unified_result = batch_aggregate
+    else:
+        unified_result = aggregate_and_plan(
+            individual_analyses=usable,
+            user_intent=user_intent,
+            n_topics=TOPIC_N
+        )
+    usable_ids = {a["img_id"] for a in usable}
+    skipped = [a["img_id"] for a in individual_analyses if a["img_id"] not in usable_ids]
+    if skipped:
+        unified_result["skipped_image_ids"] = skipped
     
     return json.dumps(unified_result, ensure_ascii=False)
 
@@ -0,0 +1,98 @@
+# Ollama 모델 미리 로드(warm-up) + 콜드/웜 지연 통계
+# 유휴 시간 뒤 Ollama가 모델을 내리면 첫 호출에서 모델 로드 시간이 그대로 사용자 대기시간이 됨
+# - 앱 시작 시 MODEL_TEXT / MODEL_VISION을 모든 Ollama 서버에 백그라운드로 로드 (프로세스당 1회)
+# - 모든 호출에 keep_alive(OLLAMA_KEEP_ALIVE)를 넘겨 모델이 내려가지 않게 유지
+# - 응답의 load_duration으로 콜드 스타트 여부를 판단해 모델별 지연 통계 기록
+
+# model_warmup.py
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from config import MODEL_TEXT, MODEL_VISION, OLLAMA_KEEP_ALIVE, LLM_WARMUP_ENABLED, resolve_api_mode
+from agents.ollama_router import get_ollama_router
+from utils.token_budget import ollama_ctx_options
+
+# 모델 로드에 이 시간 이상 걸렸으면 콜드 스타트로 봄
+_COLD_LOAD_SEC = 0.5
+
+_started = False
+_start_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_load_stats: Dict[str, Dict[str, Any]] = {}
+
+
+def _field(res: Any, name: str) -> Any:
+    if isinstance(res, dict):
+        return res.get(name)
+    return getattr(res, name, None)
+
+
+def record_model_load(model: str, res: Any, elapsed_sec: float) -> None:
+    """Ollama 응답(마지막 스트림 조각 포함)의 load_duration으로 콜드/웜 호출을 나눠 기록합니다."""
+    load_ns = _field(res, "load_duration")
+    if load_ns is None:
+        return
+    load_sec = float(load_ns) / 1e9
+    kind = "cold" if load_sec >= _COLD_LOAD_SEC else "warm"
+    with _stats_lock:
+        st = _load_stats.setdefault(
+            model,
+            {"cold": 0, "warm": 0, "cold_total_sec": 0.0, "warm_total_sec": 0.0, "load_total_sec": 0.0, "last_cold_at": None},
+        )
+        st[kind] += 1
+        st[f"{kind}_total_sec"] += elapsed_sec
+        if kind == "cold":
+            st["load_total_sec"] += load_sec
+            st["last_cold_at"] = time.time()
+
+
+def model_load_stats() -> Dict[str, Dict[str, Any]]:
+    """모델별 콜드/웜 호출 수와 평균 지연(초), 평균 모델 로드 시간"""
+    out = {}
+    with _stats_lock:
+        for model, st in _load_stats.items():
+            out[model] = {
+                "cold": st["cold"],
+                "warm": st["warm"],
+                "cold_avg_sec": round(st["cold_total_sec"] / st["cold"], 3) if st["cold"] else None,
+                "warm_avg_sec": round(st["warm_total_sec"] / st["warm"], 3) if st["warm"] else None,
+                "load_avg_sec": round(st["load_total_sec"] / st["cold"], 3) if st["cold"] else None,
+                "last_cold_at": st["last_cold_at"],
+            }
+    return out
+
+
+def warm_up_models(models: Optional[list] = None) -> None:
+    """
+    각 Ollama 서버에 모델을 로드해 둡니다. (빈 프롬프트 generate = 생성 없이 로드만)
+    서버별 설치 모델 목록을 알면 설치된 모델만 로드합니다.
+    """
+    router = get_ollama_router()
+    for model in models or [MODEL_TEXT, MODEL_VISION]:
+        for ep in router.endpoints:
+            if not ep.has_model(model):
+                continue
+            started = time.perf_counter()
+            try:
+                # num_ctx가 다르면 첫 호출에서 모델을 다시 로드하므로 실제 호출과 같은 값으로 로드
+                res = ep.client().generate(
+                    model=model, prompt="", options=ollama_ctx_options(), keep_alive=OLLAMA_KEEP_ALIVE
+                )
+                elapsed = time.perf_counter() - started
+                record_model_load(model, res, elapsed)
+                print(f"🔥 모델 미리 로드 완료: {model} @ {ep.label} ({elapsed:.1f}s)")
+            except Exception as e:
+                print(f"⚠️ 모델 미리 로드 실패: {model} @ {ep.label} ({e})")
+
+
+def start_model_warmup() -> None:
+    """앱 시작 시 호출. 백그라운드 스레드로 한 번만 실행하고 바로 반환합니다. (Ollama 모드에서만)"""
+    global _started
+    if not LLM_WARMUP_ENABLED or resolve_api_mode() != "ollama":
+        return
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=warm_up_models, daemon=True, name="ollama-warmup").start()
@@ -7,12 +7,13 @@
 import json
 import os
 import re
+import threading
 import time
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
-import ollama
-from openai import OpenAI, RateLimitError
+from ollama import ResponseError
+from openai import BadRequestError
 
 from config import (
     MODEL_TEXT,
@@ -20,9 +21,32 @@ from config import (
     API_KEY,
     BASE_URL,
     ENV_API_MODE,
+    LLM_NATIVE_JSON,
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_BACKUP_MODEL,
+    OLLAMA_KEEP_ALIVE,
     resolve_api_mode,
     normalize_openai_model,
 )
+from agents.backend_limiter import acquire_slot, slotted
+from agents.client_pool import get_openai_client
+from agents.hedging import HedgeCancelled, run_hedged
+from agents.model_warmup import record_model_load
+from agents.ollama_router import get_ollama_router
+from agents.prefix_cache import openai_cache_kwargs, record_ollama_usage, record_openai_usage
+from agents.resilience import call_with_retry
+from utils.json_stream import StreamingJsonParser
+from utils.llm_cassette import get_cassette, request_key
+from utils.llm_usage import session_budget_exceeded
+from utils.llm_metrics import (
+    note_first_token,
+    note_ollama_response,
+    note_openai_usage,
+    note_parse_failure,
+    track_llm_call,
+)
+from utils.response_cache import get_response_cache
+from utils.token_budget import ollama_ctx_options
 
 # =========================================================
 # 🔐 환경설정 및 모드 자동 감지 (OpenAI/Ollama 하이브리드)
@@ -30,6 +54,45 @@ from config import (
 # API 모드 결정 로직 (config와 동일한 기준)
 API_MODE = resolve_api_mode()
 
+JSON_GUARD = (
+    "반드시 JSON '객체'만 출력하세요.\n"
+    "설명 문장, 마크다운, 코드블록, 주석은 출력하지 마세요."
+)
+
+
+_SCHEMA_TYPES = {"string", "number", "integer", "boolean", "null", "object", "array"}
+
+
+def schema_hint_to_json_schema(hint: Any) -> Dict[str, Any]:
+    """
+    에이전트들이 쓰는 간단한 스키마 힌트를 JSON Schema로 변환합니다.
+    - "string" / "number" / "integer" / "boolean" → 해당 타입 ("integer|null"처럼 | 로 여러 타입)
+    - ["string"] → 문자열 배열, {"a": ...} → 모든 키가 필수인 객체
+    - 이미 JSON Schema({"type": "object", "properties": ...})면 그대로 사용
+    """
+    if isinstance(hint, dict):
+        if hint.get("type") in _SCHEMA_TYPES and ("properties" in hint or "items" in hint):
+            return hint
+        return {
+            "type": "object",
+            "properties": {k: schema_hint_to_json_schema(v) for k, v in hint.items()},
+            "required": list(hint.keys()),
+        }
+    if isinstance(hint, list):
+        return {"type": "array", "items": schema_hint_to_json_schema(hint[0]) if hint else {}}
+    if isinstance(hint, str):
+        types = [t.strip() for t in hint.split("|") if t.strip() in _SCHEMA_TYPES]
+        if types:
+            return {"type": types[0] if len(types) == 1 else types}
+        return {"type": "string"}
+    if isinstance(hint, bool):
+        return {"type": "boolean"}
+    if isinstance(hint, int):
+        return {"type": "integer"}
+    if isinstance(hint, float):
+        return {"type": "number"}
+    return {}
+
 
 class OllamaClient:
     def __init__(self, model: str = MODEL_TEXT):
@@ -46,7 +109,13 @@ class OllamaClient:
                 self.mode = "ollama"
                 self.model = MODEL_TEXT
             else:
-                self.client = OpenAI(api_key=API_KEY, base_url=BASE_URL)
+                self.client = get_openai_client()
+
+        # ollama는 라우터가 요청마다 서버를 고름 (OLLAMA_HOSTS, 서버별 공용 클라이언트 재사용)
+        self.router = get_ollama_router() if self.mode == "ollama" else None
+
+        # 백엔드가 JSON 제약 디코딩을 거부하면 False로 바꾸고 이후엔 프롬프트 방식만 사용
+        self._native_json_ok = LLM_NATIVE_JSON
 
         # 현재 모델/모드 기록 (assets에 로그)
         self._log_model_usage()
@@ -69,17 +138,16 @@ class OllamaClient:
             # 로깅 실패는 기능에 영향 주지 않도록 무시
             pass
 
-    def _retry_openai(self, func):
-        """OpenAI Rate Limit 재시도 로직"""
-        for i in range(3):
-            try:
-                return func()
-            except RateLimitError:
-                print(f"⏳ Rate Limit. Retrying in {2**(i+1)}s...")
-                time.sleep(2**(i+1))
-            except Exception as e:
-                raise e
-        raise Exception("OpenAI API Retry Failed")
+    @property
+    def backend(self) -> str:
+        return "openai" if (self.mode == "openai" and self.client) else "ollama"
+
+    def _with_retry(self, func, slot: bool = True):
+        """
+        일시 오류 재시도 + 서킷 브레이커 (agents/resilience.py, OpenAI/Ollama 공통)
+        백엔드 슬롯은 시도마다 잡고 놓음 (slot=False면 func가 직접 슬롯을 관리. 스트림용)
+        """
+        return call_with_retry(self.backend, slotted(self.backend, func) if slot else func)
 
     @staticmethod
     def _strip_code_fences(text: str) -> str:
@@ -91,7 +159,7 @@ class OllamaClient:
     def _extract_first_json_object(text: str) -> Dict[str, Any]:
         """
         LLM 응답에 설명/잡텍스트가 섞여도 첫 JSON 객체를 최대한 복구.
-        - 중괄호 카운팅으로 가장 앞쪽 JSON 객체 1개만 잘라냄
+        - 문자열/이스케이프를 고려한 중괄호 추적으로 가장 앞쪽 JSON 객체 1개만 잘라냄
         """
         if not text or not text.strip():
             raise ValueError("빈 응답")
@@ -106,80 +174,473 @@ class OllamaClient:
         except Exception:
             pass
 
-        # 일반 경로
-        start = text.find("{")
-        if start == -1:
+        # 일반 경로: 스트리밍 파서로 가장 앞쪽 JSON 객체 1개만 잘라냄
+        parser = StreamingJsonParser()
+        parser.feed(text)
+        if not parser.started:
             raise ValueError(f"JSON 시작 '{{'를 찾지 못했습니다. 일부: {text[:200]}")
 
-        depth = 0
-        in_str = False
-        esc = False
-
-        for i in range(start, len(text)):
-            ch = text[i]
-
-            if in_str:
-                if esc:
-                    esc = False
-                elif ch == "\\":
-                    esc = True
-                elif ch == '"':
-                    in_str = False
-                continue
-
-            if ch == '"':
-                in_str = True
-                continue
-
-            if ch == "{":
-                depth += 1
-            elif ch == "}":
-                depth -= 1
-                if depth == 0:
-                    candidate = text[start : i + 1]
-                    try:
-                        return json.loads(candidate)
-                    except Exception as e:
-                        raise ValueError(
-                            f"JSON 파싱 실패: {e}. 후보 일부: {candidate[:200]}"
-                        ) from e
+        if parser.done:
+            candidate = parser.object_text
+            try:
+                return json.loads(candidate, strict=False)
+            except Exception as e:
+                raise ValueError(
+                    f"JSON 파싱 실패: {e}. 후보 일부: {candidate[:200]}"
+                ) from e
 
         raise ValueError(f"JSON 객체를 끝까지 찾지 못했습니다. 일부: {text[:200]}")
 
+    def _cache_key(
+        self,
+        cache,
+        system_role: str,
+        prompt: str,
+        temperature: float,
+        top_p: float,
+        json_format: Any = None,
+    ) -> Optional[str]:
+        if cache is None:
+            return None
+        parts = dict(
+            mode=self.mode,
+            model=self.model,
+            system_role=system_role,
+            prompt=prompt,
+            temperature=temperature,
+            top_p=top_p,
+        )
+        if json_format is not None:
+            parts["json_format"] = json_format
+        return cache.make_key(**parts)
+
+    def _native_json_format(self, schema: Optional[Dict[str, Any]]) -> Any:
+        """generate_json에서 쓸 제약 디코딩 형식. 사용 불가면 None."""
+        if not self._native_json_ok:
+            return None
+        return schema_hint_to_json_schema(schema) if schema else "json"
+
+    def _disable_native_json_if_unsupported(self, err: Exception) -> bool:
+        """백엔드가 format/response_format을 거부한 오류(400)면 끄고 True를 반환합니다."""
+        unsupported = isinstance(err, BadRequestError) or (
+            isinstance(err, ResponseError) and getattr(err, "status_code", None) == 400
+        )
+        if unsupported:
+            self._native_json_ok = False
+            print(f"⚠️ JSON 제약 디코딩 미지원({self.model}). 프롬프트 방식으로 전환합니다: {err}")
+        return unsupported
+
+    @staticmethod
+    def _openai_format_kwargs(json_format: Any) -> Dict[str, Any]:
+        if json_format is None:
+            return {}
+        if isinstance(json_format, dict):
+            return {
+                "response_format": {
+                    "type": "json_schema",
+                    "json_schema": {"name": "response", "schema": json_format, "strict": False},
+                }
+            }
+        return {"response_format": {"type": "json_object"}}
+
+    @staticmethod
+    def _ollama_format_kwargs(json_format: Any) -> Dict[str, Any]:
+        return {} if json_format is None else {"format": json_format}
+
+    @staticmethod
+    def _messages(system_role: str, prompt: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": system_role},
+            {"role": "user", "content": prompt},
+        ]
+
+    @staticmethod
+    def _json_system(system_role: str) -> str:
+        """JSON 가드는 시스템 메시지 끝에 고정 → 호출마다 같은 prefix라 백엔드 KV 캐시를 재사용"""
+        return f"{system_role}\n\n{JSON_GUARD}"
+
+    @staticmethod
+    def _json_prompt(prompt: str, after_failure: bool = False) -> str:
+        """직전 파싱이 실패했으면 교정 문구를 프롬프트 끝에 붙입니다. (앞쪽 prefix는 그대로 유지)"""
+        if after_failure:
+            return f"{prompt}\n\n[주의] 직전 출력은 JSON 형식이 아닙니다. JSON 객체만 다시 출력하세요."
+        return prompt
+
     def generate_text(
         self,
         system_role: str,
         prompt: str,
         temperature: float = 0.4,
         top_p: float = 0.9,
+        bypass_cache: bool = False,
+        json_format: Any = None,
+        hedge: Optional[str] = None,
+        use_cache: bool = True,
+    ) -> str:
+        """
+        텍스트 생성. LLM_CACHE_ENABLED면 동일 요청은 디스크 캐시에서 반환합니다.
+        bypass_cache=True면 캐시를 읽지 않고 새로 샘플링한 결과로 캐시를 갱신합니다.
+        json_format: None(자유 텍스트) | "json"(JSON 객체) | dict(JSON Schema)
+        hedge: 호출 이름을 주면 헤징 대상 (느리면 다른 서버/모델로 예비 요청, agents/hedging.py)
+        use_cache=False면 캐시를 읽지도 쓰지도 않음 (generate_json은 파싱 성공 후 직접 저장)
+        """
+        with track_llm_call("text", self.backend, self.model, f"{system_role}\n{prompt}") as call:
+            cache = get_response_cache() if use_cache else None
+            cache_key = self._cache_key(cache, system_role, prompt, temperature, top_p, json_format)
+            if cache_key and not bypass_cache:
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    call.cache_hit()
+                    call.set_response(cached)
+                    return cached
+
+            if hedge and self._can_hedge():
+                text = self._generate_text_hedged(hedge, system_role, prompt, temperature, top_p, json_format)
+            else:
+                text = self._generate_text_uncached(system_role, prompt, temperature, top_p, json_format)
+            call.set_response(text)
+            if cache_key and text:
+                cache.set(cache_key, text)
+            return text
+
+    def _backup_client(self) -> "OllamaClient":
+        return get_shared_client(model=LLM_HEDGE_BACKUP_MODEL) if LLM_HEDGE_BACKUP_MODEL else self
+
+    def _can_hedge(self) -> bool:
+        """
+        예비 요청을 보낼 곳이 따로 있을 때만 헤징: 다른 백업 모델 또는 건강한 Ollama 서버 2대 이상
+        (같은 서버/같은 모델로 한 번 더 보내면 부하와 비용만 늘어남, OpenAI는 백업 모델이 있어야 함)
+        """
+        if not LLM_HEDGE_ENABLED:
+            return False
+        # 세션 토큰 예산을 넘었으면 같은 요청을 두 번 보내지 않음
+        if session_budget_exceeded():
+            return False
+        if LLM_HEDGE_BACKUP_MODEL and self._backup_client().model != self.model:
+            return True
+        return self.router is not None and sum(1 for ep in self.router.endpoints if ep.healthy) > 1
+
+    def _collect_stream(
+        self,
+        cancel: threading.Event,
+        system_role: str,
+        prompt: str,
+        temperature: float,
+        top_p: float,
+        json_format: Any = None,
+    ) -> str:
+        """스트리밍으로 끝까지 받되, cancel이 set되면 스트림을 닫고 HedgeCancelled"""
+        parts: List[str] = []
+        stream = self._stream_text_uncached(system_role, prompt, temperature, top_p, json_format)
+        try:
+            for chunk in stream:
+                if cancel.is_set():
+                    raise HedgeCancelled()
+                parts.append(chunk)
+        finally:
+            stream.close()
+        return "".join(parts)
+
+    def _generate_text_hedged(
+        self,
+        name: str,
+        system_role: str,
+        prompt: str,
+        temperature: float,
+        top_p: float,
+        json_format: Any = None,
+    ) -> str:
+        backup = self._backup_client()
+        return run_hedged(
+            name,
+            lambda cancel: self._collect_stream(cancel, system_role, prompt, temperature, top_p, json_format),
+            lambda cancel: backup._collect_stream(cancel, system_role, prompt, temperature, top_p, json_format),
+        )
+
+    def _cassette_key(self, system_role: str, prompt: str, temperature: float, top_p: float, json_format: Any = None) -> str:
+        # 일반/스트리밍 호출이 같은 키를 씀 → 어느 쪽으로 녹화해도 재생 가능
+        return request_key(
+            "chat",
+            model=self.model,
+            system_role=system_role,
+            prompt=prompt,
+            temperature=temperature,
+            top_p=top_p,
+            json_format=json_format,
+        )
+
+    def _generate_text_uncached(
+        self,
+        system_role: str,
+        prompt: str,
+        temperature: float,
+        top_p: float,
+        json_format: Any = None,
+    ) -> str:
+        cassette = get_cassette()
+        if cassette is None:
+            return self._generate_text_live(system_role, prompt, temperature, top_p, json_format)
+        return cassette.call(
+            "text",
+            self.model,
+            self._cassette_key(system_role, prompt, temperature, top_p, json_format),
+            lambda: self._generate_text_live(system_role, prompt, temperature, top_p, json_format),
+        )
+
+    def _generate_text_live(
+        self,
+        system_role: str,
+        prompt: str,
+        temperature: float,
+        top_p: float,
+        json_format: Any = None,
     ) -> str:
+        messages = self._messages(system_role, prompt)
         if self.mode == "openai" and self.client:
             def _call():
                 return self.client.chat.completions.create(
                     model=self.model,
-                    messages=[
-                        {"role": "system", "content": system_role},
-                        {"role": "user", "content": prompt},
-                    ],
+                    messages=messages,
                     temperature=temperature,
                     top_p=top_p,
-                ).choices[0].message.content
+                    **self._openai_format_kwargs(json_format),
+                    **openai_cache_kwargs(messages),
+                )
 
-            return self._retry_openai(_call) or ""
+            res = self._with_retry(_call)
+            record_openai_usage(self.model, getattr(res, "usage", None))
+            note_openai_usage(getattr(res, "usage", None))
+            return res.choices[0].message.content or ""
 
-        res = ollama.chat(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": system_role},
-                {"role": "user", "content": prompt},
-            ],
-            options={
-                "temperature": temperature,
-                "top_p": top_p,
-            },
-        )
+        def _ollama_call():
+            # 재시도마다 다시 라우팅 → 실패한 서버 대신 다른 서버로 감
+            with self.router.route(self.model) as ep:
+                return ep.client().chat(
+                    model=self.model,
+                    messages=messages,
+                    options={
+                        "temperature": temperature,
+                        "top_p": top_p,
+                        **ollama_ctx_options(),
+                    },
+                    keep_alive=OLLAMA_KEEP_ALIVE,
+                    **self._ollama_format_kwargs(json_format),
+                )
+
+        started = time.perf_counter()
+        res = self._with_retry(_ollama_call)
+        elapsed = time.perf_counter() - started
+        record_model_load(self.model, res, elapsed)
+        record_ollama_usage(self.model, res, messages)
+        note_ollama_response(res, elapsed)
         return (res.get("message") or {}).get("content", "") or ""
 
+    def generate_text_stream(
+        self,
+        system_role: str,
+        prompt: str,
+        temperature: float = 0.4,
+        top_p: float = 0.9,
+        bypass_cache: bool = False,
+    ) -> Iterator[str]:
+        """
+        generate_text의 스트리밍 버전. 생성되는 텍스트 조각(chunk)을 순서대로 yield 합니다.
+        끝까지 받은 응답만 캐시에 저장합니다. (캐시 히트 시 전체 텍스트를 한 번에 yield)
+        """
+        cache = get_response_cache()
+        cache_key = self._cache_key(cache, system_role, prompt, temperature, top_p)
+        if cache_key and not bypass_cache:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        parts: List[str] = []
+        for chunk in self._stream_text_uncached(system_role, prompt, temperature, top_p):
+            if chunk:
+                parts.append(chunk)
+                yield chunk
+
+        text = "".join(parts)
+        if cache_key and text:
+            cache.set(cache_key, text)
+
+    def stream_json_object(
+        self,
+        system_role: str,
+        prompt: str,
+        temperature: float = 0.4,
+        top_p: float = 0.9,
+        bypass_cache: bool = False,
+        on_field: Optional[Callable[[str, Any], None]] = None,
+        on_chunk: Optional[Callable[[StreamingJsonParser], None]] = None,
+    ) -> str:
+        """
+        스트리밍으로 받으면서 StreamingJsonParser에 넣고, 첫 JSON 객체가 닫히면 바로 생성을 끊습니다.
+        (객체 뒤에 붙는 설명/잡담 토큰을 기다리거나 비용을 내지 않음)
+        - on_field(key, value): 최상위 필드가 닫힐 때마다 호출
+        - on_chunk(parser): 청크를 파싱할 때마다 호출 (parser.snapshot()으로 중간 값 확인)
+        반환값은 지금까지 받은 텍스트이며, 객체가 완성되고 JSON으로 파싱될 때만 캐시에 저장합니다.
+        (파싱되지 않는 캐시 항목은 지우고 다시 생성)
+        """
+        with track_llm_call("stream_json", self.backend, self.model, f"{system_role}\n{prompt}") as call:
+            cache = get_response_cache()
+            cache_key = self._cache_key(cache, system_role, prompt, temperature, top_p)
+            cached = cache.get(cache_key) if (cache_key and not bypass_cache) else None
+            if cached is not None:
+                try:
+                    self._extract_first_json_object(cached)
+                    call.cache_hit()
+                except ValueError:
+                    cache.delete(cache_key)
+                    cached = None
+
+            parser = StreamingJsonParser()
+            chunks = [cached] if cached is not None else self._stream_text_uncached(system_role, prompt, temperature, top_p)
+            try:
+                for chunk in chunks:
+                    for key, value in parser.feed(chunk):
+                        if on_field:
+                            on_field(key, value)
+                    if on_chunk:
+                        on_chunk(parser)
+                    if parser.done:
+                        break
+            finally:
+                close = getattr(chunks, "close", None)
+                if close:
+                    close()
+
+            call.set_response(parser.text)
+            if cached is None and cache_key and parser.done:
+                try:
+                    self._extract_first_json_object(parser.text)
+                    cache.set(cache_key, parser.text)
+                except ValueError as e:
+                    print(f"⚠️ 스트리밍 JSON 파싱 실패, 캐시하지 않음: {e}")
+            return parser.text
+
+    def _stream_text_uncached(
+        self,
+        system_role: str,
+        prompt: str,
+        temperature: float,
+        top_p: float,
+        json_format: Any = None,
+    ) -> Iterator[str]:
+        cassette = get_cassette()
+        if cassette is None:
+            stream = self._stream_text_live(system_role, prompt, temperature, top_p, json_format)
+        else:
+            stream = cassette.stream(
+                "stream",
+                self.model,
+                self._cassette_key(system_role, prompt, temperature, top_p, json_format),
+                lambda: self._stream_text_live(system_role, prompt, temperature, top_p, json_format),
+            )
+        return self._observe_first_token(stream)
+
+    @staticmethod
+    def _observe_first_token(stream: Iterator[str]) -> Iterator[str]:
+        """첫 텍스트 조각이 나온 시점을 현재 호출의 TTFT로 기록 (llm_metrics)"""
+        try:
+            for chunk in stream:
+                if chunk:
+                    note_first_token()
+                yield chunk
+        finally:
+            stream.close()
+
+    def _stream_text_live(
+        self,
+        system_role: str,
+        prompt: str,
+        temperature: float,
+        top_p: float,
+        json_format: Any = None,
+    ) -> Iterator[str]:
+        messages = self._messages(system_role, prompt)
+        if self.mode == "openai" and self.client:
+            # 재시도는 스트림 연결(첫 응답)까지만 적용. 슬롯은 스트림을 다 읽거나 닫을 때까지 유지
+            def _open_openai_stream():
+                release = acquire_slot(self.backend)
+                try:
+                    return release, self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=temperature,
+                        top_p=top_p,
+                        stream=True,
+                        **self._openai_format_kwargs(json_format),
+                        **openai_cache_kwargs(messages, stream=True),
+                    )
+                except Exception:
+                    release()
+                    raise
+
+            release, stream = self._with_retry(_open_openai_stream, slot=False)
+            try:
+                for event in stream:
+                    if getattr(event, "usage", None):
+                        record_openai_usage(self.model, event.usage)
+                        note_openai_usage(event.usage)
+                    if event.choices:
+                        yield event.choices[0].delta.content or ""
+            finally:
+                stream.close()
+                release()
+            return
+
+        def _open_stream():
+            # ollama 스트림은 첫 조각을 읽을 때 요청이 나가므로, 첫 조각까지 받아야 연결 성공으로 봄
+            release = acquire_slot(self.backend)
+            try:
+                ep = self.router.acquire(self.model)
+            except Exception:
+                release()
+                raise
+            try:
+                stream = ep.client().chat(
+                    model=self.model,
+                    messages=messages,
+                    options={
+                        "temperature": temperature,
+                        "top_p": top_p,
+                        **ollama_ctx_options(),
+                    },
+                    stream=True,
+                    keep_alive=OLLAMA_KEEP_ALIVE,
+                    **self._ollama_format_kwargs(json_format),
+                )
+                return ep, stream, next(stream, None), release
+            except Exception as e:
+                self.router.release(ep, e)
+                release()
+                raise
+
+        started = time.perf_counter()
+        ep, stream, first, release = self._with_retry(_open_stream, slot=False)
+        err = None
+        try:
+            if first is not None:
+                yield (first.get("message") or {}).get("content", "") or ""
+            for part in stream:
+                if part.get("done"):
+                    # 마지막 조각에 load_duration 등 통계가 들어 있음
+                    elapsed = time.perf_counter() - started
+                    record_model_load(self.model, part, elapsed)
+                    record_ollama_usage(self.model, part, messages)
+                    note_ollama_response(part, elapsed)
+                yield (part.get("message") or {}).get("content", "") or ""
+        except Exception as e:
+            err = e
+            raise
+        finally:
+            # 소비자가 중간에 멈추면 HTTP 스트림도 바로 닫음
+            stream.close()
+            self.router.release(ep, err)
+            release()
+
     def generate_json(
         self,
         system_role: str,
@@ -187,35 +648,121 @@ class OllamaClient:
         temperature: float = 0.2,
         top_p: float = 0.9,
         retries: int = 2,
+        bypass_cache: bool = False,
+        schema: Optional[Dict[str, Any]] = None,
+        hedge: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         JSON 객체만 반환하도록 유도 + 파싱 실패 시 재시도
         retries=2면 총 3번 시도(1회 + 2회 재시도)
+
+        첫 시도는 백엔드의 JSON 제약 디코딩(Ollama format / OpenAI response_format)을 사용하고,
+        schema(스키마 힌트 또는 JSON Schema)를 주면 그 구조로 생성을 강제합니다.
+        프롬프트 가드 + 파싱 재시도는 제약 디코딩이 실패/미지원일 때만 사용됩니다.
         """
-        json_guard = (
-            "반드시 JSON '객체'만 출력하세요.\n"
-            "설명 문장, 마크다운, 코드블록, 주석은 출력하지 마세요."
+        with track_llm_call("json", self.backend, self.model, f"{system_role}\n{prompt}") as call:
+            last_err: Optional[Exception] = None
+            system_role = self._json_system(system_role)
+            cur_prompt = self._json_prompt(prompt)
+            attempts = retries + 1
+
+            json_format = self._native_json_format(schema)
+            if json_format is not None:
+                try:
+                    result = self._generate_json_once(
+                        call, system_role, cur_prompt, temperature, top_p, json_format,
+                        read_cache=not bypass_cache, hedge=hedge,
+                    )
+                    call.set_response(result)
+                    return result
+                except ValueError as e:
+                    # 파싱 실패: 한 번 시도한 것으로 보고 교정 프롬프트로 재시도
+                    note_parse_failure()
+                    last_err = e
+                    attempts -= 1
+                    cur_prompt = self._json_prompt(prompt, after_failure=True)
+                except Exception as e:
+                    if not self._disable_native_json_if_unsupported(e):
+                        raise
+
+            for attempt in range(attempts):
+                try:
+                    # 파싱에 실패한 뒤의 재시도는 캐시를 건너뛰고 모델에 다시 요청
+                    result = self._generate_json_once(
+                        call, system_role, cur_prompt, temperature, top_p, None,
+                        read_cache=not bypass_cache and last_err is None, hedge=hedge,
+                    )
+                    call.set_response(result)
+                    return result
+                except ValueError as e:
+                    note_parse_failure()
+                    last_err = e
+                    # 다음 시도에서 더 강하게 교정
+                    cur_prompt = self._json_prompt(prompt, after_failure=True)
+
+            raise last_err if last_err else ValueError("JSON 생성 실패")
+
+    def _generate_json_once(
+        self,
+        call,
+        system_role: str,
+        prompt: str,
+        temperature: float,
+        top_p: float,
+        json_format: Any,
+        read_cache: bool,
+        hedge: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        generate_json의 시도 1번. 캐시에는 JSON 파싱에 성공한 응답만 저장합니다.
+        캐시에 깨진 응답이 남아 있으면(예전 버전에서 저장된 것 등) 지우고 모델에 다시 요청합니다.
+        """
+        cache = get_response_cache()
+        cache_key = self._cache_key(cache, system_role, prompt, temperature, top_p, json_format)
+        if cache_key and read_cache:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                try:
+                    result = self._extract_first_json_object(cached)
+                    call.cache_hit()
+                    return result
+                except ValueError:
+                    cache.delete(cache_key)
+
+        text = self.generate_text(
+            system_role=system_role,
+            prompt=prompt,
+            temperature=temperature,
+            top_p=top_p,
+            json_format=json_format,
+            hedge=hedge,
+            use_cache=False,
         )
+        result = self._extract_first_json_object(text)
+        if cache_key:
+            cache.set(cache_key, text)
+        return result
 
-        last_err: Optional[Exception] = None
-        cur_prompt = f"{json_guard}\n\n{prompt}"
 
-        for attempt in range(retries + 1):
-            text = self.generate_text(
-                system_role=system_role,
-                prompt=cur_prompt,
-                temperature=temperature,
-                top_p=top_p,
-            )
-            try:
-                return self._extract_first_json_object(text)
-            except Exception as e:
-                last_err = e
-                # 다음 시도에서 더 강하게 교정
-                cur_prompt = (
-                    f"{json_guard}\n\n"
-                    f"[주의] 직전 출력은 JSON 형식이 아닙니다. JSON 객체만 다시 출력하세요.\n\n"
-                    f"{prompt}"
-                )
+# =========================================================
+# ♻️ 공용 클라이언트 레지스트리
+# =========================================================
+_shared_clients: Dict[tuple, OllamaClient] = {}
+_shared_lock = threading.Lock()
+
 
-        raise last_err if last_err else ValueError("JSON 생성 실패")
+def get_shared_client(model: str = MODEL_TEXT) -> OllamaClient:
+    """
+    (mode, model, base_url)별로 OllamaClient 하나를 프로세스 전체에서 재사용합니다.
+    Streamlit rerun마다 클라이언트를 새로 만들고 model_usage.log에 쓰는 비용을 없앱니다.
+    """
+    key = (API_MODE, model, BASE_URL if API_MODE == "openai" else None)
+    client = _shared_clients.get(key)
+    if client is not None:
+        return client
+    with _shared_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            client = OllamaClient(model=model)
+            _shared_clients[key] = client
+    return client
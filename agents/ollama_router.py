@@ -0,0 +1,233 @@
+# Ollama 여러 서버 라우팅
+# OLLAMA_HOSTS에 등록된 서버들 중 요청을 보낼 곳을 고름
+# - 진행 중 요청이 가장 적은 서버 우선 (least outstanding)
+# - 주기적 헬스 체크(list API)로 죽은 서버 제외 + 서버별 설치 모델 확인 (텍스트/비전 모델 구분)
+# - 세션 고정(sticky): 같은 세션은 가능하면 같은 서버로 보내 KV 캐시를 재사용
+# - 서버별 서킷 브레이커(agents/resilience.py): 차단된 서버는 건너뛰고, 모두 차단이면 즉시 실패
+# - 429(rate limit)를 받은 서버는 제외하지 않고 Retry-After 동안만 다른 서버 우선 (세션 고정 유지)
+# 중요! 세션 ID는 app.py에서 매 실행마다 set_route_session으로 지정
+
+# ollama_router.py
+import contextvars
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+import ollama
+
+from config import (
+    LLM_RETRY_BASE_DELAY_SEC,
+    OLLAMA_HOSTS,
+    OLLAMA_HEALTH_INTERVAL_SEC,
+    OLLAMA_HEALTH_TIMEOUT_SEC,
+    OLLAMA_STICKY_SLACK,
+)
+from agents.client_pool import get_ollama_client, get_async_ollama_client
+from agents.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    get_breaker,
+    is_rate_limited,
+    is_retryable,
+    record_outcome,
+    retry_after_sec,
+)
+
+# 현재 요청이 속한 세션 (스레드로 넘길 때는 contextvars.copy_context 사용)
+_route_session: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("ollama_route_session", default=None)
+
+_STICKY_MAX_SESSIONS = 1000
+
+
+def set_route_session(session_id: Optional[str]) -> None:
+    """현재 실행 흐름의 세션 ID 지정 (같은 세션은 같은 Ollama 서버로 보냄)"""
+    _route_session.set(session_id)
+
+
+def _base_model_name(name: str) -> str:
+    name = (name or "").strip()
+    return name[: -len(":latest")] if name.endswith(":latest") else name
+
+
+class OllamaEndpoint:
+    def __init__(self, host: Optional[str]):
+        self.host = host
+        self.outstanding = 0
+        self.healthy = True
+        self.models: Optional[Set[str]] = None  # None: 아직 모름 (모든 모델 가능으로 취급)
+        self.last_check = 0.0
+        self.checking = False
+        self.served = 0
+        self.failures = 0
+        self.backoff_until = 0.0  # 429를 받으면 이 시각(monotonic)까지 다른 서버 우선
+        self.breaker: CircuitBreaker = get_breaker("ollama", self.label)
+
+    @property
+    def label(self) -> str:
+        return self.host or "default"
+
+    def client(self) -> ollama.Client:
+        return get_ollama_client(self.host)
+
+    def async_client(self) -> ollama.AsyncClient:
+        return get_async_ollama_client(self.host)
+
+    def has_model(self, model: str) -> bool:
+        return self.models is None or _base_model_name(model) in self.models
+
+
+class OllamaRouter:
+    def __init__(self, hosts: List[Optional[str]]):
+        self.endpoints = [OllamaEndpoint(h) for h in (hosts or [None])]
+        self._lock = threading.Lock()
+        self._sticky: "OrderedDict[str, OllamaEndpoint]" = OrderedDict()
+
+    # -------------------------------------------------
+    # 헬스 체크
+    # -------------------------------------------------
+    def check_health(self, ep: OllamaEndpoint) -> None:
+        """list API로 살아있는지와 설치된 모델 목록을 갱신합니다."""
+        try:
+            res = get_ollama_client(ep.host, timeout=OLLAMA_HEALTH_TIMEOUT_SEC).list()
+            models = res.get("models") if isinstance(res, dict) else getattr(res, "models", None)
+            names = set()
+            for m in models or []:
+                name = getattr(m, "model", None) or (m.get("model") or m.get("name") if isinstance(m, dict) else None)
+                if name:
+                    names.add(_base_model_name(name))
+            with self._lock:
+                if not ep.healthy:
+                    print(f"✅ Ollama 서버 복구: {ep.label}")
+                ep.healthy = True
+                ep.models = names
+        except Exception as e:
+            with self._lock:
+                if ep.healthy:
+                    print(f"⚠️ Ollama 서버 응답 없음, 라우팅 제외: {ep.label} ({e})")
+                ep.healthy = False
+        finally:
+            with self._lock:
+                ep.last_check = time.monotonic()
+                ep.checking = False
+
+    def _refresh_stale(self) -> None:
+        # 오래된 서버 정보는 백그라운드에서 갱신 (요청 경로를 막지 않음)
+        now = time.monotonic()
+        stale = []
+        with self._lock:
+            for ep in self.endpoints:
+                if not ep.checking and now - ep.last_check >= OLLAMA_HEALTH_INTERVAL_SEC:
+                    ep.checking = True
+                    stale.append(ep)
+        for ep in stale:
+            threading.Thread(target=self.check_health, args=(ep,), daemon=True, name="ollama-health").start()
+
+    # -------------------------------------------------
+    # 선택 / 반납
+    # -------------------------------------------------
+    def _candidates(self, model: str) -> List[OllamaEndpoint]:
+        healthy = [ep for ep in self.endpoints if ep.healthy]
+        with_model = [ep for ep in healthy if ep.has_model(model)]
+        # 모델이 설치된 서버 → 살아있는 서버 → 전체 순으로 완화 (모두 죽었으면 그래도 시도)
+        return with_model or healthy or list(self.endpoints)
+
+    def acquire(self, model: str) -> OllamaEndpoint:
+        """
+        요청을 보낼 서버를 고르고 진행 중 요청 수를 올립니다. 끝나면 반드시 release
+        브레이커가 열린 서버는 제외하고, 모든 후보가 차단 중이면 CircuitOpenError
+        """
+        if len(self.endpoints) > 1:
+            self._refresh_stale()
+        session_id = _route_session.get()
+        with self._lock:
+            candidates = self._candidates(model)
+            open_eps = [ep for ep in candidates if not ep.breaker.available()]
+            candidates = [ep for ep in candidates if ep not in open_eps]
+            if not candidates:
+                soonest = min(open_eps, key=lambda ep: ep.breaker.retry_in())
+                raise CircuitOpenError(soonest.breaker.name, soonest.breaker.retry_in())
+            # 속도 제한으로 물러난 서버는 다른 후보가 있으면 잠시 건너뜀
+            now = time.monotonic()
+            ready = [ep for ep in candidates if ep.backoff_until <= now] or candidates
+            least = min(ep.outstanding for ep in ready)
+            chosen = None
+            prev = None
+            sticky_key = f"{session_id}|{_base_model_name(model)}" if session_id else None
+            if sticky_key:
+                prev = self._sticky.get(sticky_key)
+                if prev in ready and prev.outstanding <= least + OLLAMA_STICKY_SLACK:
+                    chosen = prev
+            if chosen is None:
+                chosen = random.choice([ep for ep in ready if ep.outstanding == least])
+            # 고정 서버가 잠시 물러난 것뿐이면 고정은 그대로 (대기가 끝나면 KV 캐시가 있는 서버로 복귀)
+            if sticky_key and not (prev in candidates and prev.backoff_until > now):
+                self._sticky[sticky_key] = chosen
+                self._sticky.move_to_end(sticky_key)
+                while len(self._sticky) > _STICKY_MAX_SESSIONS:
+                    self._sticky.popitem(last=False)
+            # half_open이면 이 요청이 시험 호출이 됨
+            chosen.breaker.before_call()
+            chosen.outstanding += 1
+            chosen.served += 1
+        return chosen
+
+    def release(self, ep: OllamaEndpoint, err: Optional[Exception] = None) -> None:
+        record_outcome(ep.breaker, err)
+        with self._lock:
+            ep.outstanding = max(0, ep.outstanding - 1)
+            if err is not None and is_rate_limited(err):
+                # 429는 서버가 살아 있다는 뜻 → 제외하지 않고 Retry-After 동안만 뒤로 미룸
+                delay = retry_after_sec(err)
+                ep.backoff_until = time.monotonic() + (delay if delay is not None else LLM_RETRY_BASE_DELAY_SEC)
+            elif err is not None and is_retryable(err):
+                # 연결/서버 오류면 다음 헬스 체크 전까지 제외 (재시도는 다른 서버로 감)
+                ep.failures += 1
+                if ep.healthy and len(self.endpoints) > 1:
+                    print(f"⚠️ Ollama 서버 오류, 라우팅 제외: {ep.label} ({type(err).__name__})")
+                ep.healthy = len(self.endpoints) == 1
+                ep.last_check = time.monotonic()
+
+    @contextmanager
+    def route(self, model: str) -> Iterator[OllamaEndpoint]:
+        """with router.route(model) as ep: ep.client().chat(...)"""
+        ep = self.acquire(model)
+        try:
+            yield ep
+        except Exception as e:
+            self.release(ep, e)
+            raise
+        else:
+            self.release(ep)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "host": ep.label,
+                    "healthy": ep.healthy,
+                    "outstanding": ep.outstanding,
+                    "served": ep.served,
+                    "failures": ep.failures,
+                    "breaker": ep.breaker.state,
+                    "backoff_sec": round(max(0.0, ep.backoff_until - time.monotonic()), 1),
+                    "models": sorted(ep.models) if ep.models is not None else None,
+                }
+                for ep in self.endpoints
+            ]
+
+
+_router: Optional[OllamaRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_ollama_router() -> OllamaRouter:
+    """프로세스 공용 라우터 (OLLAMA_HOSTS 기준)"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = OllamaRouter(OLLAMA_HOSTS)
+    return _router
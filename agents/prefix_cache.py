@@ -0,0 +1,97 @@
+# 프롬프트 prefix(KV) 캐시 힌트 + 캐시된 토큰 비율 통계
+# 시스템 메시지(역할 + 템플릿 고정 섹션 + JSON 가드)를 호출마다 똑같이 유지하면
+# 백엔드가 앞부분 prefill을 건너뛸 수 있음
+# - OpenAI: prompt_cache_key로 같은 prefix 요청을 같은 캐시로 보냄, usage.prompt_tokens_details.cached_tokens로 확인
+# - Ollama: chat API에는 context 파라미터가 없고(generate 전용, deprecated) 같은 서버/슬롯에서 prefix가 같으면
+#   자동으로 KV를 재사용함 → 세션 고정 라우팅(ollama_router) + keep_alive로 유지,
+#   prompt_eval_count(실제로 새로 계산한 토큰 수)로 재사용량을 추정
+# 토큰 수 추정은 전체 프롬프트와 고정 prefix 모두 utils/token_budget.estimate_tokens 하나로 맞춤 (비율이 부풀지 않게)
+
+# prefix_cache.py
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional
+
+from config import LLM_PROMPT_CACHE_HINTS
+from utils.token_budget import estimate_tokens
+
+_lock = threading.Lock()
+_stats: Dict[str, Dict[str, float]] = {}
+
+
+def _system_text(messages: List[Dict[str, Any]]) -> str:
+    return "\n".join(str(m.get("content") or "") for m in messages if m.get("role") == "system")
+
+
+def _prompt_text(messages: List[Dict[str, Any]]) -> str:
+    return "\n".join(str(m.get("content") or "") for m in messages)
+
+
+def openai_cache_kwargs(messages: List[Dict[str, Any]], stream: bool = False) -> Dict[str, Any]:
+    """OpenAI 요청에 붙일 prefix 캐시 힌트 (LLM_PROMPT_CACHE_HINTS가 꺼져 있으면 빈 dict)"""
+    if not LLM_PROMPT_CACHE_HINTS:
+        return {}
+    key = hashlib.sha256(_system_text(messages).encode("utf-8")).hexdigest()[:32]
+    kwargs: Dict[str, Any] = {"extra_body": {"prompt_cache_key": key}}
+    if stream:
+        # 스트리밍은 마지막 청크로 usage를 받아야 캐시 토큰을 알 수 있음
+        kwargs["stream_options"] = {"include_usage": True}
+    return kwargs
+
+
+def _field(obj: Any, name: str) -> Any:
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _add(model: str, prompt_tokens: int, cached_tokens: int, prefill_sec: Optional[float] = None) -> None:
+    with _lock:
+        st = _stats.setdefault(model, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "prefill_sec": 0.0})
+        st["calls"] += 1
+        st["prompt_tokens"] += prompt_tokens
+        st["cached_tokens"] += cached_tokens
+        if prefill_sec is not None:
+            st["prefill_sec"] += prefill_sec
+
+
+def record_openai_usage(model: str, usage: Any) -> None:
+    """OpenAI 응답 usage에서 전체/캐시된 프롬프트 토큰 수를 기록합니다."""
+    prompt_tokens = _field(usage, "prompt_tokens")
+    if not prompt_tokens:
+        return
+    cached = _field(_field(usage, "prompt_tokens_details"), "cached_tokens") or 0
+    _add(model, int(prompt_tokens), int(cached))
+
+
+def record_ollama_usage(model: str, res: Any, messages: List[Dict[str, Any]]) -> None:
+    """
+    Ollama 응답(또는 마지막 스트림 조각)의 prompt_eval_count로 재사용된 prefix 토큰 수를 추정합니다.
+    - 전체 토큰 수: 전체 메시지를 estimate_tokens로 추정 (Ollama는 캐시 포함 전체 토큰 수를 주지 않음)
+    - 재사용 토큰 수: 전체 - 새로 계산한 토큰, 단 같은 방식으로 추정한 고정 prefix(시스템 메시지)를 넘지 않음
+    """
+    evaluated = _field(res, "prompt_eval_count")
+    if evaluated is None:
+        return
+    total = estimate_tokens(_prompt_text(messages), model)
+    prefix = estimate_tokens(_system_text(messages), model)
+    cached = max(0, min(prefix, total - int(evaluated)))
+    prefill_ns = _field(res, "prompt_eval_duration")
+    _add(model, max(total, int(evaluated)), cached, (prefill_ns / 1e9) if prefill_ns else None)
+
+
+def prefix_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """모델별 호출 수, 프롬프트/캐시 토큰 수, 캐시 비율, 평균 prefill 시간(Ollama)"""
+    out = {}
+    with _lock:
+        for model, st in _stats.items():
+            out[model] = {
+                "calls": int(st["calls"]),
+                "prompt_tokens": int(st["prompt_tokens"]),
+                "cached_tokens": int(st["cached_tokens"]),
+                "cached_ratio": round(st["cached_tokens"] / st["prompt_tokens"], 3) if st["prompt_tokens"] else 0.0,
+                "avg_prefill_sec": round(st["prefill_sec"] / st["calls"], 3) if st["calls"] else 0.0,
+            }
+    return out
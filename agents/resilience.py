@@ -0,0 +1,377 @@
+# LLM 호출 공용 재시도/차단 레이어
+# OllamaClient / AsyncOllamaClient / UnifiedClient가 모두 여기 함수로 SDK 호출을 감쌈
+# - 일시적 오류(429, 5xx, 연결 실패/타임아웃)만 재시도, 400 같은 요청 오류는 바로 올림
+# - 지수 백오프 + full jitter, Retry-After 헤더가 있으면 그 값을 우선
+# - 프로세스 공용 재시도 예산: 백엔드가 죽었을 때 세션마다 재시도가 쌓여 앱 전체가 멈추는 것 방지
+# - 엔드포인트(백엔드+서버)별 서킷 브레이커: 연속 실패가 쌓이면 일정 시간 즉시 실패 (fail fast)
+#   Ollama는 라우터가 서버마다 브레이커를 적용 → 한 서버가 죽어도 다른 서버로 계속 라우팅
+# - 429(rate limit)는 Retry-After만큼 물러났다가 재시도할 뿐, 브레이커 실패로 세지 않음
+# - 호출 쪽 마감(call_deadline)이 지나면 새 시도/재시도/슬롯 대기 없이 DeadlineExceeded
+
+# resilience.py
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+import httpx
+from ollama import ResponseError
+from openai import APIConnectionError, BadRequestError, InternalServerError, RateLimitError, UnprocessableEntityError
+
+from config import (
+    BASE_URL,
+    LLM_RETRY_MAX_ATTEMPTS,
+    LLM_RETRY_BASE_DELAY_SEC,
+    LLM_RETRY_MAX_DELAY_SEC,
+    LLM_RETRY_BUDGET_RATIO,
+    LLM_RETRY_BUDGET_MAX,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_RESET_SEC,
+)
+from utils.llm_metrics import note_retry
+
+
+class CircuitOpenError(Exception):
+    """서킷 브레이커가 열려 있어 호출하지 않고 바로 실패"""
+
+    def __init__(self, backend: str, retry_in: float):
+        super().__init__(f"{backend} 백엔드 일시 차단 중 (연속 실패). {retry_in:.0f}초 후 다시 시도합니다.")
+        self.backend = backend
+        self.retry_in = retry_in
+
+
+class DeadlineExceeded(Exception):
+    """호출 쪽 마감(call_deadline)이 지나 더 이상 시도하지 않음 (재시도 대상 아님)"""
+
+
+# =========================================================
+# 호출 마감
+# =========================================================
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("llm_call_deadline", default=None)
+
+
+@contextmanager
+def call_deadline(deadline: Optional[float]) -> Iterator[None]:
+    """
+    블록 안의 LLM 호출 마감 (time.monotonic 기준). 바깥 마감이 더 이르면 그쪽을 따름
+    마감이 지나면 진행 중인 요청만 끝까지 두고, 재시도/슬롯 대기는 하지 않음
+    """
+    outer = _deadline.get()
+    if deadline is not None and outer is not None:
+        deadline = min(deadline, outer)
+    token = _deadline.set(deadline if deadline is not None else outer)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_left() -> Optional[float]:
+    """현재 마감까지 남은 시간(초). 마감이 없으면 None"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline(backend: str) -> None:
+    left = time_left()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"{backend} 호출 마감 초과 → 더 시도하지 않음")
+
+
+# =========================================================
+# 오류 분류
+# =========================================================
+def is_retryable(err: Exception) -> bool:
+    """일시적 오류(재시도하면 성공할 수 있는 오류)인지 판단합니다."""
+    # APITimeoutError는 APIConnectionError의 하위 클래스
+    if isinstance(err, (RateLimitError, APIConnectionError, InternalServerError)):
+        return True
+    if isinstance(err, ResponseError):
+        status = getattr(err, "status_code", -1) or -1
+        return status == 429 or status >= 500
+    # ollama 라이브러리는 서버 연결 실패를 ConnectionError로 바꿔서 올림
+    return isinstance(err, (httpx.TransportError, ConnectionError, TimeoutError))
+
+
+def is_rate_limited(err: Exception) -> bool:
+    """429 응답인지 (백엔드 장애가 아니라 속도 제한 → 물러났다가 재시도)"""
+    if isinstance(err, RateLimitError):
+        return True
+    if isinstance(err, ResponseError):
+        return getattr(err, "status_code", None) == 429
+    response = getattr(err, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+
+def is_request_rejected(err: Exception) -> bool:
+    """백엔드가 요청 자체를 거부했는지 (400/422: 형식/기능 미지원. 다시 보내도 같은 결과)"""
+    if isinstance(err, (BadRequestError, UnprocessableEntityError)):
+        return True
+    if isinstance(err, ResponseError):
+        return getattr(err, "status_code", None) in (400, 422)
+    return False
+
+
+def retry_after_sec(err: Exception) -> Optional[float]:
+    """응답의 Retry-After(-ms) 헤더 값(초). 없으면 None"""
+    response = getattr(err, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        raw_ms = headers.get("retry-after-ms")
+        if raw_ms:
+            return max(0.0, float(raw_ms) / 1000.0)
+        raw = headers.get("retry-after")
+        if not raw:
+            return None
+        try:
+            return max(0.0, float(raw))
+        except ValueError:
+            # HTTP-date 형식
+            return max(0.0, parsedate_to_datetime(raw).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+def backoff_delay(attempt: int) -> float:
+    """attempt(0부터)번째 재시도 대기 시간: full jitter (0 ~ base*2^attempt, 상한 적용)"""
+    ceiling = min(LLM_RETRY_MAX_DELAY_SEC, LLM_RETRY_BASE_DELAY_SEC * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+# =========================================================
+# 재시도 예산 / 서킷 브레이커
+# =========================================================
+class RetryBudget:
+    """
+    토큰 버킷 방식의 프로세스 공용 재시도 예산.
+    요청마다 ratio만큼 적립하고 재시도 1회에 1을 씀 → 평상시 재시도는 전체 요청의 ratio 비율 이내로 제한.
+    """
+
+    def __init__(self, ratio: float, max_tokens: float):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._lock = threading.Lock()
+        self.spent = 0
+        self.denied = 0
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                self.spent += 1
+                return True
+            self.denied += 1
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"tokens": round(self._tokens, 2), "spent": self.spent, "denied": self.denied}
+
+
+class CircuitBreaker:
+    """
+    closed → (연속 실패 failure_threshold회) → open → (reset_sec 경과) → half_open
+    half_open에서는 시험 호출 1건만 통과시키고, 성공하면 closed / 실패하면 다시 open.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_sec: float, backend: str = "", endpoint: str = ""):
+        self.name = name
+        self.backend = backend or name
+        self.endpoint = endpoint
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_sec = reset_sec
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """지금 호출을 보낼 수 있는지 (상태는 바꾸지 않음, 라우터가 서버를 고를 때 사용)"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                return time.monotonic() - self.opened_at >= self.reset_sec
+            return not self._probing
+
+    def retry_in(self) -> float:
+        with self._lock:
+            return max(0.0, self.reset_sec - (time.monotonic() - self.opened_at)) if self.state != "closed" else 0.0
+
+    def before_call(self) -> None:
+        """호출 전 확인. 차단 중이면 CircuitOpenError"""
+        with self._lock:
+            if self.state == "closed":
+                return
+            elapsed = time.monotonic() - self.opened_at
+            if self.state == "open" and elapsed >= self.reset_sec:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return
+            raise CircuitOpenError(self.name, max(0.0, self.reset_sec - elapsed))
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                print(f"✅ {self.name} 백엔드 복구 확인, 차단 해제")
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"🚫 {self.name} 백엔드 연속 실패 {self.failures}회, {self.reset_sec:.0f}초간 차단")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def release_probe(self) -> None:
+        """시험 호출이 백엔드 상태와 무관한 오류(400 등)로 끝났을 때 다음 시험 호출을 허용"""
+        with self._lock:
+            self._probing = False
+
+
+_budget = RetryBudget(LLM_RETRY_BUDGET_RATIO, LLM_RETRY_BUDGET_MAX)
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(backend: str, endpoint: Optional[str] = None) -> CircuitBreaker:
+    """엔드포인트(백엔드 + 서버 주소)별 서킷 브레이커. endpoint를 생략하면 백엔드 기본 서버"""
+    endpoint = endpoint or "default"
+    key = f"{backend}@{endpoint}"
+    breaker = _breakers.get(key)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(key)
+            if breaker is None:
+                breaker = CircuitBreaker(key, LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_SEC, backend, endpoint)
+                _breakers[key] = breaker
+    return breaker
+
+
+def _call_breaker(backend: str) -> Optional[CircuitBreaker]:
+    # Ollama는 요청마다 서버가 달라질 수 있어 라우터(agents/ollama_router.py)가 서버별 브레이커를 적용
+    if backend == "ollama":
+        return None
+    return get_breaker(backend, BASE_URL if backend == "openai" else None)
+
+
+def record_outcome(breaker: CircuitBreaker, err: Optional[Exception]) -> None:
+    """호출 결과를 브레이커에 반영: 성공 / 장애(재시도 대상 오류) / 그 외(400, 429 등)는 시험 호출만 해제"""
+    if err is None:
+        breaker.record_success()
+    elif is_retryable(err) and not is_rate_limited(err):
+        breaker.record_failure()
+    else:
+        breaker.release_probe()
+
+
+def resilience_stats() -> Dict[str, Any]:
+    return {
+        "retry_budget": _budget.stats(),
+        "breakers": {
+            name: {"backend": b.backend, "endpoint": b.endpoint, "state": b.state, "failures": b.failures}
+            for name, b in list(_breakers.items())
+        },
+    }
+
+
+def _next_delay(backend: str, err: Exception, attempt: int, max_attempts: int) -> Optional[float]:
+    """재시도하면 대기 시간을, 포기해야 하면 None을 반환합니다."""
+    if attempt + 1 >= max_attempts:
+        return None
+    hinted = retry_after_sec(err)
+    delay = hinted if hinted is not None else backoff_delay(attempt)
+    delay = min(delay, LLM_RETRY_MAX_DELAY_SEC)
+    left = time_left()
+    if left is not None and delay >= left:
+        print(f"⏱️ {backend} 호출 마감까지 재시도할 시간 없음 → 재시도 없이 실패 처리")
+        return None
+    if not _budget.try_spend():
+        print(f"⚠️ {backend} 재시도 예산 소진, 재시도 없이 실패 처리")
+        return None
+    print(f"⏳ {backend} 일시 오류({type(err).__name__}). {delay:.1f}s 후 재시도 ({attempt + 1}/{max_attempts - 1})")
+    return delay
+
+
+def _on_error(breaker: Optional[CircuitBreaker], err: Exception) -> bool:
+    if breaker is not None:
+        record_outcome(breaker, err)
+    return is_retryable(err)
+
+
+# =========================================================
+# 호출 래퍼
+# =========================================================
+def call_with_retry(backend: str, func: Callable[[], Any], max_attempts: int = LLM_RETRY_MAX_ATTEMPTS) -> Any:
+    """func()를 엔드포인트별 브레이커/공용 재시도 예산 아래에서 호출합니다. 실패 시 마지막 오류를 그대로 올림"""
+    breaker = _call_breaker(backend)
+    _budget.deposit()
+    attempt = 0
+    while True:
+        check_deadline(backend)
+        if breaker is not None:
+            breaker.before_call()
+        try:
+            result = func()
+        except Exception as e:
+            if not _on_error(breaker, e):
+                raise
+            delay = _next_delay(backend, e, attempt, max_attempts)
+            if delay is None:
+                raise
+            note_retry()
+            time.sleep(delay)
+            attempt += 1
+            continue
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+
+async def acall_with_retry(
+    backend: str,
+    func: Callable[[], Awaitable[Any]],
+    max_attempts: int = LLM_RETRY_MAX_ATTEMPTS,
+) -> Any:
+    """call_with_retry의 비동기 버전 (대기는 asyncio.sleep)"""
+    breaker = _call_breaker(backend)
+    _budget.deposit()
+    attempt = 0
+    while True:
+        check_deadline(backend)
+        if breaker is not None:
+            breaker.before_call()
+        try:
+            result = await func()
+        except Exception as e:
+            if not _on_error(breaker, e):
+                raise
+            delay = _next_delay(backend, e, attempt, max_attempts)
+            if delay is None:
+                raise
+            note_retry()
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        if breaker is not None:
+            breaker.record_success()
+        return result
@@ -2,15 +2,17 @@
 # 세부 주제 - 제목 후보
 
 import json
-import os
 import re
 import requests
 from typing import Any, Dict, List
 
 from config import TARGET_CHARS, MODEL_TEXT
-from agents.ollama_client import OllamaClient
-from utils.prompt_loader import load_and_render_prompt
+from agents.ollama_client import OllamaClient, get_shared_client
+from utils.prompt_loader import compose_system_prompt, load_and_render_prompt, load_and_render_prompt_parts, load_prompt
+from utils.llm_metrics import llm_stage
+from utils.tracing import trace_span
 from utils.text_utils import safe_list
+from utils.token_budget import estimate_tokens, fit_sections, prompt_budget
 
 
 
@@ -22,12 +24,11 @@ class TopicAgent:
         self.folder = "prompts"
 
     def read_file(self, file_name):
-        """폴더에서 마크다운 파일을 읽어오는 간단한 함수입니다."""
-        path = f"{self.folder}/{file_name}.md"
-        if os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as f:
-                return f.read()
-        return ""
+        """폴더에서 마크다운 파일을 읽어오는 간단한 함수입니다. (프롬프트 캐시 공유, 없으면 빈 문자열)"""
+        try:
+            return load_prompt(file_name, self.folder)
+        except FileNotFoundError:
+            return ""
 
     def suggest_topics(self, category, job):
         """1. 카테고리를 보고 제목 후보 5개를 제안합니다."""
@@ -74,9 +75,11 @@ class TopicAgent:
         return plan
 
 
+@trace_span("agent.generate_design_brief")
+@llm_stage("step3.design_brief")
 def generate_design_brief(ctx: Dict[str, Any], client: OllamaClient | None = None) -> Dict[str, Any]:
     if client is None:
-        client = OllamaClient(model=MODEL_TEXT)
+        client = get_shared_client(model=MODEL_TEXT)
 
     persona = ctx.get("persona", {})
     topic_flow = ctx.get("topic_flow", {})
@@ -134,9 +137,11 @@ def generate_design_brief(ctx: Dict[str, Any], client: OllamaClient | None = Non
         "strategy": {"text": "string", "seo": {"enabled": "boolean", "notes": "string"}, "hashtags": ["string"]},
     }
 
+    # 시스템 메시지: 역할 + 고정 섹션 + 스키마 힌트 (호출마다 같은 prefix → 백엔드 KV 캐시 재사용)
+    system_role = "콘텐츠 전략가"
     # 프롬프트 파일에서 로드 시도
     try:
-        prompt_template = load_and_render_prompt("design_brief", {
+        static_prefix, prompt_template = load_and_render_prompt_parts("design_brief", {
             "topic": main_kw,
             "category": facts["topic"]["category"] or "",
             "subtopic": facts["topic"]["subtopic"] or "",
@@ -152,12 +157,23 @@ def generate_design_brief(ctx: Dict[str, Any], client: OllamaClient | None = Non
             "tone": facts["persona"]["tone"] or "정중한 존댓말",
         })
         
-        # FACTS와 schema_hint 추가
+        # schema_hint는 고정이므로 시스템 메시지 쪽, FACTS는 요청마다 다르므로 사용자 메시지 쪽
+        system_role = compose_system_prompt(
+            system_role,
+            f"{static_prefix}\n[OUTPUT SCHEMA HINT]\n{json.dumps(schema_hint, ensure_ascii=False, indent=2)}",
+        )
+        # FACTS는 입력 정보와 겹치므로 컨텍스트 예산을 넘으면 가장 먼저 줄임
+        facts_text = fit_sections(
+            {"facts": json.dumps(facts, ensure_ascii=False, indent=2)},
+            ("facts",),
+            prompt_budget(client.backend),
+            fixed_tokens=estimate_tokens(system_role, client.model) + estimate_tokens(prompt_template, client.model),
+            model=client.model,
+            label="design_brief",
+        )["facts"]
         prompt = f"""{prompt_template}
 [추가 FACTS]
-{json.dumps(facts, ensure_ascii=False, indent=2)}
-[OUTPUT SCHEMA HINT]
-{json.dumps(schema_hint, ensure_ascii=False, indent=2)}
+{facts_text}
 """
     except Exception as e:
         # 폴백: 기존 하드코딩 프롬프트 유지
@@ -184,7 +200,7 @@ def generate_design_brief(ctx: Dict[str, Any], client: OllamaClient | None = Non
 """.strip()
 
     try:
-        out = client.generate_json("콘텐츠 전략가", prompt)
+        out = client.generate_json(system_role, prompt, schema=schema_hint)
     except Exception as e:
         raise
 
@@ -224,11 +240,18 @@ def generate_design_brief(ctx: Dict[str, Any], client: OllamaClient | None = Non
     return result
 
 
+# 문체 분석에 넣을 본문 발췌 상한 (이보다 길어도 분석 품질은 거의 같고 prefill만 느려짐)
+_STYLE_EXCERPT_MAX_TOKENS = 3000
+# 문체 분석 응답(JSON 3줄)용으로 남길 토큰
+_STYLE_OUTPUT_RESERVE_TOKENS = 512
+
+
 # 수정( 스텝1 블로그 분석 코드)
-def _fetch_url_text(url: str, max_chars: int = 6000) -> str:
+def _fetch_url_text(url: str, max_chars: int = 50000) -> str:
     """
     URL의 HTML을 받아서 대충 텍스트만 뽑아옵니다.
     (완벽한 크롤링이 아니라 '스타일 분석용 요약 텍스트'만 추출하는 목적)
+    max_chars는 비정상적으로 큰 페이지 방어용이고, 실제 프롬프트 길이는 analyze_blog_style에서 토큰 예산으로 맞춥니다.
     """
     try:
         headers = {
@@ -251,6 +274,8 @@ def _fetch_url_text(url: str, max_chars: int = 6000) -> str:
         return ""
 
 
+@trace_span("agent.analyze_blog_style")
+@llm_stage("step1.blog_style")
 def analyze_blog_style(blog_url: str, client: OllamaClient | None = None) -> Dict[str, Any]:
     """
     Step1에서 입력된 블로그 URL을 실제로 읽고(가능하면) 스타일을 분석합니다.
@@ -262,11 +287,11 @@ def analyze_blog_style(blog_url: str, client: OllamaClient | None = None) -> Dic
       }
     """
     if client is None:
-        client = OllamaClient(model=MODEL_TEXT)
+        client = get_shared_client(model=MODEL_TEXT)
 
     # 1) 프롬프트(md) 읽기: prompts/blog_style_analysis.md
     try:
-        base_prompt = load_and_render_prompt("blog_style_analysis", {"blog_url": blog_url, "page_text": ""})
+        base_prompt = load_and_render_prompt("blog_style_analysis", {"blog_url": blog_url})
     except FileNotFoundError:
         # md 없을 때 최소 프롬프트(백업)
         base_prompt = """
@@ -276,8 +301,17 @@ def analyze_blog_style(blog_url: str, client: OllamaClient | None = None) -> Dic
 키는 tone, structure, feel.
 """.strip()
 
-    # 2) URL에서 텍스트 가져오기(가능한 경우)
+    # 2) URL에서 텍스트 가져오기(가능한 경우) → 모델 컨텍스트 예산에 맞게 발췌
     page_text = _fetch_url_text(blog_url)
+    if page_text:
+        fixed = estimate_tokens(base_prompt, client.model) + estimate_tokens(blog_url, client.model) + 200
+        budget = min(
+            prompt_budget(client.backend, reserve=_STYLE_OUTPUT_RESERVE_TOKENS),
+            fixed + _STYLE_EXCERPT_MAX_TOKENS,
+        )
+        page_text = fit_sections(
+            {"page_text": page_text}, ("page_text",), budget, fixed, model=client.model, label="blog_style"
+        )["page_text"]
 
     # 3) LLM에게 줄 입력 구성
     #    - 블로그 내용이 제대로 못 가져와질 수 있으니 url도 같이 보냄
@@ -299,7 +333,11 @@ def analyze_blog_style(blog_url: str, client: OllamaClient | None = None) -> Dic
 }}
 """.strip()
 
-    out = client.generate_json("블로그 문체 분석가", prompt)
+    out = client.generate_json(
+        "블로그 문체 분석가",
+        prompt,
+        schema={"tone": "string", "structure": "string", "feel": "string"},
+    )
 
     # 4) 정규화(키가 조금 달라도 UI가 안깨지게)
     result = {
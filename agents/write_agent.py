@@ -1,10 +1,19 @@
 
+import contextvars
+import queue
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 from datetime import datetime
-from typing import Any, Dict, List, Optional
-
-from config import TARGET_CHARS, N_HASHTAGS
-from agents.ollama_client import OllamaClient
-from utils.prompt_loader import load_prompt, render_prompt
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from config import TARGET_CHARS, N_HASHTAGS, STEP5_STAGE_TIMEOUTS
+from agents.ollama_client import OllamaClient, get_shared_client
+from utils.prompt_loader import compose_system_prompt, load_and_render_prompt_parts, load_prompt
+from utils.llm_metrics import llm_stage
+from utils.llm_usage import session_budget_exceeded, session_usage, usage_scope
+from utils.prom_metrics import track_generation
+from utils.tracing import trace_span
+from utils.token_budget import budget_prompt_variables, prompt_budget
 from utils.text_utils import (
     safe_list,
     safe_str,
@@ -53,6 +62,8 @@ def _get_mbti_guide(mbti_data: Any) -> str:
 
 
 
+@trace_span("step5.extend")
+@llm_stage("step5.extend")
 def _ensure_min_length(text: str, target_len: int, client: Optional[OllamaClient]) -> str:
     t = text or ""
     if len(t) >= target_len:
@@ -118,6 +129,9 @@ def _build_image_list(topic_flow: Dict[str, Any]) -> str:
         if isinstance(img, (bytes, bytearray)):
             size = len(img)
             desc = f"이미지 {idx} (bytes:{size})"
+        elif isinstance(img, str):
+            # 이미지 저장소 ID (원본 sha256)
+            desc = f"이미지 {idx} (id:{img[:8]})"
         else:
             desc = f"이미지 {idx} (ref)"
         if tags:
@@ -144,6 +158,222 @@ def _build_final_options_block(final_options: Dict[str, Any]) -> str:
     return "\n".join(lines)
 
 
+# generate_json 구조 강제용 스키마 힌트 (prompts/*.md의 OUTPUT FORMAT과 동일)
+TITLES_SCHEMA = {"titles": ["string"]}
+FINAL_TITLE_SCHEMA = {"title": "string"}
+IMAGE_PLAN_SCHEMA = {
+    "intro_image_index": "integer|null",
+    "body_image_indices": ["integer"],
+    "excluded_image_indices": ["integer"],
+}
+
+
+class _StageRunner:
+    """
+    Step5 LLM 호출을 단계별로 스레드에서 실행합니다.
+    - 단계별 타임아웃(STEP5_STAGE_TIMEOUTS, 제출 시점 기준)
+    - 단계별 소요 시간(timings)과 타임아웃 난 단계(timed_out) 기록
+    """
+
+    def __init__(self, max_workers: int = 2):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="step5")
+        self.timings: Dict[str, float] = {}
+        self.timed_out: List[str] = []
+        self.errors: Dict[str, str] = {}
+        self._deadlines: Dict[str, float] = {}
+
+    def submit(self, name: str, fn: Callable[[], Any]) -> Future:
+        def _run():
+            started = time.perf_counter()
+            try:
+                with trace_span(f"step5.{name}"), llm_stage(f"step5.{name}"):
+                    return fn()
+            finally:
+                self.timings[name] = round(time.perf_counter() - started, 3)
+
+        self._deadlines[name] = time.monotonic() + STEP5_STAGE_TIMEOUTS.get(name, 300.0)
+        # 호출한 쪽의 contextvars(세션 라우팅 등)를 작업 스레드에서도 그대로 사용
+        return self.pool.submit(contextvars.copy_context().run, _run)
+
+    def result(self, name: str, future: Future, default: Any) -> Any:
+        remaining = max(0.0, self._deadlines.get(name, time.monotonic()) - time.monotonic())
+        try:
+            return future.result(timeout=remaining)
+        except FuturesTimeoutError:
+            self.timed_out.append(name)
+            return default
+        except Exception as e:
+            self.errors[name] = str(e)
+            return default
+
+    def result_streaming(
+        self,
+        name: str,
+        future: Future,
+        default: Any,
+        items: "queue.Queue[Any]",
+        on_item: Callable[[Any], None],
+    ) -> Any:
+        """
+        result()와 같지만, 기다리는 동안 워커가 items 큐에 넣은 중간 결과를
+        호출한 스레드(Streamlit 스크립트 스레드)에서 on_item으로 전달합니다.
+        여러 개가 쌓였으면 마지막 것만 전달합니다.
+        """
+        deadline = self._deadlines.get(name, time.monotonic())
+        while not future.done() and time.monotonic() < deadline:
+            try:
+                latest = items.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            while True:
+                try:
+                    latest = items.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                on_item(latest)
+            except Exception:
+                # 화면 갱신 실패가 생성 자체를 막지 않도록 무시
+                pass
+        return self.result(name, future, default)
+
+    def shutdown(self) -> None:
+        # 타임아웃 난 호출은 기다리지 않고 버림 (결과는 사용하지 않음)
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _extract_json_with_marker(client: OllamaClient, text: str) -> Dict[str, Any]:
+    if not text:
+        raise ValueError("빈 응답")
+    if "<END_JSON>" in text:
+        text = text.split("<END_JSON>", 1)[0]
+    return client._extract_first_json_object(text)
+
+
+def _repair_missing_brace(text: str) -> str:
+    if not text:
+        return text
+    open_cnt = text.count("{")
+    close_cnt = text.count("}")
+    if open_cnt > close_cnt:
+        text = text + ("}" * (open_cnt - close_cnt))
+    return text
+
+
+STREAM_FIELDS = ("intro_markdown", "body_markdown")
+
+
+def _minimal_intro_body(
+    main_kw: str,
+    target_reader: str,
+    brief: Dict[str, Any],
+    image_plan: Dict[str, Any],
+    reason: Any,
+) -> Dict[str, Any]:
+    # minimal non-empty fallback
+    outline_sections = safe_list((brief.get("outline", {}) or {}).get("sections"))
+    intro_fallback = f"{main_kw}에 대해 핵심 흐름을 정리해보겠습니다. {target_reader}에게 필요한 맥락부터 차근히 짚어볼게요."
+    body_parts = []
+    for s in outline_sections[:5]:
+        body_parts.append(f"### {s}\n{s}에 대해 핵심 포인트를 정리합니다. 실제 상황에서 어떻게 적용되는지 함께 살펴보세요.")
+    body_fallback = "\n\n".join(body_parts) if body_parts else f"{main_kw}의 핵심 내용을 정리합니다."
+    return {
+        "intro_markdown": intro_fallback,
+        "body_markdown": body_fallback,
+        "hashtags": [],
+        "image_guide": "",
+        "image_plan": image_plan,
+        "package": None,
+        "evidence_notes": [f"생성 실패: {reason}"],
+    }
+
+
+def _fit_prompt(
+    client: OllamaClient,
+    template_name: str,
+    variables: Dict[str, Any],
+    trim_order: Sequence[str],
+) -> Dict[str, Any]:
+    """프롬프트 변수를 모델 컨텍스트 예산에 맞춤 (trim_order 앞쪽일수록 먼저 줄임, utils/token_budget.py)"""
+    return budget_prompt_variables(
+        load_prompt(template_name),
+        variables,
+        trim_order,
+        prompt_budget(client.backend),
+        model=client.model,
+        label=template_name,
+    )
+
+
+def _write_intro_body(
+    client: OllamaClient,
+    system_role: str,
+    intro_body_prompt: str,
+    temperature: float,
+    main_kw: str,
+    target_reader: str,
+    outline_summary: str,
+    brief: Dict[str, Any],
+    image_plan: Dict[str, Any],
+    on_partial: Optional[Callable[[Dict[str, str]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    서론/본문 JSON 생성 (빈 필드 재시도 → 짧은 프롬프트 → 최소 폴백 순)
+    첫 시도는 스트리밍으로 받고, on_partial이 있으면 intro/body 중간 값을 넘겨줍니다.
+    system_role: 역할 + 템플릿 고정 섹션 (첫 시도/재시도가 같은 prefix를 공유 → KV 캐시 재사용)
+    """
+    try:
+        prompt_with_marker = intro_body_prompt + "\n\n[출력 끝에 <END_JSON>를 반드시 추가]"
+        # 첫 JSON 객체가 닫히면 바로 생성을 끊음 (<END_JSON> 뒤 잡담까지 기다리지 않음)
+        text = client.stream_json_object(
+            system_role,
+            prompt_with_marker,
+            temperature=temperature,
+            on_chunk=(lambda parser: on_partial(parser.snapshot(STREAM_FIELDS))) if on_partial else None,
+        )
+        try:
+            raw = _extract_json_with_marker(client, text)
+        except Exception:
+            raw = _extract_json_with_marker(client, _repair_missing_brace(text))
+        intro_txt = safe_str((raw or {}).get("intro_markdown"))
+        body_txt = safe_str((raw or {}).get("body_markdown"))
+        if not intro_txt or not body_txt:
+            retry_prompt = (
+                intro_body_prompt
+                + "\n\n[주의] 직전 출력의 intro_markdown/body_markdown가 비어있습니다. 반드시 채워서 다시 출력하세요. 끝에 <END_JSON> 추가."
+            )
+            retry_text = client.generate_text(
+                system_role,
+                retry_prompt,
+                temperature=0.2,
+            )
+            try:
+                raw = _extract_json_with_marker(client, retry_text)
+            except Exception:
+                raw = _extract_json_with_marker(client, _repair_missing_brace(retry_text))
+        return raw
+    except Exception as e:
+        # fallback: try shorter prompt via generate_text and manual JSON extract
+        fallback_prompt = f"""
+너는 블로그 작가다. 아래 정보를 바탕으로 JSON만 출력하라.
+
+[주제] {main_kw}
+[타겟 독자] {target_reader}
+[글 구성] {outline_summary}
+[섹션] {', '.join(safe_list((brief.get('outline', {}) or {}).get('sections')))}
+
+출력 JSON:
+{{"intro_markdown":"...","body_markdown":"...","hashtags":["#..."],"image_guide":"...","image_plan":{{}},"package":null}}
+""".strip()
+        try:
+            text = client.generate_text("전문 블로거", fallback_prompt, temperature=0.2)
+            return client._extract_first_json_object(text)
+        except Exception:
+            return _minimal_intro_body(main_kw, target_reader, brief, image_plan, e)
+
+
+@trace_span("agent.suggest_titles")
+@llm_stage("step2.suggest_titles")
 def suggest_titles_agent(
     category: str,
     subtopic: Optional[str],
@@ -153,7 +383,7 @@ def suggest_titles_agent(
     intensity: float = 0.2,
     client: Optional[OllamaClient] = None,
 ) -> List[str]:
-    client = client or OllamaClient()
+    client = client or get_shared_client()
 
     try:
         main_keyword = safe_str(subtopic) or safe_str(category) or "일상"
@@ -168,15 +398,14 @@ def suggest_titles_agent(
     except Exception as e:
         raise
 
-    template = load_prompt("title_generation")
-    prompt = render_prompt(
-        template,
+    static_prefix, prompt = load_and_render_prompt_parts(
+        "title_generation",
         {
             "main_keyword": main_keyword,
             "sub_keywords": ", ".join([k for k in sub_keywords if k]),
             "target_reader": safe_str(user_intent) or "일반 독자",
         },
-    ).strip()
+    )
 
     extra_context = f"""
 [CONTEXT]
@@ -189,9 +418,11 @@ def suggest_titles_agent(
 
     try:
         out = client.generate_json(
-            "블로그 제목 카피라이터",
+            compose_system_prompt("블로그 제목 카피라이터", static_prefix),
             f"{prompt}\n\n{extra_context}",
             temperature=temperature,
+            schema=TITLES_SCHEMA,
+            hedge="suggest_titles",
         )
     except Exception:
         out = {}
@@ -211,8 +442,33 @@ def suggest_titles_agent(
     return titles
 
 
-def generate_post(ctx: Dict[str, Any], client: Optional[OllamaClient] = None) -> Dict[str, Any]:
-    client = client or OllamaClient()
+@trace_span("agent.generate_post")
+@track_generation()
+@llm_stage("step5")
+def generate_post(
+    ctx: Dict[str, Any],
+    client: Optional[OllamaClient] = None,
+    on_stream: Optional[Callable[[Dict[str, str]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Step5 최종 글 생성.
+    on_stream을 넘기면 서론/본문을 스트리밍으로 받으며
+    {"intro_markdown": "...", "body_markdown": "..."} 중간 값을 호출한 스레드에서 전달합니다.
+    결과의 usage에는 이 글 생성에 쓴 토큰/비용(post)과 세션 누적(session)이 들어갑니다.
+    """
+    with usage_scope() as post_usage:
+        result = _generate_post(ctx, client, on_stream)
+    result["usage"] = {"post": post_usage.to_dict(), "session": session_usage()}
+    return result
+
+
+def _generate_post(
+    ctx: Dict[str, Any],
+    client: Optional[OllamaClient],
+    on_stream: Optional[Callable[[Dict[str, str]], None]],
+) -> Dict[str, Any]:
+    client = client or get_shared_client()
+    started_at = time.perf_counter()
 
     persona = ctx.get("persona", {}) or {}
     topic_flow = ctx.get("topic_flow", {}) or {}
@@ -273,19 +529,26 @@ def generate_post(ctx: Dict[str, Any], client: Optional[OllamaClient] = None) ->
 
     final_options_block = _build_final_options_block(ctx.get("final_options", {}) or {})
 
-    plan_prompt = render_prompt(
-        load_prompt("image_plan"),
-        {
-            "title": main_kw or "",
-            "main": (brief.get("keywords", {}) or {}).get("main") or main_kw,
-            "target_context": target_context,
-            "tone_summary": tone_summary,
-            "outline_summary": outline_summary,
-            "image_list": image_list,
-        },
+    # 템플릿의 고정 섹션(역할/규칙/출력 형식)은 시스템 메시지로, 입력 정보만 사용자 메시지로
+    # → 같은 템플릿 호출끼리 prefix가 같아 백엔드 KV 캐시 재사용 (agents/prefix_cache.py)
+    plan_static, plan_prompt = load_and_render_prompt_parts(
+        "image_plan",
+        _fit_prompt(
+            client,
+            "image_plan",
+            {
+                "title": main_kw or "",
+                "main": (brief.get("keywords", {}) or {}).get("main") or main_kw,
+                "target_context": target_context,
+                "tone_summary": tone_summary,
+                "outline_summary": outline_summary,
+                "image_list": image_list,
+            },
+            ("tone_summary", "target_context", "outline_summary", "image_list"),
+        ),
     )
-    title_prompt = render_prompt(
-        load_prompt("final_title"),
+    title_static, title_prompt = load_and_render_prompt_parts(
+        "final_title",
         {
             "title": main_kw or "",
             "main": (brief.get("keywords", {}) or {}).get("main") or main_kw,
@@ -297,132 +560,81 @@ def generate_post(ctx: Dict[str, Any], client: Optional[OllamaClient] = None) ->
         },
     )
 
+    # 단계 의존성: title은 독립, image_plan → intro_body는 순차
+    # title을 image_plan/intro_body와 동시에 실행해 모델 왕복 1회를 줄임
+    runner = _StageRunner(max_workers=2)
     try:
-        image_plan = client.generate_json(
-            "블로그 편집자",
-            plan_prompt,
-            temperature=0.2,
+        title_future = runner.submit(
+            "title",
+            lambda: client.generate_json(
+                compose_system_prompt("카피라이터", title_static), title_prompt, temperature=0.4, schema=FINAL_TITLE_SCHEMA, hedge="final_title"
+            ),
         )
-    except Exception:
-        image_plan = {}
-
-    intro_body_prompt = render_prompt(
-        load_prompt("blog_writing"),
-        {
-            "persona_line": persona_line,
-            "avoid": ", ".join([safe_str(x) for x in avoid]),
-            "blog_style": blog_style,
-            "tone_example": tone_example,
-            "region": region,
-            "target": target_reader,
-            "extra": extra_request,
-            "title": main_kw or "",
-            "post_type": options.get("post_type") or "",
-            "main": (brief.get("keywords", {}) or {}).get("main") or main_kw,
-            "sub_csv": sub_csv,
-            "target_context": target_context,
-            "tone_summary": tone_summary,
-            "outline_summary": outline_summary,
-            "length_note": length_note,
-            "intro_idx": image_plan.get("intro_image_index"),
-            "body_idxs": image_plan.get("body_image_indices"),
-            "excluded_idxs": image_plan.get("excluded_image_indices"),
-            "image_list": image_list,
-            "final_options_block": final_options_block,
-            "mbti_guide": _get_mbti_guide(persona.get("mbti", {}) or {}),
-        },
-    )
-
-
-
-    try:
-        title_out = client.generate_json(
-            "카피라이터",
-            title_prompt,
-            temperature=0.4,
+        plan_future = runner.submit(
+            "image_plan",
+            lambda: client.generate_json(compose_system_prompt("블로그 편집자", plan_static), plan_prompt, temperature=0.2, schema=IMAGE_PLAN_SCHEMA),
         )
-    except Exception:
-        title_out = {}
-
-    def _extract_json_with_marker(text: str) -> Dict[str, Any]:
-        if not text:
-            raise ValueError("빈 응답")
-        if "<END_JSON>" in text:
-            text = text.split("<END_JSON>", 1)[0]
-        return client._extract_first_json_object(text)
-
-    def _repair_missing_brace(text: str) -> str:
-        if not text:
-            return text
-        open_cnt = text.count("{")
-        close_cnt = text.count("}")
-        if open_cnt > close_cnt:
-            text = text + ("}" * (open_cnt - close_cnt))
-        return text
-
-    try:
-        prompt_with_marker = intro_body_prompt + "\n\n[출력 끝에 <END_JSON>를 반드시 추가]"
-        text = client.generate_text(
-            "전문 블로거",
-            prompt_with_marker,
-            temperature=temperature_step5,
+        image_plan = runner.result("image_plan", plan_future, default={}) or {}
+
+        intro_body_static, intro_body_prompt = load_and_render_prompt_parts(
+            "blog_writing",
+            _fit_prompt(
+                client,
+                "blog_writing",
+                {
+                    "persona_line": persona_line,
+                    "avoid": ", ".join([safe_str(x) for x in avoid]),
+                    "blog_style": blog_style,
+                    "tone_example": tone_example,
+                    "region": region,
+                    "target": target_reader,
+                    "extra": extra_request,
+                    "title": main_kw or "",
+                    "post_type": options.get("post_type") or "",
+                    "main": (brief.get("keywords", {}) or {}).get("main") or main_kw,
+                    "sub_csv": sub_csv,
+                    "target_context": target_context,
+                    "tone_summary": tone_summary,
+                    "outline_summary": outline_summary,
+                    "length_note": length_note,
+                    "intro_idx": image_plan.get("intro_image_index"),
+                    "body_idxs": image_plan.get("body_image_indices"),
+                    "excluded_idxs": image_plan.get("excluded_image_indices"),
+                    "image_list": image_list,
+                    "final_options_block": final_options_block,
+                    "mbti_guide": _get_mbti_guide(persona.get("mbti", {}) or {}),
+                },
+                # 사용자 직접 입력(extra)과 Step4 옵션은 줄이지 않음
+                ("blog_style", "image_list", "tone_example", "mbti_guide", "target_context", "outline_summary"),
+            ),
         )
-        try:
-            raw = _extract_json_with_marker(text)
-        except Exception:
-            raw = _extract_json_with_marker(_repair_missing_brace(text))
-        intro_txt = safe_str((raw or {}).get("intro_markdown"))
-        body_txt = safe_str((raw or {}).get("body_markdown"))
-        if not intro_txt or not body_txt:
-            retry_prompt = (
-                intro_body_prompt
-                + "\n\n[주의] 직전 출력의 intro_markdown/body_markdown가 비어있습니다. 반드시 채워서 다시 출력하세요. 끝에 <END_JSON> 추가."
-            )
-            try:
-                retry_text = client.generate_text(
-                    "전문 블로거",
-                    retry_prompt,
-                    temperature=0.2,
-                )
-                try:
-                    raw = _extract_json_with_marker(retry_text)
-                except Exception:
-                    raw = _extract_json_with_marker(_repair_missing_brace(retry_text))
-            except Exception as retry_e:
-                raise
-    except Exception as e:
-        # fallback: try shorter prompt via generate_text and manual JSON extract
-        fallback_prompt = f"""
-너는 블로그 작가다. 아래 정보를 바탕으로 JSON만 출력하라.
 
-[주제] {main_kw}
-[타겟 독자] {target_reader}
-[글 구성] {outline_summary}
-[섹션] {', '.join(safe_list((brief.get('outline', {}) or {}).get('sections')))}
+        partials: "queue.Queue[Dict[str, str]]" = queue.Queue()
+        body_future = runner.submit(
+            "intro_body",
+            lambda: _write_intro_body(
+                client,
+                compose_system_prompt("전문 블로거", intro_body_static),
+                intro_body_prompt,
+                temperature_step5,
+                main_kw=main_kw,
+                target_reader=target_reader,
+                outline_summary=outline_summary,
+                brief=brief,
+                image_plan=image_plan,
+                on_partial=partials.put if on_stream else None,
+            ),
+        )
+        if on_stream:
+            raw = runner.result_streaming("intro_body", body_future, None, partials, on_stream)
+        else:
+            raw = runner.result("intro_body", body_future, default=None)
+        if raw is None:
+            raw = _minimal_intro_body(main_kw, target_reader, brief, image_plan, "intro_body 시간 초과")
 
-출력 JSON:
-{{"intro_markdown":"...","body_markdown":"...","hashtags":["#..."],"image_guide":"...","image_plan":{{}},"package":null}}
-""".strip()
-        try:
-            text = client.generate_text("전문 블로거", fallback_prompt, temperature=0.2)
-            raw = client._extract_first_json_object(text)
-        except Exception as e2:
-            # minimal non-empty fallback
-            outline_sections = safe_list((brief.get("outline", {}) or {}).get("sections"))
-            intro_fallback = f"{main_kw}에 대해 핵심 흐름을 정리해보겠습니다. {target_reader}에게 필요한 맥락부터 차근히 짚어볼게요."
-            body_parts = []
-            for s in outline_sections[:5]:
-                body_parts.append(f"### {s}\n{s}에 대해 핵심 포인트를 정리합니다. 실제 상황에서 어떻게 적용되는지 함께 살펴보세요.")
-            body_fallback = "\n\n".join(body_parts) if body_parts else f"{main_kw}의 핵심 내용을 정리합니다."
-            raw = {
-                "intro_markdown": intro_fallback,
-                "body_markdown": body_fallback,
-                "hashtags": [],
-                "image_guide": "",
-                "image_plan": image_plan,
-                "package": None,
-                "evidence_notes": [f"생성 실패: {e}"],
-            }
+        title_out = runner.result("title", title_future, default={}) or {}
+    finally:
+        runner.shutdown()
 
     out = {
         "title": safe_str(title_out.get("title")) or safe_str(raw.get("title")) or main_kw or "제목",
@@ -466,9 +678,14 @@ def generate_post(ctx: Dict[str, Any], client: Optional[OllamaClient] = None) ->
     out["post_markdown"] = strip_special_markers(out.get("post_markdown", ""))
     out["outro"] = strip_special_markers(out.get("outro", ""))
 
-    # 본문 최소 길이 확보
+    # 본문 최소 길이 확보 (세션 토큰 예산을 넘었으면 확장 호출 없이 그대로 사용)
     before_len = len(safe_str(out.get("post_markdown")))
-    out["post_markdown"] = _ensure_min_length(out.get("post_markdown", ""), 1500, client)
+    budget_skipped: List[str] = []
+    if session_budget_exceeded():
+        print("💸 세션 토큰 예산 초과: 본문 길이 확장을 건너뜁니다.")
+        budget_skipped.append("extend")
+    else:
+        out["post_markdown"] = _ensure_min_length(out.get("post_markdown", ""), 1500, client)
     # 문장 끝 마침표 보정
     out["summary"] = ensure_sentence_end(out.get("summary", ""))
     out["post_markdown"] = ensure_sentence_end(out.get("post_markdown", ""))
@@ -507,6 +724,10 @@ def generate_post(ctx: Dict[str, Any], client: Optional[OllamaClient] = None) ->
         "generated_at": datetime.now().isoformat(timespec="seconds"),
         "debug": {
             "raw": raw,
+            "timings": {**runner.timings, "total": round(time.perf_counter() - started_at, 3)},
+            "timed_out": runner.timed_out,
+            "stage_errors": runner.errors,
+            "budget_skipped": budget_skipped,
             "prompts": {
                 "image_plan": plan_prompt,
                 "title": title_prompt,
@@ -7,6 +7,12 @@ import streamlit as st
 import os
 import base64
 from state import init_state, load_persona_from_disk
+from agents.ollama_router import set_route_session
+from agents.model_warmup import start_model_warmup
+from utils.prom_metrics import start_metrics_server
+from utils.tracing import set_trace_session, trace_span
+from utils.llm_usage import set_usage_session
+from utils.prompt_loader import validate_prompts
 
 # UI Components Import
 from ui.step1_persona import render as render_step1
@@ -60,6 +66,22 @@ render_header()
 init_state()
 load_persona_from_disk()
 
+# 같은 세션의 LLM 요청은 같은 Ollama 서버로 (KV 캐시 재사용)
+set_route_session(st.session_state["session_id"])
+# 세션 1개 = trace 1개 (TRACING_ENABLED일 때 단계 화면/에이전트/LLM 호출 span 기록)
+set_trace_session(st.session_state["session_id"])
+# LLM 토큰/비용을 세션별로 집계 (SESSION_TOKEN_BUDGET 판단 기준)
+set_usage_session(st.session_state["session_id"])
+
+# 텍스트/비전 모델 미리 로드 (백그라운드, 프로세스당 1회)
+start_model_warmup()
+
+# Prometheus 지표 엔드포인트 (METRICS_PORT 지정 시, 프로세스당 1회)
+start_metrics_server()
+
+# 프롬프트 플레이스홀더 미리 검사 (문제는 로그로 알림, 프로세스당 1회)
+validate_prompts()
+
 
 def build_ctx():
     # ctx는 스키마 키만
@@ -77,16 +99,17 @@ def build_ctx():
 
 step = st.session_state.get("step", 1)
 
-if step == 1:
-    render_step1(build_ctx())
-elif step == 2:
-    render_step2(build_ctx())
-elif step == 3:
-    render_step3(build_ctx())
-elif step == 4:
-    render_step4(build_ctx())
-elif step == 5:
-    render_step5(build_ctx())
-else:
-    st.session_state["step"] = 1
-    st.rerun()
+with trace_span(f"render_step{step}", **{"wizard.step": step}):
+    if step == 1:
+        render_step1(build_ctx())
+    elif step == 2:
+        render_step2(build_ctx())
+    elif step == 3:
+        render_step3(build_ctx())
+    elif step == 4:
+        render_step4(build_ctx())
+    elif step == 5:
+        render_step5(build_ctx())
+    else:
+        st.session_state["step"] = 1
+        st.rerun()
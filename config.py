@@ -19,6 +19,29 @@ API_KEY = os.getenv("OPENAI_API_KEY") or os.getenv("LLM_API_KEY")
 BASE_URL = os.getenv("OPENAI_API_BASE") or os.getenv("LLM_BASE_URL")
 ENV_API_MODE = (os.getenv("API_MODE", "") or "").lower().strip()
 
+
+def env_flag(name: str, default: bool = False) -> bool:
+    """.env의 on/off 값을 bool로 읽습니다. (1/true/yes/on)"""
+    raw = (os.getenv(name, "") or "").lower().strip()
+    if not raw:
+        return default
+    return raw in ("1", "true", "yes", "on")
+
+
+def env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name) or default)
+    except ValueError:
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name) or default)
+    except ValueError:
+        return default
+
+
 def resolve_api_mode(env_api_mode: str = ENV_API_MODE, api_key: str | None = API_KEY) -> str:
     if env_api_mode == "openai":
         return "openai" if (api_key and str(api_key).startswith("sk-")) else "ollama"
@@ -39,6 +62,82 @@ def normalize_openai_model(model_name: str, fallback: str = "gpt-4o") -> str:
 MODEL_TEXT = (os.getenv("MODEL_TEXT") or "llama3.1:8b").strip()
 MODEL_VISION = (os.getenv("MODEL_VISION") or "llava:7b").strip()
 
+# Ollama 서버 주소 (비어 있으면 ollama 라이브러리 기본값/OLLAMA_HOST 환경변수 사용)
+OLLAMA_HOST = (os.getenv("OLLAMA_HOST") or "").strip() or None
+
+# Ollama 서버 여러 대 라우팅 (agents/ollama_router.py)
+# OLLAMA_HOSTS=http://box1:11434,http://box2:11434 (비어 있으면 OLLAMA_HOST 한 대만 사용)
+OLLAMA_HOSTS = [h.strip() for h in (os.getenv("OLLAMA_HOSTS") or "").split(",") if h.strip()] or [OLLAMA_HOST]
+OLLAMA_HEALTH_INTERVAL_SEC = env_float("OLLAMA_HEALTH_INTERVAL_SEC", 30.0)
+OLLAMA_HEALTH_TIMEOUT_SEC = env_float("OLLAMA_HEALTH_TIMEOUT_SEC", 3.0)
+# 세션 고정 호스트가 가장 한가한 호스트보다 이만큼 더 바빠질 때까지는 그대로 사용 (KV 캐시 재사용)
+OLLAMA_STICKY_SLACK = env_int("OLLAMA_STICKY_SLACK", 1)
+
+# 모델을 메모리에 유지할 시간 (모든 Ollama 호출에 keep_alive로 전달, 예: "30m", "2h", "-1m"=계속 유지)
+OLLAMA_KEEP_ALIVE = (os.getenv("OLLAMA_KEEP_ALIVE") or "30m").strip()
+# 앱 시작 시 MODEL_TEXT / MODEL_VISION을 백그라운드에서 미리 로드 (프로세스당 1회)
+LLM_WARMUP_ENABLED = env_flag("LLM_WARMUP_ENABLED", True)
+
+# LLM HTTP 커넥션 풀 (OpenAI SDK / ollama 라이브러리 공용)
+LLM_POOL_MAX_CONNECTIONS = env_int("LLM_POOL_MAX_CONNECTIONS", 10)
+LLM_POOL_IDLE_SEC = env_float("LLM_POOL_IDLE_SEC", 60.0)
+LLM_HTTP_TIMEOUT_SEC = env_float("LLM_HTTP_TIMEOUT_SEC", 300.0)
+
+# generate_json에서 백엔드의 JSON 제약 디코딩 사용 (Ollama format / OpenAI response_format)
+LLM_NATIVE_JSON = env_flag("LLM_NATIVE_JSON", True)
+
+# 프롬프트 prefix 캐시 힌트 (OpenAI prompt_cache_key, 스트리밍 usage 요청)
+# OpenAI 호환 서버(BASE_URL 지정)는 모르는 파라미터를 거부할 수 있어 기본값은 공식 OpenAI일 때만 켬
+LLM_PROMPT_CACHE_HINTS = env_flag("LLM_PROMPT_CACHE_HINTS", BASE_URL is None)
+
+# 프롬프트 토큰 예산 (utils/token_budget.py)
+# Ollama는 num_ctx를 넘는 프롬프트를 경고 없이 잘라내므로, 보내기 전에 우선순위 낮은 섹션부터 줄임
+# OLLAMA_NUM_CTX: 지정하면 모든 Ollama 호출(미리 로드 포함)에 options.num_ctx로 전달
+# 기본 0 = num_ctx를 보내지 않고 서버 기본값 사용(예산은 4096으로 가정). 키우면 KV 메모리가 늘고 모델이 다시 로드될 수 있음
+OLLAMA_NUM_CTX = env_int("OLLAMA_NUM_CTX", 0)
+LLM_CONTEXT_TOKENS_OPENAI = env_int("LLM_CONTEXT_TOKENS_OPENAI", 128000)
+# 응답 생성용으로 남겨둘 토큰 (Step5 본문 3000자 내외 기준)
+LLM_OUTPUT_RESERVE_TOKENS = env_int("LLM_OUTPUT_RESERVE_TOKENS", 3072)
+
+# 백엔드별 동시 요청 상한 (프로세스 전체 공용, 동기/비동기 클라이언트 공통: agents/backend_limiter.py)
+# Ollama는 서버 1대당 값 (OLLAMA_HOSTS 수만큼 곱함)
+LLM_MAX_CONCURRENCY_OPENAI = env_int("LLM_MAX_CONCURRENCY_OPENAI", 8)
+LLM_MAX_CONCURRENCY_OLLAMA = env_int("LLM_MAX_CONCURRENCY_OLLAMA", 2)
+
+# Step2 이미지별 비전 분석 동시 실행 (agents/image_agent.py)
+# CONCURRENCY=0이면 백엔드 상한 사용 (OpenAI: LLM_MAX_CONCURRENCY_OPENAI, Ollama: LLM_MAX_CONCURRENCY_OLLAMA × 서버 수)
+# 이미지 1장이 TIMEOUT_SEC 안에 끝나지 않으면 그 사진은 빼고 나머지 결과로 통합 기획
+IMAGE_ANALYSIS_CONCURRENCY = env_int("IMAGE_ANALYSIS_CONCURRENCY", 0)
+IMAGE_ANALYSIS_TIMEOUT_SEC = env_float("IMAGE_ANALYSIS_TIMEOUT_SEC", 90.0)
+# 여러 장을 한 번의 비전 요청으로 분석 (+ 통합 기획까지 같은 응답으로): auto(OpenAI만) | on | off
+# 모델이 형식을 지키지 못하거나 여러 장을 거부하면 자동으로 장별 분석으로 대체
+# Ollama에서 켤 때는 이미지 토큰이 num_ctx를 넘지 않도록 IMAGE_BATCH_SIZE를 4장 내외로 권장
+IMAGE_BATCH_MODE = (os.getenv("IMAGE_BATCH_MODE") or "auto").lower().strip()
+IMAGE_BATCH_SIZE = env_int("IMAGE_BATCH_SIZE", 10)
+
+# LLM 호출 재시도/차단 (agents/resilience.py)
+# - 재시도 대기: 지수 백오프 + full jitter, Retry-After 헤더가 있으면 우선
+# - 재시도 예산: 요청 1건당 RATIO만큼 적립, 재시도 1회당 1 소모 (백엔드 장애 시 재시도 폭주 방지)
+# - 서킷 브레이커: 연속 실패 N회면 RESET_SEC 동안 즉시 실패 후 1건만 시험 호출
+LLM_RETRY_MAX_ATTEMPTS = env_int("LLM_RETRY_MAX_ATTEMPTS", 4)
+LLM_RETRY_BASE_DELAY_SEC = env_float("LLM_RETRY_BASE_DELAY_SEC", 1.0)
+LLM_RETRY_MAX_DELAY_SEC = env_float("LLM_RETRY_MAX_DELAY_SEC", 30.0)
+LLM_RETRY_BUDGET_RATIO = env_float("LLM_RETRY_BUDGET_RATIO", 0.2)
+LLM_RETRY_BUDGET_MAX = env_float("LLM_RETRY_BUDGET_MAX", 10.0)
+LLM_BREAKER_FAILURES = env_int("LLM_BREAKER_FAILURES", 5)
+LLM_BREAKER_RESET_SEC = env_float("LLM_BREAKER_RESET_SEC", 30.0)
+
+# 헤징(hedged request): hedge 이름을 넘긴 짧은 호출만 대상 (제목 추천/최종 제목)
+# 최근 지연시간의 PERCENTILE 안에 응답이 없으면 다른 서버/모델로 같은 요청을 한 번 더 보내고 먼저 끝난 쪽 사용
+# (opt-in: LLM_HEDGE_ENABLED=1, 예비 요청을 보낼 다른 Ollama 서버나 LLM_HEDGE_BACKUP_MODEL이 있어야 동작)
+LLM_HEDGE_ENABLED = env_flag("LLM_HEDGE_ENABLED", False)
+LLM_HEDGE_PERCENTILE = env_float("LLM_HEDGE_PERCENTILE", 0.9)
+LLM_HEDGE_DEFAULT_DELAY_SEC = env_float("LLM_HEDGE_DEFAULT_DELAY_SEC", 5.0)
+LLM_HEDGE_MIN_DELAY_SEC = env_float("LLM_HEDGE_MIN_DELAY_SEC", 1.0)
+LLM_HEDGE_MAX_DELAY_SEC = env_float("LLM_HEDGE_MAX_DELAY_SEC", 20.0)
+# 예비 요청에 쓸 모델 (비우면 같은 모델을 다른 서버로)
+LLM_HEDGE_BACKUP_MODEL = (os.getenv("LLM_HEDGE_BACKUP_MODEL") or "").strip() or None
+
 # 후보 개수
 N_SUBTOPICS = 6
 N_TITLES = 5
@@ -48,6 +147,13 @@ N_HASHTAGS = 10
 # 글 길이 가이드
 TARGET_CHARS = 2500
 
+# Step5 단계별 타임아웃(초): 제출 시점부터 계산, 초과 시 해당 단계는 기본값으로 대체
+STEP5_STAGE_TIMEOUTS = {
+    "image_plan": env_float("STEP5_TIMEOUT_IMAGE_PLAN", 90.0),
+    "title": env_float("STEP5_TIMEOUT_TITLE", 60.0),
+    "intro_body": env_float("STEP5_TIMEOUT_INTRO_BODY", 300.0),
+}
+
 # 카테고리/고정값
 MBTI = {
 "ISTJ": "신뢰감 1위! 팩트와 논리 중심의 꼼꼼한 정보 요약가",
@@ -123,6 +229,78 @@ STEP2_PATH = f"{ASSETS_DIR}/step2_snapshot.json"
 STEP3_PATH = f"{ASSETS_DIR}/step3_snapshot.json"
 STEP4_PATH = f"{ASSETS_DIR}/step4_snapshot.json"
 
+# 업로드 이미지 저장소 (utils/image_store.py): 원본 sha256 기준, 세션 상태에는 ID만 보관
+IMAGE_STORE_DIR = f"{ASSETS_DIR}/images"
+IMAGE_STORE_MAX_MB = env_int("IMAGE_STORE_MAX_MB", 500)
+# 화면 표시용 변형의 긴 변(px)
+IMAGE_PREVIEW_MAX_SIDE = env_int("IMAGE_PREVIEW_MAX_SIDE", 400)
+# 비전 모델 입력용 변형 (백엔드별 긴 변 px / JPEG 품질)
+# - OpenAI: 512px 이하면 타일 1장으로 처리되어 입력 토큰이 가장 적음
+# - Ollama(llava 등): 비전 인코더 입력(336/672px)에 맞춰 조금 크게, 품질 높게
+IMAGE_MODEL_VARIANTS = {
+    "openai": {
+        "max_side": env_int("IMAGE_MODEL_MAX_SIDE_OPENAI", 512),
+        "quality": env_int("IMAGE_MODEL_QUALITY_OPENAI", 80),
+    },
+    "ollama": {
+        "max_side": env_int("IMAGE_MODEL_MAX_SIDE_OLLAMA", 672),
+        "quality": env_int("IMAGE_MODEL_QUALITY_OLLAMA", 90),
+    },
+}
+
+# LLM 응답 캐시 (opt-in: LLM_CACHE_ENABLED=1)
+# 동일한 (mode, model, system_role, prompt, temperature, top_p) 요청은 디스크에서 바로 반환
+LLM_CACHE_ENABLED = env_flag("LLM_CACHE_ENABLED", False)
+LLM_CACHE_DIR = f"{ASSETS_DIR}/llm_cache"
+LLM_CACHE_TTL_SEC = env_int("LLM_CACHE_TTL_SEC", 7 * 24 * 3600)
+LLM_CACHE_MAX_MB = env_int("LLM_CACHE_MAX_MB", 200)
+
+# 이미지별 비전 분석 캐시 (agents/image_agent.py): dHash(utils/image_hash.py) + 사진 의도 + 비전 모델이 같으면 재사용
+IMAGE_CACHE_ENABLED = env_flag("IMAGE_CACHE_ENABLED", True)
+IMAGE_CACHE_DIR = f"{ASSETS_DIR}/image_cache"
+IMAGE_CACHE_TTL_SEC = env_int("IMAGE_CACHE_TTL_SEC", 30 * 24 * 3600)
+IMAGE_CACHE_MAX_MB = env_int("IMAGE_CACHE_MAX_MB", 20)
+# 한 번에 올린 사진 중 dHash 해밍 거리가 이 값 이하면 같은 장면으로 보고 대표 1장만 분석 (-1이면 묶지 않음)
+IMAGE_DUP_MAX_DISTANCE = env_int("IMAGE_DUP_MAX_DISTANCE", 6)
+
+# LLM/비전 호출 녹화·재생 (utils/llm_cassette.py)
+# record: 실제 호출 결과와 지연시간을 JSONL로 기록 / replay: 기록된 응답만 사용 (모델 없이 재현)
+LLM_CASSETTE_MODE = (os.getenv("LLM_CASSETTE_MODE") or "").lower().strip()
+LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH") or f"{ASSETS_DIR}/llm_cassette.jsonl"
+# replay 시 기록된 지연시간 재현 배율 (0이면 대기 없음, 1이면 녹화 당시 그대로)
+LLM_CASSETTE_LATENCY_SCALE = env_float("LLM_CASSETTE_LATENCY_SCALE", 0.0)
+
+# LLM 호출별 지표 (utils/llm_metrics.py): 단계/모델/토큰/대기/TTFT/지연/재시도를 JSONL로 기록 (크기 기준 회전)
+LLM_METRICS_ENABLED = env_flag("LLM_METRICS_ENABLED", True)
+LLM_METRICS_PATH = os.getenv("LLM_METRICS_PATH") or f"{ASSETS_DIR}/llm_calls.jsonl"
+LLM_METRICS_MAX_MB = env_float("LLM_METRICS_MAX_MB", 10.0)
+LLM_METRICS_BACKUPS = env_int("LLM_METRICS_BACKUPS", 3)
+
+# Prometheus 지표 엔드포인트 (utils/prom_metrics.py): 0이면 끔, 예) METRICS_PORT=9464 → http://호스트:9464/metrics
+METRICS_PORT = env_int("METRICS_PORT", 0)
+METRICS_HOST = (os.getenv("METRICS_HOST") or "0.0.0.0").strip()
+
+# 트레이싱 (utils/tracing.py): 단계 화면/에이전트 함수/LLM 호출별 span을 OTLP/JSON 파일로 기록 (opt-in)
+TRACING_ENABLED = env_flag("TRACING_ENABLED", False)
+TRACE_PATH = os.getenv("TRACE_PATH") or f"{ASSETS_DIR}/traces.jsonl"
+TRACE_MAX_MB = env_float("TRACE_MAX_MB", 20.0)
+TRACE_BACKUPS = env_int("TRACE_BACKUPS", 3)
+TRACE_SERVICE_NAME = (os.getenv("TRACE_SERVICE_NAME") or "3-minute-blog").strip()
+
+# LLM 사용량/비용 집계 (utils/llm_usage.py): 세션별·글별 토큰과 비용, USAGE_DIR/<session_id>.json에 스냅샷 저장
+USAGE_DIR = f"{ASSETS_DIR}/usage"
+# 세션당 토큰 예산 (0이면 무제한). 넘으면 본문 확장/헤징 예비 요청 같은 선택적 호출을 생략
+SESSION_TOKEN_BUDGET = env_int("SESSION_TOKEN_BUDGET", 0)
+# OpenAI 단가: 모델 이름 접두사 → (입력, 출력) 100만 토큰당 USD. Ollama(로컬)는 0으로 계산
+LLM_PRICES_PER_1M = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
 # 말투 프리셋 예시
 TONE_PRESETS = {
     "친근한": "이거 진짜 대박이죠? 저도 써보고 완전 반했잖아요. 여러분도 꼭 한번 체험해보세요!",
@@ -9,8 +9,11 @@
 import copy
 import json
 import os
+import uuid
 import streamlit as st
-from config import PROFILE_PATH, STEP2_PATH, STEP3_PATH, STEP4_PATH, TARGET_CHARS, FINAL_OPTION_DEFAULTS
+from config import PROFILE_PATH, STEP2_PATH, STEP3_PATH, STEP4_PATH, USAGE_DIR, TARGET_CHARS, FINAL_OPTION_DEFAULTS
+from utils.llm_usage import session_usage
+from utils.image_store import get_image_store
 
 
 # FIX: config의 PROFILE_PATH를 일관되게 사용
@@ -36,7 +39,7 @@ DEFAULT_STATE = {
     # Step2: 주제/제목/이미지
     "topic_flow": {
         "images": {
-            "files": [],       # UploadedFile / bytes / path 등 프로젝트 룰에 맞춰 저장
+            "files": [],       # 이미지 ID(utils/image_store.py, 원본 sha256) 목록. 바이트는 디스크 저장소에
             "captions": [],
             "intent": {"mode": "none", "preset": None, "custom_text": ""},
         "analysis": {"mood": None, "tags": [], "raw": None, "source": None},
@@ -160,6 +163,9 @@ def init_state():
     for k, v in DEFAULT_STATE.items():
         if k not in st.session_state:
             st.session_state[k] = copy.deepcopy(v)
+    # 세션 식별자 (Ollama 서버 고정 라우팅용). 리셋해도 유지되도록 DEFAULT_STATE 밖에 둠
+    if "session_id" not in st.session_state:
+        st.session_state["session_id"] = uuid.uuid4().hex
 
 
 def reset_all():
@@ -220,18 +226,16 @@ def save_persona_to_disk():
 
 
 def save_step2_to_disk():
-    """Step2 데이터를 JSON 파일로 저장합니다. 이미지는 제외됩니다."""
+    """Step2 데이터를 JSON 파일로 저장합니다. 이미지는 ID만 저장됩니다. (바이트는 이미지 저장소에)"""
     os.makedirs(os.path.dirname(STEP2_PATH), exist_ok=True)
     
     # 1. 세션 데이터 복사 (원본 훼손 방지)
     topic_data = copy.deepcopy(st.session_state.get("topic_flow", {}))
     options_data = copy.deepcopy(st.session_state.get("options", {}))
 
-    # 2. JSON 저장 불가한 '이미지 바이너리' 데이터 제거
-    # ⚠️ NOTE: 이미지는 세션에만 유지됩니다. 앱 재시작 시 다시 업로드 필요.
-    # TODO: 향후 assets/images 폴더에 파일로 저장하는 로직 추가 필요
+    # 2. 예전 세션처럼 바이트가 남아 있으면 JSON에 넣을 수 없으므로 제외
     if "images" in topic_data and "files" in topic_data["images"]:
-        topic_data["images"]["files"] = []  # 빈 리스트로 변경하여 저장
+        topic_data["images"]["files"] = [f for f in topic_data["images"]["files"] if isinstance(f, str)]
 
     payload = {
         "topic_flow": topic_data,
@@ -243,6 +247,7 @@ def save_step2_to_disk():
             json.dump(payload, f, ensure_ascii=False, indent=2)
     except Exception as e:
         print(f"⚠️ Step2 저장 중 오류: {e}")
+    save_usage_to_disk()
         
 
 def save_step3_to_disk():
@@ -251,6 +256,7 @@ def save_step3_to_disk():
     payload = {"design_brief": st.session_state.get("design_brief")}
     with open(STEP3_PATH, "w", encoding="utf-8") as f:
         json.dump(payload, f, ensure_ascii=False, indent=2)
+    save_usage_to_disk()
 
 
 def save_step4_to_disk():
@@ -259,6 +265,58 @@ def save_step4_to_disk():
     payload = {"final_options": st.session_state.get("final_options")}
     with open(STEP4_PATH, "w", encoding="utf-8") as f:
         json.dump(payload, f, ensure_ascii=False, indent=2)
+    save_usage_to_disk()
+
+
+def save_usage_to_disk():
+    """
+    세션 누적 LLM 사용량(토큰/비용)과 마지막 글의 사용량을 JSON 파일로 저장합니다.
+    세션마다 파일을 따로 씀 (USAGE_DIR/<session_id>.json, 동시 세션끼리 덮어쓰지 않도록)
+    """
+    session_id = st.session_state.get("session_id")
+    if not session_id:
+        return
+    os.makedirs(USAGE_DIR, exist_ok=True)
+    result = (st.session_state.get("outputs") or {}).get("result") or {}
+    payload = {
+        "session_id": session_id,
+        "session": session_usage(session_id),
+        "last_post": (result.get("usage") or {}).get("post"),
+    }
+    try:
+        with open(os.path.join(USAGE_DIR, f"{session_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        print(f"⚠️ 사용량 저장 중 오류: {e}")
+
+
+def load_step2_from_disk() -> bool:
+    """저장된 Step2 스냅샷(주제/옵션/이미지 ID)을 불러옵니다. 저장소에서 지워진 이미지는 뺍니다."""
+    if not os.path.exists(STEP2_PATH):
+        return False
+    try:
+        with open(STEP2_PATH, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        topic_flow = payload.get("topic_flow")
+        options = payload.get("options")
+        if not isinstance(topic_flow, dict):
+            return False
+        store = get_image_store()
+        images = topic_flow.get("images") or {}
+        images["files"] = [h for h in images.get("files") or [] if store.has(h)]
+        topic_flow["images"] = images
+        # 기본값 위에 덮어쓰기(안전)
+        merged = copy.deepcopy(DEFAULT_STATE["topic_flow"])
+        merged.update(topic_flow)
+        st.session_state["topic_flow"] = merged
+        if isinstance(options, dict):
+            merged_options = copy.deepcopy(DEFAULT_STATE["options"])
+            merged_options.update(options)
+            st.session_state["options"] = merged_options
+        return True
+    except Exception as e:
+        print(f"⚠️ Step2 불러오기 실패: {e}")
+        return False
 
 
 def load_persona_from_disk():
@@ -5,8 +5,6 @@
 import sys
 import os
 
-import io
-from PIL import Image
 from typing import Dict, Any, Optional
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -15,16 +13,18 @@ if root_dir not in sys.path:
     sys.path.append(root_dir)
 
 import streamlit as st
-from config import POST_TYPES, HEADLINE_STYLES, CATEGORIES, SUBTOPICS_MAP
-from state import reset_from_step
+from config import POST_TYPES, HEADLINE_STYLES, CATEGORIES, SUBTOPICS_MAP, STEP2_PATH
+from state import reset_from_step, save_step2_to_disk, load_step2_from_disk
+from utils.image_store import get_image_store, load_images
 from utils.prompt_loader import load_prompt, render_prompt
 
 # 에이전트 임포트
 try:
-    from agents.image_agent import analyze_image_agent, parse_image_analysis
+    from agents.image_agent import analyze_image_agent, parse_image_analysis, model_image_variant
     from agents.write_agent import suggest_titles_agent
 except ImportError as e:
     analyze_image_agent = None
+    model_image_variant = None
     suggest_titles_agent = None
 
 
@@ -35,37 +35,6 @@ except ImportError as e:
 
 
 
-@st.cache_data
-def resize_image_cached(image_bytes, max_size=400):
-    """이미지 바이트를 받아 300~400px 내외로 리사이징하여 반환합니다."""
-    try:
-        img = Image.open(io.BytesIO(image_bytes))
-        # RGBA 등을 RGB로 변환 (JPEG 저장용)
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-            
-        width, height = img.size
-        # 긴 쪽을 max_size에 맞춤
-        if width > height:
-            if width > max_size:
-                height = int((max_size / width) * height)
-                width = max_size
-        else:
-            if height > max_size:
-                width = int((max_size / height) * width)
-                height = max_size
-        
-        img = img.resize((width, height), Image.LANCZOS)
-        
-        output = io.BytesIO()
-        img.save(output, format="JPEG", quality=85)
-        return output.getvalue()
-    except Exception as e:
-        st.error(f"⚠️ 에이전트 로딩 실패 원인: {e}")
-        print(f"Image resize error: {e}")
-        return image_bytes
-
-
 def _run_title_suggestion(topic_flow, subtopic_override=None, intensity=0.5, default_temp=0.4):
     """
     제목 추천 에이전트를 실행하고 결과를 업데이트하는 공통 로직
@@ -202,58 +171,57 @@ def render_step2(ctx):
         )
 
 
-        # 리사이징된 이미지 바이트를 담을 리스트
-        processed_images = []
+        # 이미지 ID(원본 sha256) 목록. 바이트는 디스크 저장소(utils/image_store.py)에 보관
+        store = get_image_store()
+        image_ids = []
 
         if uploaded_files:
             if len(uploaded_files) > 10:
                 st.warning("⚠️ 이미지는 최대 10장까지만 추가할 수 있습니다.")
                 uploaded_files = uploaded_files[:10]
 
-            # 모든 파일 리사이징 처리 (300~400px)
-            for f in uploaded_files:
-                resized_b = resize_image_cached(f.getvalue(), max_size=400)
-                processed_images.append(resized_b)
+            # 원본 1회 디코딩으로 미리보기(400px) + 백엔드별 모델 입력 변형 저장 (같은 사진은 다시 처리하지 않음)
+            image_ids = [store.put(f.getvalue()) for f in uploaded_files]
 
-            st.caption(f"사진 {len(uploaded_files)}장 선택됨 (자동 리사이징 400px 적용됨)")
+            st.caption(f"사진 {len(uploaded_files)}장 선택됨 (미리보기 400px 자동 적용)")
 
             cols = st.columns(3)
-            for idx, img_bytes in enumerate(processed_images):
+            for idx, img_bytes in enumerate(load_images(image_ids, "preview")):
                 with cols[idx % 3]:
                     st.image(img_bytes, caption=f"{idx+1}", use_container_width=True)
-
-            first_file_bytes = processed_images[0]
         else:
-            first_file_bytes = None
             # [Fix] 페이지 갱신/이동 시 이미지가 날아가는 문제 해결
-            # 업로드된 파일이 없더라도, 기존에 저장된 이미지가 있다면 유지합니다.
-            if topic_flow["images"]["files"]:
-                processed_images = topic_flow["images"]["files"]
-                
+            # 업로드된 파일이 없더라도, 기존에 저장된 이미지가 있다면 유지합니다. (저장소에서 지워진 사진은 제외)
+            image_ids = [h for h in topic_flow["images"]["files"] if store.has(h)]
+            if image_ids:
                 # 기존 이미지 다시 보여주기
                 st.info("💡 이전에 분석한 사진이 남아있습니다.")
                 cols = st.columns(3)
-                for idx, img_bytes in enumerate(processed_images):
+                for idx, img_bytes in enumerate(load_images(image_ids, "preview")):
                     with cols[idx % 3]:
                         st.image(img_bytes, caption=f"{idx+1}", use_container_width=True)
-            else:
-                 # 정말 아무것도 없는 경우
-                 pass
+            elif os.path.exists(STEP2_PATH):
+                # 앱 재시작 등으로 세션이 비었으면 마지막 Step2 스냅샷에서 복원
+                if st.button("이전 사진 불러오기", key="btn_load_step2"):
+                    if load_step2_from_disk():
+                        st.rerun()
+                    else:
+                        st.info("불러올 수 있는 이전 사진이 없습니다.")
 
         render_photo_intent_section(topic_flow)
 
         st.markdown("<br>", unsafe_allow_html=True)
 
         if st.button("사진 먼저 분석하기 (추천 주제 받기)", key="btn_analyze_first", type="primary", use_container_width=True):
-            if processed_images:
-                total_count = len(processed_images)
+            if image_ids:
+                total_count = len(image_ids)
                 with st.spinner(f"{total_count}장의 사진을 분석하여 주제를 추출 중입니다..."):
                     try:
                         # 사용자 의도를 최우선으로 전달
                         user_intent = topic_flow["images"]["intent"]["custom_text"] or ""
                         
                         # 모든 이미지를 analyze_image_agent에 전달 (단일/다중 모두 처리)
-                        analysis_result = analyze_image_agent(processed_images, user_intent=user_intent)
+                        analysis_result = analyze_image_agent(load_images(image_ids, model_image_variant()), user_intent=user_intent)
                         mood, tags = parse_image_analysis(analysis_result)
 
                         # 02.02 추가: AI가 mood에 사용자 의도를 누락했거나 약하게 반영했을 경우를 대비해 수동 결합
@@ -261,10 +229,12 @@ def render_step2(ctx):
                             mood = f"{user_intent} {mood}"
 
                         # 모든 이미지를 저장 (다중 이미지 지원)
-                        topic_flow["images"]["files"] = processed_images
+                        topic_flow["images"]["files"] = image_ids
                         topic_flow["images"]["analysis"]["raw"] = analysis_result
                         topic_flow["images"]["analysis"]["mood"] = mood
                         topic_flow["images"]["analysis"]["tags"] = tags
+                        # 이미지 ID와 분석 결과를 스냅샷으로 남겨 재시작 후에도 다시 불러올 수 있게 함
+                        save_step2_to_disk()
 
                         # 02.02 추가: 이미지 분석 직후 write_agent의 suggest_titles_agent 호출
                         # 리팩토링: 공통 함수 사용
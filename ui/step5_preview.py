@@ -6,7 +6,8 @@ import re
 import streamlit as st
 
 from agents.write_agent import generate_post 
-from state import reset_all
+from state import reset_all, save_usage_to_disk
+from utils.image_store import load_images
 
 def render(ctx):
     """
@@ -17,34 +18,56 @@ def render(ctx):
     # --- [1단계: 글 생성 실행] ---
     if st.session_state["outputs"]["status"] == "idle":
         
-        # 1) 로딩 화면 표시 (Lottie Animation)
+        # 1) 로딩 화면 표시 + 생성되는 서론/본문을 실시간으로 보여줄 자리
         ph = st.empty()
         
         with ph.container():
             # 로딩 메시지 표시
-            # 메시지
             st.markdown(
                 """
                 <div style='text-align:center; padding-top: 20px;'>
                     <h2 style='color:#E30613; margin-bottom:10px; font-weight: 800;'>AI 셰프가 요리 중입니다!</h2>
                     <p style='font-size:1.2rem; color:#333; font-weight: 600; line-height: 1.6;'>
                         선택하신 재료로 맛있는 글을 볶고 있어요.<br>
-                        <span style='font-size:1rem; color:#888; font-weight:500;'>(약 15~30초 정도 소요됩니다)</span>
+                        <span style='font-size:1rem; color:#888; font-weight:500;'>(작성되는 내용이 아래에 바로 표시됩니다)</span>
                     </p>
                 </div>
                 """,
                 unsafe_allow_html=True
             )
-        
+            with st.container(border=True):
+                st.markdown("""
+                    <div class="curry-header-only" style="margin-bottom:12px;">
+                        <span class="title">서론</span>
+                    </div>
+                """, unsafe_allow_html=True)
+                intro_live = st.empty()
+            with st.container(border=True):
+                st.markdown("""
+                    <div class="curry-header-only" style="margin-bottom:12px;">
+                        <span class="title">본문 내용</span>
+                    </div>
+                """, unsafe_allow_html=True)
+                body_live = st.empty()
+
+        def _on_stream(partial):
+            intro = partial.get("intro_markdown") or ""
+            body = partial.get("body_markdown") or ""
+            if intro:
+                intro_live.markdown(intro)
+            if body:
+                body_live.markdown(body)
+
         try:
-            # 3) 실제 생성 작업
-            content = generate_post(ctx)
+            # 3) 실제 생성 작업 (서론/본문은 스트리밍으로 미리보기)
+            content = generate_post(ctx, on_stream=_on_stream)
             
             # 생성 후 로딩 화면 제거
             ph.empty()
             
             st.session_state["outputs"]["result"] = content
             st.session_state["outputs"]["status"] = "ready"
+            save_usage_to_disk()
             st.rerun()
             
         except Exception as e:
@@ -91,6 +114,10 @@ def render(ctx):
             """, unsafe_allow_html=True)
             role = st.session_state['persona'].get('role_job', 'AI Editor')
             st.caption(f"Designed by {role} Persona")
+            post_usage = (content.get("usage") or {}).get("post") or {}
+            if post_usage.get("calls"):
+                cost = f" · 약 ${post_usage['cost_usd']:.4f}" if post_usage.get("cost_usd") else ""
+                st.caption(f"토큰 {post_usage['total_tokens']:,}개 · LLM 호출 {post_usage['calls']}회{cost}")
         
         with col2:
             # 전체 텍스트 구성
@@ -137,7 +164,7 @@ def render(ctx):
         """, unsafe_allow_html=True)
         
         # 이미지
-        images = st.session_state["topic_flow"]["images"]["files"]
+        images = load_images(st.session_state["topic_flow"]["images"]["files"], "preview")
         image_plan = content.get("image_plan") or {}
         
         if images:
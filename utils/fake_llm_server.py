@@ -0,0 +1,500 @@
+"""
+부하 테스트용 가짜 LLM 서버 (표준 라이브러리만 사용)
+
+Ollama(/api/chat, /api/generate, /api/tags)와 OpenAI(/v1/chat/completions, /v1/models)
+프로토콜을 흉내 내고, prompts/의 프롬프트 종류(design_brief, blog_writing, image_analysis 등)를
+알아보고 앱이 파싱할 수 있는 형식의 응답을 돌려줍니다.
+생성 속도(tokens/s), 첫 토큰 지연(TTFT), 오류 비율, 429(Rate Limit) 비율, 동시 처리 슬롯 수를 조절할 수 있습니다.
+
+실행:
+    python -m utils.fake_llm_server --port 11500 --tps 25 --ttft 0.8 --parallel 2
+
+앱 연결:
+    Ollama 모드  → OLLAMA_HOST=http://127.0.0.1:11500 (여러 대 흉내: 포트를 달리해 여러 개 띄우고 OLLAMA_HOSTS)
+    OpenAI 모드 → API_MODE=openai, OPENAI_API_KEY=sk-fake, OPENAI_API_BASE=http://127.0.0.1:11500/v1
+
+GET /fake/stats 로 요청 수/오류 수/현재 처리 중 요청 수를 확인할 수 있습니다.
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# =========================================================
+# 응답 생성 (프롬프트 종류별)
+# =========================================================
+_SENTENCES = [
+    "직접 써보니 생각보다 차이가 분명하게 느껴졌어요.",
+    "처음에는 반신반의했지만 일주일쯤 지나니 확실히 익숙해졌습니다.",
+    "가장 먼저 확인해야 할 부분은 내 생활 패턴과 맞는지 여부예요.",
+    "비슷한 선택지가 많아서 비교 기준을 세 가지로 정리해봤습니다.",
+    "가격만 보고 고르면 나중에 후회할 수 있다는 점을 꼭 기억하세요.",
+    "현장에서 보니 사진보다 분위기가 훨씬 차분하고 따뜻했어요.",
+    "이 과정에서 놓치기 쉬운 작은 팁도 함께 적어둘게요.",
+    "결론부터 말하면 꾸준히 쓰기에는 충분히 괜찮은 선택이었습니다.",
+    "주변에서 자주 받는 질문을 중심으로 하나씩 풀어보겠습니다.",
+    "처음 시작하는 분이라면 부담 없는 단계부터 해보시길 추천해요.",
+]
+_WORDS = ["일상", "후기", "꿀팁", "정리", "추천", "비교", "체크리스트", "가성비", "기록", "입문"]
+
+
+def _sentences(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(_SENTENCES) for _ in range(n))
+
+
+def _tags(rng: random.Random, n: int) -> List[str]:
+    return ["#" + w for w in rng.sample(_WORDS, min(n, len(_WORDS)))]
+
+
+def _from_schema(schema: Dict[str, Any], rng: random.Random) -> Any:
+    """JSON Schema(Ollama format / OpenAI json_schema)에 맞는 값 생성"""
+    t = schema.get("type")
+    if isinstance(t, list):
+        t = next((x for x in t if x != "null"), "null")
+    if t == "object":
+        return {k: _from_schema(v or {}, rng) for k, v in (schema.get("properties") or {}).items()}
+    if t == "array":
+        return [_from_schema(schema.get("items") or {"type": "string"}, rng) for _ in range(3)]
+    if t == "integer":
+        return rng.randint(0, 2)
+    if t == "number":
+        return round(rng.random(), 2)
+    if t == "boolean":
+        return True
+    if t == "null":
+        return None
+    return _sentences(rng, 1)
+
+
+def _body(rng: random.Random, target_chars: int) -> str:
+    parts: List[str] = []
+    n = 0
+    section = 1
+    while n < target_chars:
+        para = f"## 포인트 {section}\n{_sentences(rng, 6)}"
+        parts.append(para)
+        n += len(para)
+        section += 1
+    return "\n\n".join(parts)
+
+
+def detect_family(text: str) -> str:
+    """프롬프트 본문의 출력 형식 표시로 prompts/ 종류를 추정"""
+    checks = [
+        ("intro_markdown", "blog_writing"),
+        ("applied_persona_text", "design_brief"),
+        # 일괄 분석 프롬프트에도 merged_description이 있으므로 image_aggregate보다 먼저 확인
+        ('"img_id"', "image_batch"),
+        ("merged_description", "image_aggregate"),
+        ("signature_phrases", "blog_style_analysis"),
+        ("intro_image_index", "image_plan"),
+        ('"titles"', "title_generation"),
+        ('"title"', "final_title"),
+        ("topic_candidates", "topic_suggestion"),
+    ]
+    for marker, family in checks:
+        if marker in text:
+            return family
+    if "설명:" in text and "태그:" in text:
+        return "image_analysis"
+    if "JSON" in text:
+        return "json"
+    return "text"
+
+
+def build_response(
+    family: str,
+    rng: random.Random,
+    schema: Optional[Dict[str, Any]],
+    target_chars: int,
+    n_images: int = 1,
+) -> str:
+    if schema and schema.get("type") == "object" and schema.get("properties"):
+        return json.dumps(_from_schema(schema, rng), ensure_ascii=False)
+
+    if family == "blog_writing":
+        out = {
+            "intro_markdown": _sentences(rng, 3),
+            "body_markdown": _body(rng, target_chars),
+            "hashtags": _tags(rng, 5),
+            "image_guide": _sentences(rng, 1),
+            "image_plan": {"intro_image_index": 0, "body_image_indices": [1, 2], "excluded_image_indices": [], "alt_texts": {"0": "대표 사진"}},
+            "package": {
+                "alt_titles": [_sentences(rng, 1) for _ in range(3)],
+                "faq": [{"q": "처음 시작해도 괜찮을까요?", "a": _sentences(rng, 1)} for _ in range(3)],
+                "cta": "궁금한 점은 댓글로 남겨주세요.",
+            },
+        }
+        return json.dumps(out, ensure_ascii=False) + "\n<END_JSON>"
+    if family == "design_brief":
+        out = {
+            "applied_persona_text": _sentences(rng, 2),
+            "keywords": {"main": rng.choice(_WORDS), "sub": rng.sample(_WORDS, 8)},
+            "target_context": {"text": _sentences(rng, 1)},
+            "tone_manner": {"summary": _sentences(rng, 1), "rules": [_sentences(rng, 1) for _ in range(3)]},
+            "outline": {"summary": _sentences(rng, 1), "sections": [f"섹션 {i + 1}" for i in range(4)]},
+            "length": {"target_chars": target_chars, "note": "모바일 가독성 기준"},
+            "strategy": {"text": _sentences(rng, 2), "seo": {"enabled": True, "notes": _sentences(rng, 1)}, "hashtags": _tags(rng, 5)},
+        }
+        return json.dumps(out, ensure_ascii=False)
+    if family == "image_batch":
+        # 첨부된 사진 수만큼 images 항목 (img_id는 첨부 순서)
+        out = {
+            "images": [
+                {"img_id": i, "desc": _sentences(rng, 2), "tags": _tags(rng, 3)}
+                for i in range(1, max(1, n_images) + 1)
+            ],
+            "aggregate": {
+                "merged_description": _sentences(rng, 2),
+                "mood": _sentences(rng, 1),
+                "tags": _tags(rng, 6),
+                "topic_candidates": [_sentences(rng, 1), _sentences(rng, 1)],
+                "best_topic": _sentences(rng, 1),
+            },
+        }
+        return json.dumps(out, ensure_ascii=False)
+    if family == "image_aggregate":
+        out = {
+            "merged_description": _sentences(rng, 2),
+            "mood": _sentences(rng, 1),
+            "tags": _tags(rng, 6),
+            "topic_candidates": [_sentences(rng, 1), _sentences(rng, 1)],
+            "best_topic": _sentences(rng, 1),
+        }
+        return json.dumps(out, ensure_ascii=False)
+    if family == "blog_style_analysis":
+        out = {
+            "tone": _sentences(rng, 2),
+            "structure": _sentences(rng, 2),
+            "feel": _sentences(rng, 1),
+            "signature_phrases": ["솔직히 말하면", "결론부터"],
+            "recommendations": _sentences(rng, 1),
+        }
+        return json.dumps(out, ensure_ascii=False)
+    if family == "image_plan":
+        return json.dumps({"intro_image_index": 0, "body_image_indices": [1, 2], "excluded_image_indices": [], "alt_texts": {"0": "대표 사진"}}, ensure_ascii=False)
+    if family == "title_generation":
+        return json.dumps({"titles": [f"{rng.choice(_WORDS)} {_sentences(rng, 1)[:20]}" for _ in range(5)]}, ensure_ascii=False)
+    if family == "final_title":
+        return json.dumps({"title": f"{rng.choice(_WORDS)} 완벽 {rng.choice(_WORDS)} 가이드"}, ensure_ascii=False)
+    if family == "topic_suggestion":
+        return json.dumps({"topic_candidates": [f"{rng.choice(_WORDS)} {rng.choice(_WORDS)}" for _ in range(5)]}, ensure_ascii=False)
+    if family == "image_analysis":
+        return f"설명: {_sentences(rng, 2)}\n분위기: {_sentences(rng, 1)}\n태그: {', '.join(_tags(rng, 5))}"
+    if family == "json":
+        return json.dumps({"result": _sentences(rng, 2)}, ensure_ascii=False)
+    # 자유 텍스트 (본문 확장 등)
+    return _sentences(rng, 12)
+
+
+def _tokens(text: str, chars_per_token: int) -> List[str]:
+    step = max(1, chars_per_token)
+    return [text[i : i + step] for i in range(0, len(text), step)]
+
+
+# =========================================================
+# 서버
+# =========================================================
+class FakeProfile:
+    def __init__(self, args: argparse.Namespace):
+        self.tps = max(0.1, args.tps)
+        self.ttft = max(0.0, args.ttft)
+        self.chars_per_token = args.chars_per_token
+        self.error_rate = args.error_rate
+        self.rate_limit_rate = args.rate_limit_rate
+        self.retry_after = args.retry_after
+        self.target_chars = args.target_chars
+        self.models = [m.strip() for m in args.models.split(",") if m.strip()]
+        self.slots = threading.Semaphore(args.parallel) if args.parallel > 0 else None
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "rate_limited": 0, "in_flight": 0, "tokens": 0}
+
+    def bump(self, key: str, n: int = 1) -> None:
+        with self.lock:
+            self.stats[key] += n
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _messages_text(messages: List[Dict[str, Any]]) -> Tuple[str, int]:
+    """(프롬프트 텍스트, 첨부 이미지 수)"""
+    parts = []
+    n_images = 0
+    for m in messages or []:
+        content = m.get("content")
+        if isinstance(content, list):
+            for c in content:
+                if c.get("type") == "text":
+                    parts.append(c.get("text", ""))
+                elif c.get("type") == "image_url":
+                    n_images += 1
+        else:
+            parts.append(content or "")
+        n_images += len(m.get("images") or [])
+    return "\n".join(parts), n_images
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    profile: FakeProfile = None  # main()에서 지정
+
+    def log_message(self, fmt, *args):
+        pass
+
+    # -------------------------------------------------
+    # 전송 도우미
+    # -------------------------------------------------
+    def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_chunked(self, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _chunk(self, data: str) -> None:
+        raw = data.encode("utf-8")
+        self.wfile.write(f"{len(raw):X}\r\n".encode("ascii") + raw + b"\r\n")
+        self.wfile.flush()
+
+    def _end_chunked(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b"{}"
+        try:
+            return json.loads(raw.decode("utf-8") or "{}")
+        except ValueError:
+            return {}
+
+    # -------------------------------------------------
+    # 라우팅
+    # -------------------------------------------------
+    def do_GET(self):
+        p = self.profile
+        if self.path in ("/api/tags", "/api/tags/"):
+            models = [
+                {"name": m, "model": m, "modified_at": _now_iso(), "size": 0, "digest": hashlib.sha256(m.encode()).hexdigest(), "details": {}}
+                for m in p.models
+            ]
+            return self._send_json(200, {"models": models})
+        if self.path.startswith("/api/version"):
+            return self._send_json(200, {"version": "0.0.0-fake"})
+        if self.path.startswith("/v1/models"):
+            return self._send_json(200, {"object": "list", "data": [{"id": m, "object": "model", "owned_by": "fake"} for m in p.models]})
+        if self.path.startswith("/fake/stats"):
+            with p.lock:
+                return self._send_json(200, dict(p.stats))
+        if self.path in ("/", ""):
+            body = b"Ollama is running"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path.startswith("/api/chat"):
+            return self._handle(protocol="ollama_chat")
+        if self.path.startswith("/api/generate"):
+            return self._handle(protocol="ollama_generate")
+        if self.path.startswith("/v1/chat/completions"):
+            return self._handle(protocol="openai")
+        self._read_json()
+        self._send_json(404, {"error": "not found"})
+
+    # -------------------------------------------------
+    # 생성
+    # -------------------------------------------------
+    def _fail(self, protocol: str, status: int, message: str, headers: Optional[Dict[str, str]] = None) -> None:
+        if protocol == "openai":
+            kind = "rate_limit_exceeded" if status == 429 else "server_error"
+            payload = {"error": {"message": message, "type": kind, "code": kind}}
+        else:
+            payload = {"error": message}
+        self._send_json(status, payload, headers)
+
+    def _handle(self, protocol: str) -> None:
+        p = self.profile
+        req = self._read_json()
+        p.bump("requests")
+        model = req.get("model") or (p.models[0] if p.models else "fake")
+
+        if protocol == "ollama_generate":
+            prompt_text, n_images = (req.get("system") or "") + "\n" + (req.get("prompt") or ""), len(req.get("images") or [])
+        else:
+            prompt_text, n_images = _messages_text(req.get("messages") or [])
+
+        # 오류 주입 (요청마다 독립적으로 추첨)
+        roll = random.random()
+        if roll < p.rate_limit_rate:
+            p.bump("rate_limited")
+            return self._fail(protocol, 429, "fake rate limit", {"Retry-After": str(p.retry_after)})
+        if roll < p.rate_limit_rate + p.error_rate:
+            p.bump("errors")
+            return self._fail(protocol, 503, "fake server error")
+
+        schema = None
+        fmt = req.get("format")
+        if isinstance(fmt, dict):
+            schema = fmt
+        rf = req.get("response_format") or {}
+        if rf.get("type") == "json_schema":
+            schema = (rf.get("json_schema") or {}).get("schema")
+
+        family = "image_analysis" if n_images and "설명:" in prompt_text else detect_family(prompt_text)
+        # 같은 프롬프트는 같은 응답 (재현 가능)
+        seed = int(hashlib.sha256(prompt_text.encode("utf-8")).hexdigest()[:8], 16)
+        text = build_response(family, random.Random(seed), schema, p.target_chars, n_images)
+        tokens = _tokens(text, p.chars_per_token)
+        prompt_tokens = max(1, len(prompt_text) // max(1, p.chars_per_token))
+
+        if p.slots:
+            p.slots.acquire()
+        p.bump("in_flight")
+        try:
+            stream = req.get("stream", protocol != "openai")
+            if stream:
+                self._stream(protocol, model, tokens, prompt_tokens, req)
+            else:
+                time.sleep(p.ttft + len(tokens) / p.tps)
+                self._send_json(200, self._final_payload(protocol, model, text, prompt_tokens, len(tokens)))
+            p.bump("tokens", len(tokens))
+        except (BrokenPipeError, ConnectionResetError):
+            # 클라이언트가 스트림을 끊음 (조기 종료/헤징 취소)
+            pass
+        finally:
+            p.bump("in_flight", -1)
+            if p.slots:
+                p.slots.release()
+
+    def _final_payload(self, protocol: str, model: str, text: str, prompt_tokens: int, eval_tokens: int) -> Dict[str, Any]:
+        p = self.profile
+        if protocol == "openai":
+            return {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": eval_tokens, "total_tokens": prompt_tokens + eval_tokens},
+            }
+        out = {
+            "model": model,
+            "created_at": _now_iso(),
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int((p.ttft + eval_tokens / p.tps) * 1e9),
+            "load_duration": 0,
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(p.ttft * 1e9),
+            "eval_count": eval_tokens,
+            "eval_duration": int(eval_tokens / p.tps * 1e9),
+        }
+        if protocol == "ollama_generate":
+            out["response"] = text
+        else:
+            out["message"] = {"role": "assistant", "content": text}
+        return out
+
+    def _stream(self, protocol: str, model: str, tokens: List[str], prompt_tokens: int, req: Dict[str, Any]) -> None:
+        p = self.profile
+        if protocol == "openai":
+            self._start_chunked("text/event-stream")
+            cid = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            created = int(time.time())
+
+            def _event(delta: Dict[str, Any], finish: Optional[str] = None, usage: Optional[Dict[str, int]] = None) -> str:
+                payload = {
+                    "id": cid,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish}] if usage is None else [],
+                }
+                if usage is not None:
+                    payload["usage"] = usage
+                return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+            time.sleep(p.ttft)
+            self._chunk(_event({"role": "assistant", "content": ""}))
+            for tok in _paced(tokens, p.tps):
+                self._chunk(_event({"content": tok}))
+            self._chunk(_event({}, finish="stop"))
+            if (req.get("stream_options") or {}).get("include_usage"):
+                self._chunk(_event({}, usage={"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens), "total_tokens": prompt_tokens + len(tokens)}))
+            self._chunk("data: [DONE]\n\n")
+            self._end_chunked()
+            return
+
+        self._start_chunked("application/x-ndjson")
+        time.sleep(p.ttft)
+        key = "response" if protocol == "ollama_generate" else "message"
+        for tok in _paced(tokens, p.tps):
+            part = {"model": model, "created_at": _now_iso(), "done": False}
+            part[key] = tok if key == "response" else {"role": "assistant", "content": tok}
+            self._chunk(json.dumps(part, ensure_ascii=False) + "\n")
+        final = self._final_payload(protocol, model, "", prompt_tokens, len(tokens))
+        self._chunk(json.dumps(final, ensure_ascii=False) + "\n")
+        self._end_chunked()
+
+
+def _paced(tokens: List[str], tps: float) -> Iterator[str]:
+    """tps에 맞춰 토큰을 내보냄 (누적 오차 없이 시작 시각 기준으로 대기)"""
+    started = time.perf_counter()
+    for i, tok in enumerate(tokens):
+        wait = started + i / tps - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        yield tok
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="부하 테스트용 가짜 Ollama/OpenAI 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--tps", type=float, default=30.0, help="초당 생성 토큰 수")
+    parser.add_argument("--ttft", type=float, default=0.5, help="첫 토큰까지 지연(초)")
+    parser.add_argument("--chars-per-token", type=int, default=2, help="토큰 1개당 글자 수 (한국어 대략 1~2)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="503 응답 비율 (0~1)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="429 응답 비율 (0~1)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429 응답의 Retry-After(초)")
+    parser.add_argument("--parallel", type=int, default=0, help="동시 생성 슬롯 수 (0이면 무제한, Ollama NUM_PARALLEL 흉내)")
+    parser.add_argument("--target-chars", type=int, default=2500, help="blog_writing 본문 길이")
+    parser.add_argument("--models", default="llama3.1:8b,llava:7b,gpt-4o", help="/api/tags에 보일 모델 목록 (쉼표 구분)")
+    args = parser.parse_args(argv)
+
+    FakeLLMHandler.profile = FakeProfile(args)
+    server = ThreadingHTTPServer((args.host, args.port), FakeLLMHandler)
+    server.daemon_threads = True
+    print(f"🧪 fake LLM server: http://{args.host}:{args.port} (tps={args.tps}, ttft={args.ttft}s, parallel={args.parallel or '∞'})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+이미지 지각 해시(dHash) + 거의 같은 사진 묶기
+
+- dhash: 회색조 9x8로 줄인 뒤 가로로 이웃한 픽셀 밝기 비교 → 64비트 (16자리 hex)
+  다시 저장/크기 변경/약한 보정 정도는 같은 값 또는 몇 비트 차이로 나옴
+- group_near_duplicates: 해밍 거리가 max_distance 이하인 사진은 앞에 나온 대표 사진에 묶음 (연사 등)
+
+Pillow가 없거나 이미지를 열 수 없으면 dhash는 None (호출 쪽에서 바이트 해시로 대체)
+단색/빈 사진처럼 밝기 차이가 거의 없거나 해시가 전부 0(또는 1)인 사진도 None
+(서로 다른 빈 화면/단색 스크린샷이 같은 해시가 되어 한 분석을 나눠 쓰지 않도록)
+"""
+
+import io
+from typing import Dict, List, Optional, Sequence
+
+try:
+    from PIL import Image  # 선택 의존성 (requirements.txt의 Pillow)
+except ImportError:  # pragma: no cover - 없으면 지각 해시 없이 동작
+    Image = None
+
+_HASH_W, _HASH_H = 9, 8
+_HASH_BITS = (_HASH_W - 1) * _HASH_H
+# 축소한 회색조 픽셀의 최대-최소 밝기 차이가 이보다 작으면 구별할 특징이 없는 사진으로 봄
+_MIN_CONTRAST = 8
+
+
+def dhash(image_bytes: bytes) -> Optional[str]:
+    """이미지 바이트의 64비트 dHash (16자리 hex). 계산할 수 없으면 None"""
+    if Image is None or not image_bytes:
+        return None
+    try:
+        img = Image.open(io.BytesIO(image_bytes))
+        # JPEG는 디코딩 단계에서 미리 축소 (큰 사진도 전체 해상도로 풀지 않음)
+        img.draft("L", (_HASH_W * 8, _HASH_H * 8))
+        pixels = list(img.convert("L").resize((_HASH_W, _HASH_H), Image.LANCZOS).getdata())
+    except Exception:
+        return None
+    if max(pixels) - min(pixels) < _MIN_CONTRAST:
+        return None
+    bits = 0
+    for row in range(_HASH_H):
+        for col in range(_HASH_W - 1):
+            left = pixels[row * _HASH_W + col]
+            right = pixels[row * _HASH_W + col + 1]
+            bits = (bits << 1) | (1 if left > right else 0)
+    if bits == 0 or bits == (1 << _HASH_BITS) - 1:
+        return None
+    return f"{bits:016x}"
+
+
+def hamming(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def group_near_duplicates(hashes: Sequence[Optional[str]], max_distance: int) -> Dict[int, int]:
+    """
+    {인덱스: 대표 인덱스}. 대표 사진은 자기 자신을 가리킴.
+    해시가 None인 사진, 전부 0/1인 해시와 max_distance 이내인(거의 특징 없는) 사진은 항상 혼자 대표.
+    max_distance < 0이면 묶지 않음.
+    """
+    groups: Dict[int, int] = {}
+    reps: List[int] = []
+    for i, h in enumerate(hashes):
+        groups[i] = i
+        if h is None or max_distance < 0:
+            continue
+        ones = bin(int(h, 16)).count("1")
+        if ones <= max_distance or ones >= _HASH_BITS - max_distance:
+            continue
+        for r in reps:
+            if hamming(h, hashes[r]) <= max_distance:
+                groups[i] = r
+                break
+        else:
+            reps.append(i)
+    return groups
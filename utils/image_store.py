@@ -0,0 +1,256 @@
+"""
+업로드 이미지 디스크 저장소 (내용 해시 기반)
+
+세션 상태(topic_flow.images.files)에는 이미지 ID(원본 sha256 hex)만 두고, 바이트는 IMAGE_STORE_DIR에 저장합니다.
+- 변형: original(업로드 원본), preview(화면 표시용 IMAGE_PREVIEW_MAX_SIDE),
+  model-openai / model-ollama(비전 백엔드별 입력용, IMAGE_MODEL_VARIANTS)
+- 업로드 때 원본을 한 번만 디코딩해서 모든 변형을 만듦 (JPEG는 draft로 축소 디코딩 → reduce → LANCZOS)
+- 모델 입력 변형의 base64 문자열은 불러온 이미지 객체에서 처음 쓸 때 한 번만 인코딩 (EncodedImage.b64, 디스크에는 저장 안 함)
+- 같은 사진을 다시 올리면 같은 ID → 다시 저장/리사이즈하지 않음
+- 총 용량이 IMAGE_STORE_MAX_MB를 넘으면 오래 안 쓴 이미지(변형 전체)부터 삭제 (get할 때마다 사용 시각 갱신)
+- 앱을 재시작해도 파일이 남아 있어 Step2 스냅샷(load_step2_from_disk)으로 다시 불러올 수 있음
+"""
+
+import base64
+import hashlib
+import io
+import math
+import os
+import re
+import threading
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple
+
+from config import IMAGE_STORE_DIR, IMAGE_STORE_MAX_MB, IMAGE_PREVIEW_MAX_SIDE, IMAGE_MODEL_VARIANTS
+
+try:
+    from PIL import Image  # 선택 의존성 (requirements.txt의 Pillow)
+except ImportError:  # pragma: no cover - 없으면 변형 없이 원본을 그대로 사용
+    Image = None
+
+# 변형 이름 → (긴 변 px, JPEG 품질). original은 업로드 바이트 그대로
+VARIANT_SPECS: Dict[str, Tuple[int, int]] = {
+    "preview": (IMAGE_PREVIEW_MAX_SIDE, 85),
+    **{f"model-{backend}": (spec["max_side"], spec["quality"]) for backend, spec in IMAGE_MODEL_VARIANTS.items()},
+}
+_IMAGE_ID = re.compile(r"^[0-9a-f]{64}$")
+
+
+def model_variant(backend: str) -> str:
+    """비전 백엔드("openai" | "ollama")에 맞는 모델 입력 변형 이름"""
+    return f"model-{backend}"
+
+
+def render_variants(image_bytes: bytes, specs: Dict[str, Tuple[int, int]]) -> Dict[str, bytes]:
+    """
+    원본을 한 번만 디코딩해서 변형 여러 개를 JPEG로 만듭니다. (실패하거나 Pillow가 없으면 원본 그대로)
+    - JPEG: draft()로 디코더 단계에서 1/2~1/8 축소해서 읽음 (12MP 사진도 전체 해상도로 풀지 않음)
+    - resize(reducing_gap)로 정수배 reduce() 후 LANCZOS 마무리, 작은 변형은 바로 앞 결과에서 이어서 줄임
+    """
+    if Image is None or not specs:
+        return {name: image_bytes for name in specs}
+    try:
+        img = Image.open(io.BytesIO(image_bytes))
+        width, height = img.size
+        largest = max(side for side, _quality in specs.values())
+        scale = largest / max(width, height)
+        if scale < 1:
+            img.draft("RGB", (math.ceil(width * scale), math.ceil(height * scale)))
+        # RGBA 등을 RGB로 변환 (JPEG 저장용)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+
+        out = {}
+        for name, (side, quality) in sorted(specs.items(), key=lambda kv: -kv[1][0]):
+            width, height = img.size
+            scale = side / max(width, height)
+            if scale < 1:
+                size = (max(1, round(width * scale)), max(1, round(height * scale)))
+                img = img.resize(size, Image.LANCZOS, reducing_gap=2.0)
+            output = io.BytesIO()
+            img.save(output, format="JPEG", quality=quality)
+            out[name] = output.getvalue()
+        return out
+    except Exception as e:
+        print(f"Image resize error: {e}")
+        return {name: image_bytes for name in specs}
+
+
+class EncodedImage(bytes):
+    """저장소에서 불러온 JPEG 바이트. bytes처럼 쓰고, base64가 필요하면 .b64 (객체당 한 번만 인코딩)"""
+
+    image_id: Optional[str] = None
+    variant: Optional[str] = None
+
+    @cached_property
+    def b64(self) -> str:
+        return base64.b64encode(self).decode("utf-8")
+
+
+class ImageStore:
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # 전체 용량은 첫 정리 때 한 번 스캔하고 이후엔 쓰기량만 더해서 추정
+        self._approx_bytes: Optional[int] = None
+
+    def _dir(self, image_id: str) -> str:
+        return os.path.join(self.root, image_id[:2])
+
+    def _path(self, image_id: str, variant: str) -> str:
+        ext = "bin" if variant == "original" else "jpg"
+        return os.path.join(self._dir(image_id), f"{image_id}.{variant}.{ext}")
+
+    def _write(self, path: str, data: bytes) -> int:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return len(data)
+
+    def _note_written(self, image_id: str, written: int) -> None:
+        if written:
+            with self._lock:
+                if self._approx_bytes is not None:
+                    self._approx_bytes += written
+                need_evict = self._approx_bytes is None or self._approx_bytes > self.max_bytes
+            if need_evict:
+                self.evict(keep=image_id)
+
+    def put(self, image_bytes: bytes) -> str:
+        """원본과 변형을 저장하고 이미지 ID를 돌려줍니다. 이미 있으면 사용 시각만 갱신합니다."""
+        image_id = hashlib.sha256(image_bytes).hexdigest()
+        written = 0
+        try:
+            missing = {}
+            for variant in ("original", *VARIANT_SPECS):
+                path = self._path(image_id, variant)
+                if os.path.exists(path):
+                    os.utime(path, None)
+                elif variant == "original":
+                    written += self._write(path, image_bytes)
+                else:
+                    missing[variant] = VARIANT_SPECS[variant]
+            # 빠진 변형은 원본 1회 디코딩으로 한꺼번에 생성
+            for variant, data in render_variants(image_bytes, missing).items():
+                written += self._write(self._path(image_id, variant), data)
+        except OSError as e:
+            print(f"⚠️ 이미지 저장 실패: {e}")
+            return image_id
+
+        self._note_written(image_id, written)
+        return image_id
+
+    def _read(self, path: str) -> Optional[bytes]:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path, None)
+            return data
+        except OSError:
+            return None
+
+    def get(self, image_id: str, variant: str = "preview") -> Optional[bytes]:
+        """변형 바이트. 설정이 바뀌어 변형 파일이 없으면 원본에서 다시 만들어 저장합니다."""
+        if not isinstance(image_id, str) or not _IMAGE_ID.match(image_id):
+            return None
+        data = self._read(self._path(image_id, variant))
+        if data is not None or variant not in VARIANT_SPECS:
+            return data
+        original = self._read(self._path(image_id, "original"))
+        if original is None:
+            return None
+        data = render_variants(original, {variant: VARIANT_SPECS[variant]})[variant]
+        try:
+            self._note_written(image_id, self._write(self._path(image_id, variant), data))
+        except OSError as e:
+            print(f"⚠️ 이미지 저장 실패: {e}")
+        return data
+
+    def has(self, image_id: str) -> bool:
+        # 원본만 있으면 나머지 변형은 get에서 다시 만들 수 있음
+        return (
+            isinstance(image_id, str)
+            and bool(_IMAGE_ID.match(image_id))
+            and os.path.exists(self._path(image_id, "original"))
+        )
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """총 용량이 max_bytes를 넘으면 마지막 사용 시각이 오래된 이미지부터 변형째 삭제합니다."""
+        groups: Dict[str, List] = {}
+        total = 0
+        for root, _dirs, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                if name.endswith(".b64"):
+                    # 예전 버전이 남긴 base64 사본 (원본 바이트와 중복) → 정리
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                group = groups.setdefault(name.split(".", 1)[0], [0.0, 0, []])
+                group[0] = max(group[0], st.st_mtime)
+                group[1] += st.st_size
+                group[2].append(path)
+                total += st.st_size
+
+        if total > self.max_bytes:
+            # 여유분을 두고 90%까지 줄여서 매번 정리가 돌지 않게 함
+            target = int(self.max_bytes * 0.9)
+            for image_id, (_mtime, size, paths) in sorted(groups.items(), key=lambda kv: kv[1][0]):
+                if total <= target:
+                    break
+                if image_id == keep:
+                    continue
+                for path in paths:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= size
+
+        with self._lock:
+            self._approx_bytes = total
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        with self._lock:
+            return {"approx_bytes": self._approx_bytes, "max_bytes": self.max_bytes}
+
+
+_store: Optional[ImageStore] = None
+_store_lock = threading.Lock()
+
+
+def get_image_store() -> ImageStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ImageStore(IMAGE_STORE_DIR, IMAGE_STORE_MAX_MB * 1024 * 1024)
+    return _store
+
+
+def load_images(image_ids: List[str], variant: str = "preview") -> List[bytes]:
+    """이미지 ID 목록을 바이트(EncodedImage) 목록으로 (저장소에서 지워진 이미지는 건너뜀)"""
+    store = get_image_store()
+    out = []
+    for image_id in image_ids or []:
+        # 예전 세션 상태처럼 바이트가 직접 들어 있으면 그대로 사용
+        if isinstance(image_id, (bytes, bytearray)):
+            out.append(EncodedImage(image_id))
+            continue
+        data = store.get(image_id, variant)
+        if data:
+            image = EncodedImage(data)
+            image.image_id, image.variant = image_id, variant
+            out.append(image)
+    return out
@@ -0,0 +1,187 @@
+"""
+스트리밍 JSON 파서
+
+LLM 응답이 청크 단위로 들어올 때 첫 JSON 객체를 점진적으로 파싱합니다.
+- 이미 읽은 부분은 다시 훑지 않음 (청크마다 새로 들어온 글자만 처리)
+- 최상위 필드가 닫히는 즉시 (key, value)로 알려줌
+- 아직 닫히지 않은 최상위 문자열 필드의 현재까지 값을 제공 (미리보기용)
+- 첫 객체가 닫히면 done=True → 호출자는 그 뒤 잡담을 기다리지 않고 생성을 끊을 수 있음
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+# 최상위(depth 1)에서 다음에 기대하는 토큰
+_KEY = "key"
+_KEY_STR = "key_str"
+_COLON = "colon"
+_VALUE = "value"
+_VALUE_STR = "value_str"
+_VALUE_NESTED = "value_nested"
+_VALUE_SCALAR = "value_scalar"
+_COMMA = "comma"
+
+
+class StreamingJsonParser:
+    def __init__(self):
+        self.text = ""
+        self.fields: Dict[str, Any] = {}
+        self.started = False
+        self.done = False
+        self._pos = 0
+        self._start = -1
+        self._end = -1
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self._unicode: Optional[str] = None
+        self._expect = _KEY
+        self._key_start = -1
+        self._cur_key: Optional[str] = None
+        self._value_start = -1
+        self._value_chars: List[str] = []
+
+    @property
+    def object_text(self) -> str:
+        """첫 JSON 객체의 원문 (done일 때만 유효)"""
+        return self.text[self._start : self._end + 1] if self.done else ""
+
+    def result(self) -> Dict[str, Any]:
+        if not self.done:
+            raise ValueError("JSON 객체가 아직 닫히지 않았습니다.")
+        return json.loads(self.object_text, strict=False)
+
+    def snapshot(self, keys: Iterable[str]) -> Dict[str, str]:
+        """keys 각각의 현재 값: 닫힌 필드는 최종 값, 작성 중인 문자열 필드는 지금까지의 값"""
+        out: Dict[str, str] = {}
+        for key in keys:
+            if key in self.fields:
+                value = self.fields[key]
+                out[key] = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+            elif self._expect == _VALUE_STR and self._cur_key == key:
+                partial = "".join(self._value_chars)
+                # 서로게이트 쌍의 앞 절반만 온 상태면 잠시 숨김 (화면 인코딩 오류 방지)
+                if partial and 0xD800 <= ord(partial[-1]) <= 0xDBFF:
+                    partial = partial[:-1]
+                out[key] = partial
+        return out
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """청크를 추가로 파싱하고, 이번에 새로 닫힌 최상위 필드 목록을 반환합니다."""
+        closed: List[Tuple[str, Any]] = []
+        if self.done or not chunk:
+            return closed
+        self.text += chunk
+        text = self.text
+
+        i = self._pos
+        n = len(text)
+        while i < n and not self.done:
+            c = text[i]
+
+            if not self.started:
+                if c == "{":
+                    self.started = True
+                    self._start = i
+                    self._depth = 1
+                    self._expect = _KEY
+                i += 1
+                continue
+
+            if self._in_str:
+                tracking = self._depth == 1 and self._expect == _VALUE_STR
+                if self._esc:
+                    self._esc = False
+                    if tracking:
+                        if c == "u":
+                            self._unicode = ""
+                        else:
+                            self._value_chars.append(_ESCAPES.get(c, c))
+                elif self._unicode is not None:
+                    self._unicode += c
+                    if len(self._unicode) == 4:
+                        self._append_codepoint(self._unicode)
+                        self._unicode = None
+                elif c == "\\":
+                    self._esc = True
+                elif c == '"':
+                    self._in_str = False
+                    if self._depth == 1:
+                        if self._expect == _KEY_STR:
+                            self._cur_key = self._loads(text[self._key_start : i + 1], default="")
+                            self._expect = _COLON
+                        elif self._expect == _VALUE_STR:
+                            value = self._loads(text[self._value_start : i + 1], default="".join(self._value_chars))
+                            self._close_field(value, closed)
+                elif tracking:
+                    self._value_chars.append(c)
+                i += 1
+                continue
+
+            if c == '"':
+                self._in_str = True
+                if self._depth == 1:
+                    if self._expect == _KEY:
+                        self._key_start = i
+                        self._expect = _KEY_STR
+                    elif self._expect == _VALUE:
+                        self._value_start = i
+                        self._value_chars = []
+                        self._expect = _VALUE_STR
+            elif c in "{[":
+                if self._depth == 1 and self._expect == _VALUE:
+                    self._value_start = i
+                    self._expect = _VALUE_NESTED
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._expect == _VALUE_NESTED:
+                    self._close_field(self._loads(text[self._value_start : i + 1]), closed)
+                elif self._depth == 0:
+                    if self._expect == _VALUE_SCALAR:
+                        self._close_field(self._loads(text[self._value_start : i].strip()), closed)
+                    self.done = True
+                    self._end = i
+            elif self._depth == 1:
+                if c == ":" and self._expect == _COLON:
+                    self._expect = _VALUE
+                elif c == ",":
+                    if self._expect == _VALUE_SCALAR:
+                        self._close_field(self._loads(text[self._value_start : i].strip()), closed)
+                    self._expect = _KEY
+                elif self._expect == _VALUE and not c.isspace():
+                    self._value_start = i
+                    self._expect = _VALUE_SCALAR
+            i += 1
+
+        self._pos = i
+        return closed
+
+    def _append_codepoint(self, hex_digits: str) -> None:
+        try:
+            code = int(hex_digits, 16)
+        except ValueError:
+            return
+        # 서로게이트 쌍(이모지 등)은 하나의 문자로 합침
+        if 0xDC00 <= code <= 0xDFFF and self._value_chars and 0xD800 <= ord(self._value_chars[-1]) <= 0xDBFF:
+            high = ord(self._value_chars.pop())
+            code = 0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00)
+        self._value_chars.append(chr(code))
+
+    def _close_field(self, value: Any, closed: List[Tuple[str, Any]]) -> None:
+        if self._cur_key is not None:
+            self.fields[self._cur_key] = value
+            closed.append((self._cur_key, value))
+        self._cur_key = None
+        self._value_chars = []
+        self._expect = _COMMA
+
+    @staticmethod
+    def _loads(raw: str, default: Any = None) -> Any:
+        try:
+            return json.loads(raw, strict=False)
+        except Exception:
+            return default if default is not None else raw
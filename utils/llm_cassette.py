@@ -0,0 +1,161 @@
+"""
+LLM/비전 호출 녹화·재생 (cassette)
+
+record: OllamaClient / UnifiedClient를 지나는 모든 모델 호출의 요청 해시, 응답, 지연시간을
+        JSONL 파일에 한 줄씩 추가합니다.
+replay: 같은 요청이 오면 모델을 부르지 않고 기록된 응답을 돌려줍니다. (없으면 CassetteMissError)
+        같은 요청이 여러 번 기록됐으면 기록 순서대로, 다 쓰면 마지막 것을 반복합니다.
+
+Ollama/API 키가 없는 환경(CI 등)에서 generate_post / generate_design_brief / analyze_image_agent의
+후처리·오케스트레이션 성능을 재현 가능하게 측정하기 위한 용도입니다.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from config import LLM_CASSETTE_MODE, LLM_CASSETTE_PATH, LLM_CASSETTE_LATENCY_SCALE
+
+# replay 스트리밍 시 한 번에 내보낼 글자 수
+_REPLAY_CHUNK_CHARS = 32
+
+
+class CassetteMissError(LookupError):
+    """replay 모드인데 카세트에 없는 요청"""
+
+
+def request_key(kind: str, **parts: Any) -> str:
+    """요청 구성요소(종류, 모델, 프롬프트, 샘플링 설정, 이미지 해시 등)의 sha256"""
+    raw = json.dumps({"kind": kind, **parts}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def image_digest(image_bytes: bytes) -> str:
+    return hashlib.sha256(image_bytes or b"").hexdigest()
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str, latency_scale: float = 0.0):
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+        if mode == "replay":
+            self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"카세트 파일이 없습니다: {self.path}")
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                self._entries.setdefault(entry["key"], []).append(entry)
+
+    # -------------------------------------------------
+    # 기록/조회
+    # -------------------------------------------------
+    def _append(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def _record(self, key: str, kind: str, model: str, response: str, latency: float, ttft: Optional[float] = None) -> None:
+        entry = {"key": key, "kind": kind, "model": model, "latency": round(latency, 4), "response": response}
+        if ttft is not None:
+            entry["ttft"] = round(ttft, 4)
+        self._append(entry)
+
+    def _lookup(self, key: str, kind: str) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise CassetteMissError(f"카세트에 없는 {kind} 요청입니다 (key={key[:12]}). record 모드로 다시 녹화하세요.")
+            idx = self._cursor.get(key, 0)
+            self._cursor[key] = idx + 1
+            return entries[min(idx, len(entries) - 1)]
+
+    def _replay_wait(self, seconds: Optional[float]) -> float:
+        return max(0.0, float(seconds or 0.0) * self.latency_scale)
+
+    # -------------------------------------------------
+    # 호출 래퍼
+    # -------------------------------------------------
+    def call(self, kind: str, model: str, key: str, fn: Callable[[], str]) -> str:
+        if self.mode == "replay":
+            entry = self._lookup(key, kind)
+            time.sleep(self._replay_wait(entry.get("latency")))
+            return entry.get("response", "")
+
+        started = time.perf_counter()
+        response = fn()
+        self._record(key, kind, model, response or "", time.perf_counter() - started)
+        return response
+
+    async def acall(self, kind: str, model: str, key: str, fn: Callable[[], Awaitable[str]]) -> str:
+        if self.mode == "replay":
+            entry = self._lookup(key, kind)
+            await asyncio.sleep(self._replay_wait(entry.get("latency")))
+            return entry.get("response", "")
+
+        started = time.perf_counter()
+        response = await fn()
+        self._record(key, kind, model, response or "", time.perf_counter() - started)
+        return response
+
+    def stream(self, kind: str, model: str, key: str, fn: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """
+        스트리밍 호출 녹화/재생. 소비자가 중간에 멈추면 거기까지 받은 텍스트를 기록합니다.
+        (재생 때도 같은 지점에서 멈추므로 결과가 같음)
+        """
+        if self.mode == "replay":
+            entry = self._lookup(key, kind)
+            text = entry.get("response", "")
+            time.sleep(self._replay_wait(entry.get("ttft")))
+            n_chunks = max(1, -(-len(text) // _REPLAY_CHUNK_CHARS))
+            per_chunk = self._replay_wait(max(0.0, (entry.get("latency") or 0.0) - (entry.get("ttft") or 0.0))) / n_chunks
+            for i in range(0, len(text), _REPLAY_CHUNK_CHARS):
+                if per_chunk:
+                    time.sleep(per_chunk)
+                yield text[i : i + _REPLAY_CHUNK_CHARS]
+            return
+
+        started = time.perf_counter()
+        ttft: Optional[float] = None
+        parts: List[str] = []
+        gen = fn()
+        try:
+            for chunk in gen:
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                parts.append(chunk)
+                yield chunk
+        finally:
+            gen.close()
+            self._record(key, kind, model, "".join(parts), time.perf_counter() - started, ttft)
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """LLM_CASSETTE_MODE가 record/replay면 프로세스 공용 카세트를, 아니면 None을 반환합니다."""
+    global _cassette
+    if LLM_CASSETTE_MODE not in ("record", "replay"):
+        return None
+    if _cassette is None:
+        with _cassette_lock:
+            if _cassette is None:
+                _cassette = Cassette(LLM_CASSETTE_PATH, LLM_CASSETTE_MODE, LLM_CASSETTE_LATENCY_SCALE)
+    return _cassette
@@ -0,0 +1,330 @@
+"""
+LLM 호출별 지연시간/토큰 지표
+
+generate_text / generate_json / stream_json_object / chat_vision / chat_text 호출마다 한 건씩
+(단계 이름, 모델, 프롬프트/응답 글자·토큰 수, 대기 시간, TTFT, 전체 지연, 재시도, JSON 파싱 실패)를 기록합니다.
+
+- JSONL 싱크: LLM_METRICS_PATH에 한 줄씩 추가, LLM_METRICS_MAX_MB를 넘으면 회전(.1, .2 ...)
+- 프로세스 내 집계: llm_metrics_summary()로 단계별 p50/p90/p99 확인
+- Prometheus: 같은 기록을 utils/prom_metrics.py 히스토그램/카운터에도 반영 (METRICS_PORT)
+- 사용량/비용: 호출마다 utils/llm_usage.py의 세션/글 집계에 더함 (지표 기록을 꺼도 유지)
+- 트레이싱: 호출마다 utils/tracing.py의 client span 1개 (모델/프롬프트 크기/토큰/TTFT 속성)
+- 단계 이름은 llm_stage("step5.intro_body") 같은 컨텍스트로 지정 (스레드/asyncio 태스크별로 따로 유지)
+
+하위 계층(재시도, 라우팅, 실제 API 호출)은 note_*() 함수로 현재 호출 기록에 값을 더합니다.
+진행 중인 호출이 없으면 note_*()는 아무것도 하지 않습니다.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from config import LLM_METRICS_ENABLED, LLM_METRICS_PATH, LLM_METRICS_MAX_MB, LLM_METRICS_BACKUPS
+from utils.prom_metrics import observe_llm_call
+from utils.llm_usage import record_usage
+from utils.token_budget import estimate_tokens
+from utils.tracing import trace_span
+
+# 단계별로 최근 몇 건까지 백분위 계산에 쓸지
+_WINDOW = 500
+
+_stage: contextvars.ContextVar[str] = contextvars.ContextVar("llm_stage", default="unknown")
+_current: contextvars.ContextVar[Optional["LLMCallRecord"]] = contextvars.ContextVar("llm_call", default=None)
+
+
+def set_llm_stage(stage: str) -> contextvars.Token:
+    """현재 컨텍스트의 단계 이름을 지정합니다. (스레드 풀에 넘길 때는 contextvars.copy_context 사용)"""
+    return _stage.set(stage)
+
+
+@contextmanager
+def llm_stage(stage: str) -> Iterator[None]:
+    token = _stage.set(stage)
+    try:
+        yield
+    finally:
+        _stage.reset(token)
+
+
+def current_stage() -> str:
+    return _stage.get()
+
+
+def _field(obj: Any, name: str) -> Any:
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+class LLMCallRecord:
+    """호출 1건의 측정값. 헤징처럼 여러 스레드가 같은 기록에 쓸 수 있어 잠금 사용"""
+
+    def __init__(self, kind: str, backend: str, model: str, prompt: str):
+        self.kind = kind
+        self.backend = backend
+        self.model = model
+        self.stage = _stage.get()
+        self.prompt = prompt
+        self.started = time.perf_counter()
+        self.queue_wait = 0.0
+        self.ttft: Optional[float] = None
+        self.retries = 0
+        self.parse_failures = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.usage_reported = False
+        self.cache_hit = False
+        self._lock = threading.Lock()
+
+    def to_dict(self, response: str, error: Optional[BaseException]) -> Dict[str, Any]:
+        latency = time.perf_counter() - self.started
+        estimated = not self.usage_reported
+        return {
+            "ts": round(time.time(), 3),
+            "stage": self.stage,
+            "kind": self.kind,
+            "backend": self.backend,
+            "model": self.model,
+            "prompt_chars": len(self.prompt),
+            "response_chars": len(response or ""),
+            "prompt_tokens": estimate_tokens(self.prompt, self.model) if estimated else self.prompt_tokens,
+            "response_tokens": estimate_tokens(response or "", self.model) if estimated else self.completion_tokens,
+            "tokens_estimated": estimated,
+            "queue_wait_ms": round(self.queue_wait * 1000, 1),
+            "ttft_ms": round(self.ttft * 1000, 1) if self.ttft is not None else None,
+            "latency_ms": round(latency * 1000, 1),
+            "retries": self.retries,
+            "parse_failures": self.parse_failures,
+            "cache_hit": self.cache_hit,
+            "ok": error is None,
+            "error": f"{type(error).__name__}: {error}"[:300] if error is not None else None,
+        }
+
+
+class LLMCallTracker:
+    """track()가 돌려주는 핸들. 호출 쪽은 응답 텍스트만 알려주면 됨"""
+
+    def __init__(self, record: Optional[LLMCallRecord]):
+        self.record = record
+        self.response = ""
+
+    def set_response(self, text: Any) -> None:
+        self.response = text if isinstance(text, str) else json.dumps(text, ensure_ascii=False, default=str)
+
+    def cache_hit(self) -> None:
+        if self.record is not None:
+            self.record.cache_hit = True
+
+
+# -------------------------------------------------
+# 하위 계층에서 호출하는 note_* (진행 중인 호출 기록에 더하기)
+# -------------------------------------------------
+def note_retry() -> None:
+    rec = _current.get()
+    if rec is not None:
+        with rec._lock:
+            rec.retries += 1
+
+
+def note_queue_wait(seconds: float) -> None:
+    rec = _current.get()
+    if rec is not None and seconds > 0:
+        with rec._lock:
+            rec.queue_wait += seconds
+
+
+def note_first_token() -> None:
+    rec = _current.get()
+    if rec is not None and rec.ttft is None:
+        with rec._lock:
+            if rec.ttft is None:
+                rec.ttft = time.perf_counter() - rec.started
+
+
+def note_parse_failure() -> None:
+    rec = _current.get()
+    if rec is not None:
+        with rec._lock:
+            rec.parse_failures += 1
+
+
+def note_usage(prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> None:
+    rec = _current.get()
+    if rec is None or prompt_tokens is None:
+        return
+    with rec._lock:
+        rec.prompt_tokens += int(prompt_tokens)
+        rec.completion_tokens += int(completion_tokens or 0)
+        rec.usage_reported = True
+
+
+def note_openai_usage(usage: Any) -> None:
+    note_usage(_field(usage, "prompt_tokens"), _field(usage, "completion_tokens"))
+
+
+def note_ollama_response(res: Any, elapsed_sec: float) -> None:
+    """
+    Ollama 응답(마지막 스트림 조각)의 토큰 수를 기록합니다.
+    요청 왕복 시간 - 서버 처리 시간(total_duration)은 Ollama 서버 큐 대기(+전송)로 봅니다.
+    """
+    note_usage(_field(res, "prompt_eval_count"), _field(res, "eval_count"))
+    total_ns = _field(res, "total_duration")
+    if total_ns:
+        note_queue_wait(elapsed_sec - total_ns / 1e9)
+
+
+# -------------------------------------------------
+# 싱크 + 집계
+# -------------------------------------------------
+class _StageAgg:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.retries = 0
+        self.parse_failures = 0
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self.latency: Deque[float] = deque(maxlen=_WINDOW)
+        self.ttft: Deque[float] = deque(maxlen=_WINDOW)
+        self.queue_wait: Deque[float] = deque(maxlen=_WINDOW)
+
+
+_agg: Dict[str, _StageAgg] = {}
+_agg_lock = threading.Lock()
+_sink: Optional[logging.Logger] = None
+_sink_lock = threading.Lock()
+
+
+def _get_sink() -> logging.Logger:
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                os.makedirs(os.path.dirname(LLM_METRICS_PATH) or ".", exist_ok=True)
+                handler = RotatingFileHandler(
+                    LLM_METRICS_PATH,
+                    maxBytes=int(LLM_METRICS_MAX_MB * 1024 * 1024),
+                    backupCount=LLM_METRICS_BACKUPS,
+                    encoding="utf-8",
+                )
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger = logging.getLogger("llm_metrics")
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                logger.addHandler(handler)
+                _sink = logger
+    return _sink
+
+
+def _span_attributes(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "gen_ai.usage.input_tokens": entry["prompt_tokens"],
+        "gen_ai.usage.output_tokens": entry["response_tokens"],
+        "llm.tokens_estimated": entry["tokens_estimated"],
+        "llm.response_chars": entry["response_chars"],
+        "llm.queue_wait_ms": entry["queue_wait_ms"],
+        "llm.ttft_ms": entry["ttft_ms"],
+        "llm.retries": entry["retries"],
+        "llm.parse_failures": entry["parse_failures"],
+        "llm.cache_hit": entry["cache_hit"],
+    }
+
+
+def _emit(entry: Dict[str, Any]) -> None:
+    with _agg_lock:
+        agg = _agg.setdefault(entry["stage"], _StageAgg())
+        agg.calls += 1
+        agg.errors += 0 if entry["ok"] else 1
+        agg.cache_hits += 1 if entry["cache_hit"] else 0
+        agg.retries += entry["retries"]
+        agg.parse_failures += entry["parse_failures"]
+        agg.prompt_tokens += entry["prompt_tokens"]
+        agg.response_tokens += entry["response_tokens"]
+        agg.latency.append(entry["latency_ms"])
+        agg.queue_wait.append(entry["queue_wait_ms"])
+        if entry["ttft_ms"] is not None:
+            agg.ttft.append(entry["ttft_ms"])
+    try:
+        observe_llm_call(entry)
+        _get_sink().info(json.dumps(entry, ensure_ascii=False))
+    except Exception:
+        # 지표 기록 실패는 기능에 영향 주지 않도록 무시
+        pass
+
+
+@contextmanager
+def track_llm_call(kind: str, backend: str, model: str, prompt: str) -> Iterator[LLMCallTracker]:
+    """
+    LLM 호출 1건을 측정합니다. 이미 측정 중인 호출 안에서 다시 부르면(generate_json → generate_text)
+    바깥 기록에 합쳐지고 따로 기록하지 않습니다.
+    """
+    if _current.get() is not None:
+        yield LLMCallTracker(_current.get())
+        return
+
+    record = LLMCallRecord(kind, backend, model, prompt)
+    tracker = LLMCallTracker(record)
+    error: Optional[BaseException] = None
+    span_attrs = {
+        "gen_ai.system": backend,
+        "gen_ai.request.model": model,
+        "llm.kind": kind,
+        "llm.stage": record.stage,
+        "llm.prompt_chars": len(prompt),
+    }
+    with trace_span(f"llm.{kind}", kind="client", **span_attrs) as span:
+        token = _current.set(record)
+        try:
+            yield tracker
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _current.reset(token)
+            entry = record.to_dict(tracker.response, error)
+            span.set_attributes(_span_attributes(entry))
+            try:
+                record_usage(entry)
+            except Exception:
+                pass
+            if LLM_METRICS_ENABLED:
+                _emit(entry)
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(q * len(ordered)))
+    return ordered[idx]
+
+
+def llm_metrics_summary() -> Dict[str, Dict[str, Any]]:
+    """단계별 호출 수, 오류/캐시 히트/재시도/파싱 실패 수, 토큰 합계, 지연·TTFT·대기 시간 백분위(ms)"""
+    with _agg_lock:
+        items = [(stage, agg, list(agg.latency), list(agg.ttft), list(agg.queue_wait)) for stage, agg in _agg.items()]
+    out = {}
+    for stage, agg, latency, ttft, queue_wait in items:
+        out[stage] = {
+            "calls": agg.calls,
+            "errors": agg.errors,
+            "cache_hits": agg.cache_hits,
+            "retries": agg.retries,
+            "parse_failures": agg.parse_failures,
+            "prompt_tokens": agg.prompt_tokens,
+            "response_tokens": agg.response_tokens,
+            "latency_ms": {f"p{int(q * 100)}": _percentile(latency, q) for q in (0.5, 0.9, 0.99)},
+            "ttft_ms": {f"p{int(q * 100)}": _percentile(ttft, q) for q in (0.5, 0.9)},
+            "queue_wait_ms": {f"p{int(q * 100)}": _percentile(queue_wait, q) for q in (0.5, 0.9)},
+        }
+    return out
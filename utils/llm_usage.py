@@ -0,0 +1,153 @@
+"""
+LLM 사용량(토큰)·비용 집계: 세션별 / 글(Step5 생성 1건)별
+
+- utils/llm_metrics.track_llm_call이 호출 1건을 마칠 때 record_usage(entry)로 더함
+  (백엔드가 usage를 주면 그 값, 아니면 추정 토큰 → estimated_calls로 구분)
+- 세션: set_usage_session(session_id) (app.py), 글: with usage_scope() as usage (generate_post)
+- 비용: LLM_PRICES_PER_1M 단가표(모델 이름 접두사 기준), Ollama(로컬)는 0
+- SESSION_TOKEN_BUDGET(0=무제한)을 넘으면 session_budget_exceeded()가 True
+  → 선택적인 추가 호출(본문 확장, 헤징 예비 요청)을 생략
+"""
+
+import contextvars
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from config import LLM_PRICES_PER_1M, SESSION_TOKEN_BUDGET
+
+_MAX_SESSIONS = 1000
+
+_usage_session: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("usage_session", default=None)
+_post_usage: contextvars.ContextVar[Optional["UsageTotals"]] = contextvars.ContextVar("post_usage", default=None)
+
+
+def _price(model: str) -> Optional[Tuple[float, float]]:
+    """(입력, 출력) 100만 토큰당 USD. 가장 긴 접두사가 맞는 모델 기준, 없으면 None"""
+    name = (model or "").lower()
+    best = None
+    for prefix, price in LLM_PRICES_PER_1M.items():
+        if name.startswith(prefix.lower()) and (best is None or len(prefix) > len(best[0])):
+            best = (prefix, price)
+    return tuple(best[1]) if best else None
+
+
+class UsageTotals:
+    def __init__(self):
+        self.calls = 0
+        self.cache_hits = 0
+        self.estimated_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.unpriced_models = set()
+        self.by_model: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        backend, model = entry["backend"], entry["model"]
+        with self._lock:
+            self.calls += 1
+            if entry["cache_hit"]:
+                # 캐시에서 바로 반환한 응답은 백엔드 사용량 없음
+                self.cache_hits += 1
+                return
+            prompt_tokens, completion_tokens = entry["prompt_tokens"], entry["response_tokens"]
+            cost = 0.0
+            if backend == "openai":
+                price = _price(model)
+                if price is None:
+                    self.unpriced_models.add(model)
+                else:
+                    cost = (prompt_tokens * price[0] + completion_tokens * price[1]) / 1_000_000
+            self.estimated_calls += 1 if entry["tokens_estimated"] else 0
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cost_usd += cost
+            row = self.by_model.setdefault(
+                f"{backend}:{model}", {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+            )
+            row["calls"] += 1
+            row["prompt_tokens"] += prompt_tokens
+            row["completion_tokens"] += completion_tokens
+            row["cost_usd"] += cost
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "cache_hits": self.cache_hits,
+                "estimated_calls": self.estimated_calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "total_tokens": self.prompt_tokens + self.completion_tokens,
+                "cost_usd": round(self.cost_usd, 6),
+                "unpriced_models": sorted(self.unpriced_models),
+                "by_model": {k: {**v, "cost_usd": round(v["cost_usd"], 6)} for k, v in self.by_model.items()},
+            }
+
+
+_sessions: "OrderedDict[str, UsageTotals]" = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+def set_usage_session(session_id: Optional[str]) -> None:
+    """현재 실행 흐름의 세션 ID 지정 (사용량을 이 세션에 합산)"""
+    _usage_session.set(session_id)
+
+
+def _session_totals(session_id: Optional[str], create: bool = False) -> Optional[UsageTotals]:
+    if not session_id:
+        return None
+    with _sessions_lock:
+        totals = _sessions.get(session_id)
+        if totals is None and create:
+            totals = UsageTotals()
+            _sessions[session_id] = totals
+            while len(_sessions) > _MAX_SESSIONS:
+                _sessions.popitem(last=False)
+        elif totals is not None:
+            _sessions.move_to_end(session_id)
+        return totals
+
+
+def record_usage(entry: Dict[str, Any]) -> None:
+    """track_llm_call의 호출 기록 1건을 현재 세션/글 사용량에 더합니다."""
+    session = _session_totals(_usage_session.get(), create=True)
+    if session is not None:
+        session.add(entry)
+    post = _post_usage.get()
+    if post is not None:
+        post.add(entry)
+
+
+@contextmanager
+def usage_scope() -> Iterator[UsageTotals]:
+    """이 블록 안의 LLM 호출(copy_context로 넘긴 작업 스레드 포함)을 따로 집계합니다."""
+    totals = UsageTotals()
+    token = _post_usage.set(totals)
+    try:
+        yield totals
+    finally:
+        _post_usage.reset(token)
+
+
+def session_usage(session_id: Optional[str] = None) -> Dict[str, Any]:
+    """세션 누적 사용량 + 예산 (session_id를 생략하면 현재 세션)"""
+    totals = _session_totals(session_id or _usage_session.get())
+    out = totals.to_dict() if totals is not None else UsageTotals().to_dict()
+    out["token_budget"] = SESSION_TOKEN_BUDGET or None
+    out["budget_exceeded"] = bool(SESSION_TOKEN_BUDGET) and out["total_tokens"] >= SESSION_TOKEN_BUDGET
+    return out
+
+
+def session_budget_exceeded() -> bool:
+    if SESSION_TOKEN_BUDGET <= 0:
+        return False
+    totals = _session_totals(_usage_session.get())
+    return totals is not None and totals.total_tokens >= SESSION_TOKEN_BUDGET
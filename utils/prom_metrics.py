@@ -0,0 +1,337 @@
+"""
+Prometheus 텍스트 형식 지표 + 내장 HTTP 엔드포인트 (표준 라이브러리만 사용)
+
+METRICS_PORT를 지정하면 app.py가 시작할 때 GET /metrics 서버를 백그라운드로 띄웁니다. (프로세스당 1회)
+- LLM 호출: 단계별 지연/TTFT 히스토그램, 호출·토큰·재시도·캐시 히트 카운터 (utils/llm_metrics.py에서 갱신)
+- Step5: 진행 중인 생성 수, 전체 생성 시간 히스토그램
+- 이미지 분석: 분석한 이미지 수, 이미지당 분석 시간 (rate()로 처리량 계산)
+- 스크랩 시점에 읽는 값: 응답 캐시 히트/미스, 서킷 브레이커 상태, 재시도 예산
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from config import METRICS_PORT, METRICS_HOST
+
+_LabelKey = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> _LabelKey:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[_LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if amount < 0:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels_text(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[_LabelKey, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels: str) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels_text(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = ()):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # 라벨별 [버킷별 누적 전 개수..., 합계, 개수]
+        self._values: Dict[_LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = [0.0] * (len(self.buckets) + 2)
+                self._values[key] = row
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = []
+        for key, row in items:
+            cumulative = 0.0
+            for i, bound in enumerate(self.buckets):
+                cumulative += row[i]
+                le = f'le="{_fmt(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels_text(self.labelnames, key, le)} {_fmt(cumulative)}")
+            lines.append(f"{self.name}_sum{_labels_text(self.labelnames, key)} {_fmt(row[-2])}")
+            lines.append(f"{self.name}_count{_labels_text(self.labelnames, key)} {_fmt(row[-1])}")
+        return lines
+
+
+# =========================================================
+# 레지스트리
+# =========================================================
+_metrics: List[_Metric] = []
+# 스크랩 시점에 값을 읽어 텍스트 줄 목록을 돌려주는 함수들 (다른 모듈의 통계를 그대로 노출)
+_collectors: List[Callable[[], List[str]]] = []
+
+
+def _register(metric: _Metric) -> _Metric:
+    _metrics.append(metric)
+    return metric
+
+
+def register_collector(fn: Callable[[], List[str]]) -> None:
+    _collectors.append(fn)
+
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    for metric in list(_metrics):
+        lines.extend(metric.render())
+    for collector in list(_collectors):
+        try:
+            lines.extend(collector())
+        except Exception as e:
+            lines.append(f"# collector error: {_escape(e)}")
+    return "\n".join(lines) + "\n"
+
+
+_LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+LLM_CALL_SECONDS = _register(Histogram(
+    "blog_llm_call_duration_seconds", "LLM 호출 전체 지연(초)", ("stage", "kind", "backend"), _LLM_BUCKETS
+))
+LLM_TTFT_SECONDS = _register(Histogram(
+    "blog_llm_ttft_seconds", "스트리밍 LLM 호출의 첫 토큰까지 시간(초)", ("stage", "backend"), _LLM_BUCKETS
+))
+LLM_QUEUE_SECONDS = _register(Histogram(
+    "blog_llm_queue_wait_seconds", "LLM 요청 대기 시간(초, 클라이언트 세마포어 + Ollama 서버 큐)", ("backend",), _LLM_BUCKETS
+))
+LLM_CALLS = _register(Counter(
+    "blog_llm_calls_total", "LLM 호출 수", ("stage", "kind", "backend", "status")
+))
+LLM_CACHE_HITS = _register(Counter(
+    "blog_llm_cache_hits_total", "응답 캐시에서 바로 반환한 LLM 호출 수", ("stage",)
+))
+LLM_RETRIES = _register(Counter(
+    "blog_llm_retries_total", "일시 오류로 재시도한 횟수", ("stage", "backend")
+))
+LLM_PARSE_FAILURES = _register(Counter(
+    "blog_llm_json_parse_failures_total", "JSON 응답 파싱 실패 수", ("stage",)
+))
+LLM_TOKENS = _register(Counter(
+    "blog_llm_tokens_total", "프롬프트/응답 토큰 수 (usage가 없으면 추정치)", ("stage", "direction")
+))
+ACTIVE_GENERATIONS = _register(Gauge(
+    "blog_active_generations", "진행 중인 Step5 글 생성 수"
+))
+STEP5_SECONDS = _register(Histogram(
+    "blog_step5_duration_seconds", "Step5 글 생성 전체 시간(초)", ("status",), (5, 10, 20, 30, 60, 90, 120, 180, 300, 600)
+))
+IMAGES_ANALYZED = _register(Counter(
+    "blog_images_analyzed_total", "비전 모델로 분석한 이미지 수", ("status",)
+))
+IMAGE_ANALYSIS_SECONDS = _register(Histogram(
+    "blog_image_analysis_duration_seconds", "이미지 1장 분석 시간(초)", (), (0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+))
+
+
+def observe_llm_call(entry: Dict) -> None:
+    """utils/llm_metrics.py의 호출 기록 1건을 Prometheus 지표에 반영합니다."""
+    stage, kind, backend = entry["stage"], entry["kind"], entry["backend"]
+    LLM_CALLS.inc(stage=stage, kind=kind, backend=backend, status="ok" if entry["ok"] else "error")
+    LLM_CALL_SECONDS.observe(entry["latency_ms"] / 1000, stage=stage, kind=kind, backend=backend)
+    LLM_QUEUE_SECONDS.observe(entry["queue_wait_ms"] / 1000, backend=backend)
+    if entry["ttft_ms"] is not None:
+        LLM_TTFT_SECONDS.observe(entry["ttft_ms"] / 1000, stage=stage, backend=backend)
+    if entry["cache_hit"]:
+        LLM_CACHE_HITS.inc(stage=stage)
+    LLM_RETRIES.inc(entry["retries"], stage=stage, backend=backend)
+    LLM_PARSE_FAILURES.inc(entry["parse_failures"], stage=stage)
+    LLM_TOKENS.inc(entry["prompt_tokens"], stage=stage, direction="prompt")
+    LLM_TOKENS.inc(entry["response_tokens"], stage=stage, direction="response")
+
+
+@contextmanager
+def track_generation() -> Iterator[None]:
+    """Step5 글 생성 1건: 진행 중 개수 + 전체 시간(성공/실패별). generate_post에 데코레이터로 사용"""
+    started = time.perf_counter()
+    status = "error"
+    with ACTIVE_GENERATIONS.track_inprogress():
+        try:
+            yield
+            status = "ok"
+        finally:
+            STEP5_SECONDS.observe(time.perf_counter() - started, status=status)
+
+
+def observe_image_analysis(seconds: float, ok: bool) -> None:
+    IMAGES_ANALYZED.inc(status="ok" if ok else "error")
+    IMAGE_ANALYSIS_SECONDS.observe(seconds)
+
+
+def _collect_runtime() -> List[str]:
+    # 지연 import: 서버 모듈이 agents 쪽을 import 시점에 끌어오지 않도록
+    from agents.resilience import resilience_stats
+    from utils.response_cache import get_response_cache
+
+    lines = []
+    cache = get_response_cache()
+    if cache is not None:
+        lines += [
+            "# HELP blog_response_cache_lookups_total LLM 응답 디스크 캐시 조회 수",
+            "# TYPE blog_response_cache_lookups_total counter",
+            f'blog_response_cache_lookups_total{{result="hit"}} {cache.hits}',
+            f'blog_response_cache_lookups_total{{result="miss"}} {cache.misses}',
+        ]
+    stats = resilience_stats()
+    states = {"closed": 0, "half_open": 1, "open": 2}
+    lines += [
+        "# HELP blog_llm_breaker_state 서킷 브레이커 상태 (0=closed, 1=half_open, 2=open)",
+        "# TYPE blog_llm_breaker_state gauge",
+    ]
+    for b in stats["breakers"].values():
+        lines.append(
+            f'blog_llm_breaker_state{{backend="{_escape(b["backend"])}",endpoint="{_escape(b["endpoint"])}"}} '
+            f'{states.get(b["state"], 0)}'
+        )
+    lines += [
+        "# HELP blog_llm_retry_budget_tokens 남은 재시도 예산",
+        "# TYPE blog_llm_retry_budget_tokens gauge",
+        f'blog_llm_retry_budget_tokens {stats["retry_budget"]["tokens"]}',
+    ]
+    return lines
+
+
+register_collector(_collect_runtime)
+
+
+# =========================================================
+# HTTP 서버
+# =========================================================
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 스크랩마다 콘솔에 찍히지 않도록
+        pass
+
+
+_started = False
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST) -> None:
+    """METRICS_PORT가 0보다 크면 /metrics 서버를 데몬 스레드로 띄웁니다. (프로세스당 1회, 실패해도 다시 시도하지 않음)"""
+    global _started
+    if port <= 0:
+        return
+    with _server_lock:
+        if _started:
+            return
+        _started = True
+    try:
+        server = ThreadingHTTPServer((host, port), _Handler)
+    except OSError as e:
+        print(f"⚠️ 지표 서버를 시작하지 못했습니다 ({host}:{port}): {e}")
+        return
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-server").start()
+    print(f"📈 Prometheus 지표: http://{host}:{port}/metrics")
@@ -2,13 +2,202 @@
 프롬프트 파일 로더 유틸리티
 
 프롬프트 .md 파일을 읽어와서 변수 치환을 수행합니다.
+파일은 한 번만 파싱해 (문자열 조각 + 플레이스홀더) 목록으로 메모리에 캐시하고,
+파일 수정 시각(mtime)이 바뀌면 다시 읽습니다. (프롬프트 수정은 재시작 없이 반영)
+플레이스홀더 검사도 파싱할 때 한 번 해서 템플릿과 함께 캐시하고, 읽는 즉시 알립니다.
+(앱 시작 시 validate_prompts()로 전체 파일을 미리 검사)
 """
 
 import os
 import re
-from typing import Dict, Any
+import threading
+from functools import lru_cache
+from typing import Dict, Any, FrozenSet, List, Optional, Set, Tuple
 import json
 
+_PLACEHOLDER = re.compile(r"\{([a-zA-Z0-9_]+)\}")
+# 플레이스홀더처럼 보이지만 형식이 틀린 것 ({user intent}, {제목}, {user-intent} 등. JSON 예시는 제외)
+_PLACEHOLDER_LIKE = re.compile(r"\{([\w\- ]{1,40})\}")
+_HEADING = re.compile(r"^(#{1,6})\s")
+
+
+def _to_text(value: Any) -> str:
+    """치환 값을 문자열로 변환합니다. (None → 빈 문자열, dict/list → JSON)"""
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, indent=2)
+    return str(value).strip()
+
+
+# 프롬프트 이름 → 마지막으로 렌더링에 쓰인 변수 이름들 (파일 재파싱 시 검사용)
+_last_variables: Dict[str, FrozenSet[str]] = {}
+
+
+class PromptTemplate:
+    """
+    미리 파싱된 프롬프트 템플릿.
+
+    원문을 [문자열, 이름, 문자열, 이름, ..., 문자열] 조각 목록으로 한 번만 나눠 두고,
+    렌더링은 조각을 이어 붙이기만 합니다. 고정/가변 섹션 분리 결과도 함께 캐시합니다.
+    """
+
+    def __init__(self, text: str, name: str = ""):
+        self.text = text or ""
+        self.name = name
+        self.segments: List[str] = _PLACEHOLDER.split(self.text)
+        self.placeholders: FrozenSet[str] = frozenset(self.segments[1::2])
+        self._parts: Optional[Tuple[str, "PromptTemplate"]] = None
+        self._checked: Set[FrozenSet[str]] = set()
+        self._lock = threading.Lock()
+        self.issues: List[str] = self._validate()
+
+    def _validate(self) -> List[str]:
+        """템플릿 자체의 문제 (파싱할 때 한 번). 파일 템플릿이면 마지막 렌더링 변수와도 비교"""
+        issues = []
+        malformed = sorted({
+            m.group(0) for m in _PLACEHOLDER_LIKE.finditer(self.text)
+            if not _PLACEHOLDER.fullmatch(m.group(0)) and not m.group(1).strip().isdigit()
+        })
+        if malformed:
+            issues.append(f"형식이 잘못된 플레이스홀더 {malformed} → 치환되지 않고 그대로 남습니다. (영문/숫자/_만 사용)")
+        known = _last_variables.get(self.name) if self.name else None
+        if known is not None:
+            missing, unknown = self.check_variables(dict.fromkeys(known))
+            if missing:
+                issues.append(f"호출 쪽이 넘기지 않는 플레이스홀더 {missing} → 빈 문자열로 치환됩니다.")
+            if unknown:
+                issues.append(f"템플릿에서 빠진 변수 {unknown} (호출 쪽은 계속 넘기는 중)")
+        return issues
+
+    def report_issues(self) -> None:
+        label = self.name or "(inline)"
+        for issue in self.issues:
+            print(f"⚠️ 프롬프트 {label}: {issue}")
+
+    def check_variables(self, variables: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+        """
+        템플릿과 변수 딕셔너리를 비교합니다.
+
+        Returns:
+            (값이 없는 플레이스홀더 목록, 템플릿에 없는 변수 목록)
+        """
+        missing = sorted(self.placeholders - set(variables))
+        unknown = sorted(set(variables) - self.placeholders)
+        return missing, unknown
+
+    def _report(self, variables: Dict[str, Any]) -> None:
+        if not self.placeholders and not variables:
+            return
+        # 같은 템플릿/같은 변수 구성은 한 번만 알림 (파일이 바뀌면 새 템플릿이므로 다시 알림)
+        keys = frozenset(variables)
+        with self._lock:
+            if keys in self._checked:
+                return
+            self._checked.add(keys)
+        if self.name:
+            # 파일이 바뀌어 다시 파싱할 때 호출 쪽 변수와 바로 비교하기 위해 기억
+            _last_variables[self.name] = keys
+        missing, unknown = self.check_variables(variables)
+        label = self.name or "(inline)"
+        if missing:
+            print(f"⚠️ 프롬프트 {label}: 값이 없는 플레이스홀더 {missing} → 빈 문자열로 치환됩니다.")
+        if unknown:
+            print(f"⚠️ 프롬프트 {label}: 템플릿에 없는 변수 {unknown}")
+
+    def render(self, variables: Dict[str, Any]) -> str:
+        self._report(variables)
+        return self._fill(variables)
+
+    def _fill(self, variables: Dict[str, Any]) -> str:
+        if not self.placeholders:
+            return self.text
+        parts = list(self.segments)
+        for i in range(1, len(parts), 2):
+            parts[i] = _to_text(variables.get(parts[i]))
+        return "".join(parts)
+
+    def parts(self) -> Tuple[str, "PromptTemplate"]:
+        """(고정 섹션 원문, 가변 섹션 템플릿) — split_prompt_sections 결과를 캐시"""
+        if self._parts is None:
+            static, dynamic = split_prompt_sections(self.text)
+            self._parts = (static.strip(), PromptTemplate(dynamic, self.name))
+        return self._parts
+
+    def render_parts(self, variables: Dict[str, Any]) -> Tuple[str, str]:
+        static, dynamic = self.parts()
+        # 고정 섹션에는 플레이스홀더가 없으므로 알림은 전체 템플릿 기준으로 한 번만
+        self._report(variables)
+        return static, dynamic._fill(variables).strip()
+
+
+@lru_cache(maxsize=64)
+def compile_prompt(template: str) -> PromptTemplate:
+    """문자열 템플릿을 파싱합니다. (같은 문자열은 다시 파싱하지 않음)"""
+    return PromptTemplate(template)
+
+
+# (파일 경로) → (mtime, 템플릿)
+_registry: Dict[str, Tuple[float, PromptTemplate]] = {}
+_registry_lock = threading.Lock()
+
+
+def get_prompt_template(filename: str, prompts_dir: str = "prompts") -> PromptTemplate:
+    """
+    프롬프트 파일의 파싱된 템플릿을 반환합니다. 파일 mtime이 바뀌었으면 다시 읽습니다.
+
+    Args:
+        filename: 프롬프트 파일 이름 (.md 확장자 제외)
+        prompts_dir: 프롬프트 파일이 저장된 디렉토리 (기본값: "prompts")
+
+    Returns:
+        PromptTemplate
+
+    Raises:
+        FileNotFoundError: 파일이 존재하지 않을 경우
+    """
+    path = os.path.join(prompts_dir, f"{filename}.md")
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        raise FileNotFoundError(f"프롬프트 파일을 찾을 수 없습니다: {path}")
+
+    cached = _registry.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with open(path, "r", encoding="utf-8") as f:
+        template = PromptTemplate(f.read(), filename)
+    # 새로 읽은(또는 수정된) 파일의 문제는 렌더링을 기다리지 않고 바로 알림
+    template.report_issues()
+    with _registry_lock:
+        _registry[path] = (mtime, template)
+    return template
+
+
+_validated_dirs: Set[str] = set()
+
+
+def validate_prompts(prompts_dir: str = "prompts") -> Dict[str, List[str]]:
+    """
+    프롬프트 폴더의 모든 파일을 미리 파싱해 문제를 알립니다. (프로세스당 폴더별 1회, 이후 수정분은 mtime으로 재검사)
+
+    Returns:
+        {파일 이름: 문제 목록} (문제가 있는 파일만)
+    """
+    if prompts_dir in _validated_dirs:
+        return {}
+    _validated_dirs.add(prompts_dir)
+    out = {}
+    for entry in sorted(os.listdir(prompts_dir)) if os.path.isdir(prompts_dir) else []:
+        name, ext = os.path.splitext(entry)
+        if ext != ".md" or name == "README":
+            continue
+        template = get_prompt_template(name, prompts_dir)
+        if template.issues:
+            out[name] = list(template.issues)
+    return out
+
 
 def load_prompt(filename: str, prompts_dir: str = "prompts") -> str:
     """
@@ -24,13 +213,7 @@ def load_prompt(filename: str, prompts_dir: str = "prompts") -> str:
     Raises:
         FileNotFoundError: 파일이 존재하지 않을 경우
     """
-    path = os.path.join(prompts_dir, f"{filename}.md")
-    
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"프롬프트 파일을 찾을 수 없습니다: {path}")
-    
-    with open(path, "r", encoding="utf-8") as f:
-        return f.read()
+    return get_prompt_template(filename, prompts_dir).text
 
 
 def render_prompt(template: str, variables: Dict[str, Any]) -> str:
@@ -48,24 +231,7 @@ def render_prompt(template: str, variables: Dict[str, Any]) -> str:
     """
     if not template:
         return ""
-    
-    def _get_value(key: str) -> str:
-        """변수 딕셔너리에서 값을 가져와 문자열로 변환합니다."""
-        value = variables.get(key)
-        
-        if value is None:
-            return ""
-        
-        # dict나 list는 JSON 형식으로 변환
-        if isinstance(value, (dict, list)):
-            return json.dumps(value, ensure_ascii=False, indent=2)
-        
-        # 나머지는 문자열로 변환
-        return str(value).strip() if value is not None else ""
-    
-    # {variable_name} 패턴을 찾아서 치환
-    placeholder_pattern = re.compile(r"\{([a-zA-Z0-9_]+)\}")
-    return placeholder_pattern.sub(lambda m: _get_value(m.group(1)), template)
+    return compile_prompt(template).render(variables)
 
 
 def load_and_render_prompt(filename: str, variables: Dict[str, Any], prompts_dir: str = "prompts") -> str:
@@ -82,5 +248,90 @@ def load_and_render_prompt(filename: str, variables: Dict[str, Any], prompts_dir
     Returns:
         변수가 치환된 프롬프트 문자열
     """
-    template = load_prompt(filename, prompts_dir)
-    return render_prompt(template, variables)
+    return get_prompt_template(filename, prompts_dir).render(variables)
+
+
+def split_prompt_sections(template: str) -> Tuple[str, str]:
+    """
+    프롬프트 템플릿을 고정 섹션과 가변 섹션으로 나눕니다.
+
+    최상위 제목(두 번 이상 나오는 가장 얕은 #/## 레벨) 단위로 섹션을 자르고,
+    플레이스홀더가 없는 섹션은 고정(static), 있는 섹션은 가변(dynamic)으로 분류합니다.
+    각 묶음 안에서는 원래 순서를 유지합니다.
+
+    Args:
+        template: 프롬프트 템플릿 문자열
+
+    Returns:
+        (고정 섹션 원문, 가변 섹션 원문)
+    """
+    if not template:
+        return "", ""
+
+    lines = template.splitlines()
+    levels = [len(m.group(1)) for m in (_HEADING.match(line) for line in lines) if m]
+    top = next((lv for lv in sorted(set(levels)) if levels.count(lv) >= 2), None)
+    if top is None:
+        return ("", template) if _PLACEHOLDER.search(template) else (template, "")
+
+    sections: List[List[str]] = [[]]
+    for line in lines:
+        m = _HEADING.match(line)
+        if m and len(m.group(1)) == top:
+            sections.append([])
+        sections[-1].append(line)
+
+    static: List[str] = []
+    dynamic: List[str] = []
+    for section in sections:
+        text = "\n".join(section).strip()
+        if not text:
+            continue
+        (dynamic if _PLACEHOLDER.search(text) else static).append(text)
+    return "\n\n".join(static), "\n\n".join(dynamic)
+
+
+def render_prompt_parts(template: str, variables: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    템플릿을 (고정 prefix, 변수가 치환된 가변 부분)으로 렌더링합니다.
+
+    고정 prefix는 호출마다 글자 하나까지 같으므로 시스템 메시지 앞쪽에 두면
+    백엔드(Ollama/OpenAI)의 프롬프트 prefix 캐시(KV 캐시)를 재사용할 수 있습니다.
+
+    Args:
+        template: 프롬프트 템플릿 문자열
+        variables: 치환할 변수 딕셔너리
+
+    Returns:
+        (고정 prefix, 가변 부분)
+    """
+    return compile_prompt(template or "").render_parts(variables)
+
+
+def load_and_render_prompt_parts(filename: str, variables: Dict[str, Any], prompts_dir: str = "prompts") -> Tuple[str, str]:
+    """
+    프롬프트 파일을 로드해 (고정 prefix, 가변 부분)으로 렌더링합니다.
+
+    Args:
+        filename: 프롬프트 파일 이름 (.md 확장자 제외)
+        variables: 치환할 변수 딕셔너리
+        prompts_dir: 프롬프트 파일이 저장된 디렉토리
+
+    Returns:
+        (고정 prefix, 가변 부분)
+    """
+    return get_prompt_template(filename, prompts_dir).render_parts(variables)
+
+
+def compose_system_prompt(role: str, static_prefix: str) -> str:
+    """
+    역할 문구 + 고정 prefix로 시스템 메시지를 만듭니다.
+
+    Args:
+        role: 역할 문구 (예: "전문 블로거")
+        static_prefix: render_prompt_parts()의 고정 prefix
+
+    Returns:
+        시스템 메시지 문자열
+    """
+    return f"{role}\n\n{static_prefix}" if static_prefix else role
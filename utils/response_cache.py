@@ -0,0 +1,157 @@
+"""
+LLM 응답 디스크 캐시
+
+동일한 요청(mode, model, system_role, prompt, temperature, top_p)을 해시 키로 저장해
+재시도/다시 생성 시 모델을 다시 호출하지 않도록 합니다.
+ASSETS_DIR 아래에 JSON 파일로 저장되며 TTL/총 용량 기준으로 오래된 항목부터 삭제합니다.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from config import LLM_CACHE_ENABLED, LLM_CACHE_DIR, LLM_CACHE_TTL_SEC, LLM_CACHE_MAX_MB
+
+
+class ResponseCache:
+    def __init__(self, cache_dir: str, ttl_sec: int, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.ttl_sec = ttl_sec
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # 전체 용량은 첫 정리 때 한 번 스캔하고 이후엔 쓰기량만 더해서 추정
+        self._approx_bytes: Optional[int] = None
+
+    @staticmethod
+    def make_key(**parts: Any) -> str:
+        """요청 구성요소를 정렬된 JSON으로 직렬화해 sha256 키를 만듭니다."""
+        raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+            if time.time() - float(record.get("created_at", 0)) > self.ttl_sec:
+                self._remove(path)
+                raise FileNotFoundError(path)
+            # LRU 정리를 위해 마지막 사용 시각 갱신
+            os.utime(path, None)
+        except Exception:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return record.get("value")
+
+    def set(self, key: str, value: str) -> None:
+        path = self._path(key)
+        record = {"created_at": time.time(), "value": value}
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(record, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except Exception as e:
+            print(f"⚠️ LLM 캐시 저장 실패: {e}")
+            return
+
+        with self._lock:
+            if self._approx_bytes is not None:
+                self._approx_bytes += size
+            need_evict = self._approx_bytes is None or self._approx_bytes > self.max_bytes
+        if need_evict:
+            self.evict()
+
+    def delete(self, key: str) -> None:
+        """항목 1개 삭제 (잘못 저장된 응답 정리용)"""
+        self._remove(self._path(key))
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self) -> None:
+        """만료 항목을 지우고, 총 용량이 max_bytes를 넘으면 오래 안 쓴 것부터 삭제합니다."""
+        now = time.time()
+        entries = []
+        total = 0
+        for root, _dirs, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if now - st.st_mtime > self.ttl_sec:
+                    self._remove(path)
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+
+        if total > self.max_bytes:
+            entries.sort()
+            # 여유분을 두고 90%까지 줄여서 매번 정리가 돌지 않게 함
+            target = int(self.max_bytes * 0.9)
+            for _mtime, size, path in entries:
+                if total <= target:
+                    break
+                self._remove(path)
+                total -= size
+
+        with self._lock:
+            self._approx_bytes = total
+
+    def clear(self) -> None:
+        for root, _dirs, files in os.walk(self.cache_dir):
+            for name in files:
+                self._remove(os.path.join(root, name))
+        with self._lock:
+            self._approx_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "approx_bytes": self._approx_bytes,
+            }
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """캐시가 켜져 있으면(LLM_CACHE_ENABLED) 프로세스 공용 인스턴스를, 아니면 None을 반환합니다."""
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    cache_dir=LLM_CACHE_DIR,
+                    ttl_sec=LLM_CACHE_TTL_SEC,
+                    max_bytes=LLM_CACHE_MAX_MB * 1024 * 1024,
+                )
+    return _cache
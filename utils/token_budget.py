@@ -0,0 +1,168 @@
+"""
+프롬프트 토큰 추정 + 예산 맞추기
+
+- estimate_tokens: tiktoken이 설치돼 있고 OpenAI 모델이면 실제 토크나이저,
+  아니면 한글/영문/기호별 휴리스틱 (로컬 8B 모델 기준으로 약간 넉넉하게 추정)
+- fit_sections: 컨텍스트 예산을 넘으면 우선순위 낮은 섹션부터 줄이고 무엇을 줄였는지 출력
+- budget_prompt_variables: 프롬프트 템플릿 변수 중 긴 섹션(FACTS, 이미지 목록, 블로그 문체 등)을 예산에 맞춤
+"""
+
+import re
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+from config import (
+    OLLAMA_NUM_CTX,
+    LLM_CONTEXT_TOKENS_OPENAI,
+    LLM_OUTPUT_RESERVE_TOKENS,
+)
+
+try:
+    import tiktoken  # 선택 의존성
+except ImportError:  # pragma: no cover - 없으면 휴리스틱만 사용
+    tiktoken = None
+
+# Ollama num_ctx를 넘기지 않을 때 서버 기본 컨텍스트로 가정하는 값
+_OLLAMA_DEFAULT_CTX = 4096
+# 섹션을 줄일 때 최소로 남길 토큰 (완전히 비우면 프롬프트 구조가 깨짐)
+_MIN_SECTION_TOKENS = 32
+TRUNCATION_MARK = "…(이하 생략)"
+
+_HANGUL = re.compile(r"[가-힣ㄱ-ㆎ]")
+_ASCII_WORD = re.compile(r"[A-Za-z0-9]+")
+_SPACE = re.compile(r"\s")
+
+_encoders: Dict[str, Any] = {}
+_encoders_lock = threading.Lock()
+
+
+def _encoder(model: Optional[str]):
+    if tiktoken is None or not model or "gpt" not in model.lower():
+        return None
+    with _encoders_lock:
+        enc = _encoders.get(model)
+        if enc is None:
+            try:
+                enc = tiktoken.encoding_for_model(model)
+            except KeyError:
+                enc = tiktoken.get_encoding("o200k_base")
+            _encoders[model] = enc
+        return enc
+
+
+def _heuristic_tokens(text: str) -> int:
+    # 한글: 음절당 약 1토큰 (Llama 계열 BPE는 한글 음절이 여러 바이트 조각으로 쪼개지는 경우가 많음)
+    # 영문/숫자: 단어 4글자당 1토큰, 공백 제외 나머지 기호/기타 문자: 글자당 1토큰
+    hangul = len(_HANGUL.findall(text))
+    ascii_words = _ASCII_WORD.findall(text)
+    ascii_tokens = sum(max(1, -(-len(w) // 4)) for w in ascii_words)
+    ascii_chars = sum(len(w) for w in ascii_words)
+    spaces = len(_SPACE.findall(text))
+    other = max(0, len(text) - hangul - ascii_chars - spaces)
+    return hangul + ascii_tokens + other
+
+
+def estimate_tokens(text: str, model: Optional[str] = None) -> int:
+    """텍스트의 토큰 수를 추정합니다. (OpenAI 모델 + tiktoken 설치 시 정확한 값)"""
+    if not text:
+        return 0
+    enc = _encoder(model)
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    return _heuristic_tokens(text)
+
+
+def context_window(backend: str) -> int:
+    if backend == "openai":
+        return LLM_CONTEXT_TOKENS_OPENAI
+    return OLLAMA_NUM_CTX or _OLLAMA_DEFAULT_CTX
+
+
+def prompt_budget(backend: str, reserve: int = LLM_OUTPUT_RESERVE_TOKENS) -> int:
+    """응답용 토큰을 남기고 프롬프트(시스템+사용자 메시지)에 쓸 수 있는 토큰 수"""
+    window = context_window(backend)
+    return max(window // 4, window - reserve)
+
+
+def ollama_ctx_options() -> Dict[str, int]:
+    """Ollama options에 합칠 num_ctx (OLLAMA_NUM_CTX=0이면 서버 기본값 사용)"""
+    return {"num_ctx": OLLAMA_NUM_CTX} if OLLAMA_NUM_CTX > 0 else {}
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """앞부분을 남기고 max_tokens 안으로 자릅니다. 가능하면 줄 경계에서 자르고 생략 표시를 붙입니다."""
+    if not text or estimate_tokens(text, model) <= max_tokens:
+        return text
+    budget = max(0, max_tokens - estimate_tokens(TRUNCATION_MARK, model))
+    lo, hi = 0, len(text)
+    # 추정 토큰 수는 길이에 대해 단조 증가 → 이분 탐색으로 최대 길이 찾기
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(text[:mid], model) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    cut = text[:lo]
+    newline = cut.rfind("\n")
+    if newline >= len(cut) // 2:
+        cut = cut[:newline]
+    return f"{cut.rstrip()}\n{TRUNCATION_MARK}" if cut.strip() else TRUNCATION_MARK
+
+
+def fit_sections(
+    sections: Dict[str, str],
+    trim_order: Sequence[str],
+    budget_tokens: int,
+    fixed_tokens: int = 0,
+    model: Optional[str] = None,
+    label: str = "prompt",
+) -> Dict[str, str]:
+    """
+    fixed_tokens + 섹션 토큰 합이 budget_tokens를 넘으면 trim_order 순서(먼저 나온 것이 우선순위 낮음)로
+    섹션을 줄입니다. trim_order에 없는 섹션은 건드리지 않습니다. 줄인 내역은 콘솔에 출력합니다.
+    """
+    sizes = {name: estimate_tokens(text, model) for name, text in sections.items()}
+    over = fixed_tokens + sum(sizes.values()) - budget_tokens
+    if over <= 0:
+        return dict(sections)
+
+    out = dict(sections)
+    dropped: List[str] = []
+    for name in trim_order:
+        if over <= 0:
+            break
+        size = sizes.get(name, 0)
+        if size <= _MIN_SECTION_TOKENS:
+            continue
+        target = max(_MIN_SECTION_TOKENS, size - over)
+        out[name] = truncate_to_tokens(sections[name], target, model)
+        new_size = estimate_tokens(out[name], model)
+        over -= size - new_size
+        dropped.append(f"{name} {size}→{new_size}")
+
+    total = budget_tokens + over
+    if dropped:
+        print(f"✂️ [{label}] 프롬프트 예산 {budget_tokens}토큰 초과 → 섹션 축소: {', '.join(dropped)} (현재 약 {total}토큰)")
+    if over > 0:
+        print(f"⚠️ [{label}] 줄일 섹션을 다 줄여도 예산을 {over}토큰 초과합니다. 컨텍스트가 잘릴 수 있습니다.")
+    return out
+
+
+def budget_prompt_variables(
+    template: str,
+    variables: Dict[str, Any],
+    trim_order: Sequence[str],
+    budget_tokens: int,
+    extra_fixed: str = "",
+    model: Optional[str] = None,
+    label: str = "prompt",
+) -> Dict[str, Any]:
+    """
+    템플릿 변수 중 trim_order의 항목(문자열)을 예산에 맞게 줄인 새 변수 딕셔너리를 반환합니다.
+    template 원문, 나머지 변수 값, extra_fixed(시스템 역할 문구 등)는 고정 비용으로 계산합니다.
+    """
+    trimmable = {k: variables[k] for k in trim_order if isinstance(variables.get(k), str)}
+    fixed = estimate_tokens(template, model) + estimate_tokens(extra_fixed, model)
+    fixed += sum(estimate_tokens(str(v), model) for k, v in variables.items() if k not in trimmable and v is not None)
+    fitted = fit_sections(trimmable, trim_order, budget_tokens, fixed, model, label)
+    return {**variables, **fitted}
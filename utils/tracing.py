@@ -0,0 +1,204 @@
+"""
+OpenTelemetry 호환 트레이싱 (OTLP/JSON 파일 내보내기, 표준 라이브러리만 사용)
+
+TRACING_ENABLED=1이면 span이 끝날 때마다 TRACE_PATH에 OTLP/JSON(ExportTraceServiceRequest) 한 줄씩 추가합니다.
+OpenTelemetry Collector의 otlpjsonfile 수신기나 Jaeger/Tempo 가져오기로 그대로 읽을 수 있습니다.
+
+- 세션 1개 = trace 1개 (trace_id = session_id): 한 글을 만드는 전체 흐름을 폭포수로 확인
+- span 계층: render_stepN → 에이전트 함수(generate_post 등) → Step5 단계 → LLM 호출
+- 부모 span은 contextvars로 전달 (스레드 풀에 넘길 때는 contextvars.copy_context 사용)
+"""
+
+import contextvars
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import TRACING_ENABLED, TRACE_PATH, TRACE_MAX_MB, TRACE_BACKUPS, TRACE_SERVICE_NAME
+
+# OTLP SpanKind / StatusCode
+_KINDS = {"internal": 1, "server": 2, "client": 3}
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+# Streamlit이 st.rerun()/st.stop()에 쓰는 예외는 오류가 아니라 흐름 제어
+_CONTROL_FLOW_EXCEPTIONS = {"RerunException", "StopException"}
+
+_trace_session: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_session", default=None)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("trace_span", default=None)
+
+
+def set_trace_session(session_id: Optional[str]) -> None:
+    """현재 실행 흐름의 세션 ID 지정 (32자리 hex면 그대로 trace_id로 사용)"""
+    _trace_session.set(session_id)
+
+
+def _session_trace_id() -> str:
+    sid = (_trace_session.get() or "").lower()
+    if len(sid) == 32 and all(c in "0123456789abcdef" for c in sid):
+        return sid
+    return secrets.token_hex(16)
+
+
+def _attr_value(value: Any) -> Dict[str, Any]:
+    # OTLP/JSON: int64는 문자열로 표기
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Span:
+    def __init__(self, name: str, kind: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.kind = _KINDS.get(kind, 1)
+        self.trace_id = parent.trace_id if parent is not None else _session_trace_id()
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent.span_id if parent is not None else ""
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: Dict[str, Any] = {k: v for k, v in attributes.items() if v is not None}
+        self.events: List[Dict[str, Any]] = []
+        self.status_code = 0
+        self.status_message = ""
+        self._lock = threading.Lock()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            with self._lock:
+                self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def add_event(self, name: str, **attributes: Any) -> None:
+        with self._lock:
+            self.events.append({"name": name, "time_ns": time.time_ns(), "attributes": attributes})
+
+    def record_exception(self, err: BaseException) -> None:
+        self.add_event("exception", **{"exception.type": type(err).__name__, "exception.message": str(err)[:500]})
+        self.status_code = _STATUS_ERROR
+        self.status_message = f"{type(err).__name__}: {err}"[:300]
+
+    def to_otlp(self) -> Dict[str, Any]:
+        with self._lock:
+            attributes = dict(self.attributes)
+            events = list(self.events)
+        out = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": _attr_value(v)} for k, v in attributes.items()],
+            "events": [
+                {
+                    "timeUnixNano": str(e["time_ns"]),
+                    "name": e["name"],
+                    "attributes": [{"key": k, "value": _attr_value(v)} for k, v in e["attributes"].items()],
+                }
+                for e in events
+            ],
+            "status": {"code": self.status_code, "message": self.status_message} if self.status_code else {},
+        }
+        if self.parent_span_id:
+            out["parentSpanId"] = self.parent_span_id
+        return out
+
+
+class _NoopSpan:
+    """트레이싱이 꺼져 있을 때 돌려주는 span (호출 쪽 분기 없이 그대로 사용)"""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        pass
+
+    def add_event(self, name: str, **attributes: Any) -> None:
+        pass
+
+    def record_exception(self, err: BaseException) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+_sink: Optional[logging.Logger] = None
+_sink_lock = threading.Lock()
+
+
+def _get_sink() -> logging.Logger:
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                os.makedirs(os.path.dirname(TRACE_PATH) or ".", exist_ok=True)
+                handler = RotatingFileHandler(
+                    TRACE_PATH,
+                    maxBytes=int(TRACE_MAX_MB * 1024 * 1024),
+                    backupCount=TRACE_BACKUPS,
+                    encoding="utf-8",
+                )
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger = logging.getLogger("tracing")
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                logger.addHandler(handler)
+                _sink = logger
+    return _sink
+
+
+def _export(span: Span) -> None:
+    request = {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": TRACE_SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "blog.tracing"}, "spans": [span.to_otlp()]}],
+        }]
+    }
+    try:
+        _get_sink().info(json.dumps(request, ensure_ascii=False))
+    except Exception:
+        # 트레이스 기록 실패는 기능에 영향 주지 않도록 무시
+        pass
+
+
+@contextmanager
+def trace_span(name: str, kind: str = "internal", **attributes: Any) -> Iterator[Any]:
+    """
+    span 1개를 열고 닫습니다. 데코레이터로도 사용 가능: @trace_span("agent.generate_post")
+    kind: "internal" | "client"(외부 호출, LLM 등) | "server"
+    """
+    if not TRACING_ENABLED:
+        yield _NOOP_SPAN
+        return
+
+    span = Span(name, kind, _current_span.get(), attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        if type(e).__name__ in _CONTROL_FLOW_EXCEPTIONS:
+            span.set_attribute("streamlit.control", type(e).__name__)
+        else:
+            span.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end_ns = time.time_ns()
+        _export(span)
+
+
+def current_span() -> Any:
+    """진행 중인 span (없거나 트레이싱이 꺼져 있으면 아무것도 하지 않는 span)"""
+    return _current_span.get() or _NOOP_SPAN